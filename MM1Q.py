@@ -1,6 +1,20 @@
+from __future__ import division, print_function
 __metaclass__=type
 import random
-import csv
+import os
+import sys
+from itertools import chain, repeat
+import numpy as np
+from headlessMM1 import BatchMeans, QuantileSketch
+import distributions
+
+#columns of the full data set (in the order they are written to csv)
+COLUMNS=['Customer','Arrival_Date','Wait','Service_Start_Date','Service_Time','Service_End_Date']
+DTYPES=dict((column,np.dtype('<i8') if column=='Customer' else np.dtype('<f8')) for column in COLUMNS)
+GRADIENTS=['dWait_dlambda','dWait_dmu','dTime_In_System_dlambda','dTime_In_System_dmu']
+
+#default cap on the number of customers of a run to a precision target
+MAX_CUSTOMERS=10**8
 
 #define a class called 'Customer'
 class Customer:
@@ -16,84 +30,489 @@ def neg_exp(lambd):
 	return random.expovariate(lambd)
 
 
-def QSim(lambd=False,mu=False,simulation_time=False):
-    """
-    This is the main function to call to simulate an MM1 queue.
-    """
+#running mean and variance of a stream of observations
+class RunningStat:
+	"""
+	Welford's algorithm for the running mean and variance of a stream of
+	observations (only the count, mean and sum of squared deviations are
+	held so memory does not grow with the number of observations).
+	"""
+	def __init__(self):
+		self.count=0
+		self.mean=0.0
+		self.M2=0.0
 
-	#If parameters are not input prompt
-	if not lambd:
-		lambd=input('Inter arrival rate: ')
-	if not mu:
-		mu=input('Service rate: ')
-	if not simulation_time:
-		simulation_time=input('Total simulation time: ')
+	def update(self,x):
+		"""
+		Add a single observation.
+		"""
+		self.count+=1
+		delta=x-self.mean
+		self.mean+=delta/self.count
+		self.M2+=delta*(x-self.mean)
 
-	#Initialise clock
-	t=0
+	def update_array(self,x):
+		"""
+		Add a block of observations at once (Chan et al.'s pairwise form of
+		Welford's update: the same result as calling update on each entry).
+		"""
+		n=len(x)
+		if n==0:
+			return
+		block_mean=x.mean()
+		block_M2=((x-block_mean)**2).sum()
+		delta=block_mean-self.mean
+		total=self.count+n
+		self.mean+=delta*n/total
+		self.M2+=block_M2+delta**2*self.count*n/total
+		self.count=total
 
-	#Initialise empty list to hold all data
-	Customers=[]
+	def variance(self):
+		"""
+		Return the sample variance of the observations.
+		"""
+		if self.count<2:
+			return 0.0
+		return self.M2/(self.count-1)
+
+	def total(self):
+		"""
+		Return the sum of the observations.
+		"""
+		return self.mean*self.count
+
+
+def substreams(seed,n):
+	"""
+	Return n independent seed sequences spawned from a seed (the seed itself
+	is not changed, so the same seed always gives the same sequences).
+
+	Arguments:
+		seed - an integer, a numpy SeedSequence or None
+		n - the number of sequences (integer)
+
+	Output: a list of numpy SeedSequence objects
+	"""
+	if not isinstance(seed,np.random.SeedSequence):
+		seed=np.random.SeedSequence(seed)
+	return [np.random.SeedSequence(seed.entropy,spawn_key=tuple(seed.spawn_key)+(k,),pool_size=seed.pool_size) for k in range(n)]
+
+
+def lindley_chunks(lambd,mu,simulation_time,chunk_size=2**20,seed=None,arrivals=None,services=None,gradients=False):
+	"""
+	Generator that simulates an MM1 queue (or a GG1 queue) in blocks of customers.
+
+	Inter arrival and service times are drawn as whole arrays and the waits are
+	obtained from the Lindley recursion W(n+1)=max(0,W(n)+S(n)-A(n+1)) written
+	in array form: W(n)=X(n)-min(X(0),...,X(n),-W(0)) where X is the cumulative
+	sum of S(n-1)-A(n). The end of service of the last customer of a block is
+	carried over to the next block. Inter arrival and service times are drawn
+	from two generators spawned from the seed so that a seed gives the same
+	customers whatever the size of the blocks. The first block is no larger
+	than about twice the expected number of arrivals (short runs do not draw
+	a whole chunk_size block).
+
+	With gradients=True the derivatives of every wait and time in system
+	with respect to the arrival and service rates are computed in the same
+	pass (infinitesimal perturbation analysis): inter arrival and service
+	times scale as 1/lambd and 1/mu so dA(n)/dlambd=-A(n)/lambd and
+	dS(n)/dmu=-S(n)/mu, and differentiating the array form of the recursion
+	dW(n)=dX(n)-dX(k) where k is the customer that started the busy period
+	of customer n (the argument of the running minimum) or
+	dW(n)=dX(n)+dW(0) if that busy period started in an earlier block. The
+	means of these derivatives are unbiased estimates of the derivatives of
+	the mean wait and mean time in system.
+
+	Arguments:
+		lambd - arrival rate (float)
+		mu - service rate (float)
+		simulation_time - customers arrive until the first arrival after this date (float)
+		chunk_size - number of customers generated at a time (integer)
+		seed - seed of the random number generators (integer, numpy SeedSequence or None)
+		arrivals - a distribution of inter arrival times or an arrival trace
+		(see distributions) in place of the exponential with rate lambd: a
+		trace is replayed from time 0 until it ends or simulation_time
+		services - a distribution of service times in place of the
+		exponential with rate mu
+		gradients - a boolean to also compute the derivatives (the rates
+		are those of the distributions: the mean rate of a trace)
+
+	Output: yields dictionaries mapping each of COLUMNS (and with
+	gradients=True each of GRADIENTS) to an array
+	"""
+	arrival_rng,service_rng=[np.random.default_rng(stream) for stream in substreams(seed,2)]
+	if arrivals is None:
+		arrivals=distributions.Exponential(lambd)
+	if services is None:
+		services=distributions.Exponential(mu)
+	if arrivals.trace:
+		arrival_blocks=arrivals.blocks()
+	else:
+		first_size=int(min(chunk_size,2*arrivals.rate*simulation_time+64))
+		arrival_blocks=(arrivals.sample(arrival_rng,size) for size in chain([first_size],repeat(chunk_size)))
+	arrival_date=0.0
+	service_end_date=0.0
+	if gradients:
+		arrival_rate=arrivals.rate
+		service_rate=services.rate
+
+		#derivatives of the wait and of the service time of the last customer of the previous block
+		last_wait={'lambda':0.0,'mu':0.0}
+		last_service={'lambda':0.0,'mu':0.0}
+	customers=0
+	while arrival_date<simulation_time:
+
+		#draw (or read) a whole block of inter arrival and service times
+		inter_arrival_times=next(arrival_blocks,None)
+		if inter_arrival_times is None:
+			break
+		service_times=services.sample(service_rng,len(inter_arrival_times))
+		arrival_dates=arrival_date+np.cumsum(inter_arrival_times)
+
+		#only keep customers up to the first arrival after the end of the simulation
+		last=np.searchsorted(arrival_dates,simulation_time)
+		if last<len(arrival_dates):
+			arrival_dates=arrival_dates[:last+1]
+			inter_arrival_times=inter_arrival_times[:last+1]
+			service_times=service_times[:last+1]
+
+		#Lindley recursion in array form
+		first_wait=max(0.0,service_end_date-arrival_dates[0])
+		X=np.empty(len(arrival_dates))
+		X[0]=0.0
+		np.cumsum(service_times[:-1]-inter_arrival_times[1:],out=X[1:])
+		waits=X-np.minimum.accumulate(np.minimum(X,-first_wait))
+
+		service_start_dates=arrival_dates+waits
+		service_end_dates=service_start_dates+service_times
+		chunk={
+			'Customer':np.arange(customers+1,customers+len(arrival_dates)+1),
+			'Arrival_Date':arrival_dates,
+			'Wait':waits,
+			'Service_Start_Date':service_start_dates,
+			'Service_Time':service_times,
+			'Service_End_Date':service_end_dates,
+		}
+
+		#infinitesimal perturbation analysis along the same recursion
+		if gradients:
+			running_min=np.minimum.accumulate(X)
+			indices=np.arange(len(X))
+			start=np.maximum.accumulate(np.where(X==running_min,indices,0))
+			carried=-first_wait<=running_min
+			for parameter,d_inter_arrival_times,d_service_times in [
+				('lambda',-inter_arrival_times/arrival_rate,np.zeros(len(X))),
+				('mu',np.zeros(len(X)),-service_times/service_rate)]:
+				dX=np.empty(len(X))
+				dX[0]=0.0
+				np.cumsum(d_service_times[:-1]-d_inter_arrival_times[1:],out=dX[1:])
+				d_first_wait=last_wait[parameter]+last_service[parameter]-d_inter_arrival_times[0] if first_wait>0 else 0.0
+				d_waits=np.where(carried,dX+d_first_wait,dX-dX[start])
+				chunk['dWait_d'+parameter]=d_waits
+				chunk['dTime_In_System_d'+parameter]=d_waits+d_service_times
+				last_wait[parameter]=d_waits[-1]
+				last_service[parameter]=d_service_times[-1]
+		yield chunk
+
+		customers+=len(arrival_dates)
+		arrival_date=arrival_dates[-1]
+		service_end_date=service_end_dates[-1]
+
+
+def lindley(lambd,mu,simulation_time,chunk_size=2**20,seed=None,arrivals=None,services=None,gradients=False):
+	"""
+	Simulate an MM1 queue with the vectorised Lindley recursion and return the full data set.
+
+	Arguments: as for lindley_chunks
+
+	Output: a dictionary mapping each of COLUMNS (and with gradients=True
+	each of GRADIENTS) to an array (one entry per customer)
+	"""
+	chunks=list(lindley_chunks(lambd,mu,simulation_time,chunk_size,seed,arrivals,services,gradients))
+	return dict((column,np.concatenate([chunk[column] for chunk in chunks])) for column in COLUMNS+(GRADIENTS if gradients else []))
 
-#----------------------------------
-#The actual simulation happens here:
-	while t<simulation_time:
 
-		#calculate arrival date and service time for new customer
-		if len(Customers)==0:
-			arrival_date=neg_exp(lambd)
-			service_start_date=arrival_date
+class Trace_Writer:
+	"""
+	Non-interactive, chunked export of the full data set.
+
+	With format='npy' path is a directory holding one .npy file per column
+	(Customer.npy, Arrival_Date.npy, ...): each block of customers is appended
+	to the column files as raw binary and the .npy headers are rewritten with
+	the final number of customers when the writer is closed, so the files can
+	be read (or memory-mapped) with numpy.load. With format='csv' path is a
+	csv file with the same columns and one row per customer.
+	"""
+	def __init__(self,path,format='npy'):
+		self.path=path
+		self.format=format
+		self.count=0
+		if format=='npy':
+			if not os.path.isdir(path):
+				os.makedirs(path)
+			self.files=dict((column,open(os.path.join(path,column+'.npy'),'wb')) for column in COLUMNS)
+			for column in COLUMNS:
+				self.write_header(column)
+		elif format=='csv':
+			self.file=open(path,'w')
+			self.file.write(','.join(COLUMNS)+'\n')
 		else:
-			arrival_date+=neg_exp(lambd)
-			service_start_date=max(arrival_date,Customers[-1].service_end_date)
-		service_time=neg_exp(mu)
+			raise ValueError("format must be 'npy' or 'csv'")
 
-		#create new customer
-		Customers.append(Customer(arrival_date,service_start_date,service_time))
+	def write_header(self,column):
+		"""
+		Write (or rewrite) the .npy header of a column with the current number of customers.
+		"""
+		f=self.files[column]
+		f.seek(0)
+		np.lib.format.write_array_header_1_0(f,{'descr':np.lib.format.dtype_to_descr(DTYPES[column]),'fortran_order':False,'shape':(self.count,)})
 
-		#increment clock till next end of service
-		t=arrival_date
-#----------------------------------
+	def write(self,chunk):
+		"""
+		Append a block of customers (a dictionary mapping each of COLUMNS to an array).
+		"""
+		if self.format=='npy':
+			for column in COLUMNS:
+				np.ascontiguousarray(chunk[column],dtype=DTYPES[column]).tofile(self.files[column])
+		else:
+			np.savetxt(self.file,np.column_stack([chunk[column] for column in COLUMNS]),delimiter=',',fmt=['%d']+['%.17g']*(len(COLUMNS)-1))
+		self.count+=len(chunk['Customer'])
+
+	def close(self):
+		"""
+		Finish the export (the .npy headers are given the final number of customers).
+		"""
+		if self.format=='npy':
+			for column in COLUMNS:
+				self.write_header(column)
+				self.files[column].close()
+		else:
+			self.file.close()
+
+
+def chunk_statistics(chunks,writer=None,quantiles=False,gradients=False):
+	"""
+	Update summary statistics with blocks of customers (each block can be
+	dropped once it has been used, so memory does not depend on the number
+	of customers).
+
+	Arguments:
+		chunks - an iterable of blocks of customers (as yielded by lindley_chunks)
+		writer - an optional Trace_Writer that every block is also written to
+		quantiles - a boolean to also sketch the distributions of the waits and
+		times in system (QuantileSketch: bounded memory, mergeable)
+		gradients - a boolean to also average the derivatives of the blocks
+		(see lindley_chunks: the blocks must carry GRADIENTS)
+
+	Output: a dictionary with the number of customers, a RunningStat for each
+	of the waits, times in system and service times, and the utilisation (and
+	with quantiles=True 'Sketches': a dictionary mapping 'Wait' and
+	'Time_In_System' to a QuantileSketch, with gradients=True 'Gradients': a
+	dictionary mapping each of GRADIENTS to a (mean, half width of its 95%
+	confidence interval) tuple, the half width from batch means)
+	"""
+	Waits=RunningStat()
+	Total_Times=RunningStat()
+	Service_Times=RunningStat()
+	Sketches={'Wait':QuantileSketch(),'Time_In_System':QuantileSketch()}
+	Derivatives=dict((name,RunningStat()) for name in GRADIENTS)
+	Derivative_Batches=dict((name,BatchMeans()) for name in GRADIENTS)
+	t=0.0
+	for chunk in chunks:
+		Waits.update_array(chunk['Wait'])
+		Total_Times.update_array(chunk['Service_End_Date']-chunk['Arrival_Date'])
+		Service_Times.update_array(chunk['Service_Time'])
+		if quantiles:
+			Sketches['Wait'].update_array(chunk['Wait'])
+			Sketches['Time_In_System'].update_array(chunk['Service_End_Date']-chunk['Arrival_Date'])
+		if gradients:
+			for name in GRADIENTS:
+				Derivatives[name].update_array(chunk[name])
+				Derivative_Batches[name].update_array(chunk[name])
+		if writer is not None:
+			writer.write(chunk)
+
+		#clock stops at the last arrival
+		t=chunk['Arrival_Date'][-1]
+	Statistics={
+		'Customers':Waits.count,
+		'Wait':Waits,
+		'Time_In_System':Total_Times,
+		'Service_Time':Service_Times,
+		'Utilisation':Service_Times.total()/t,
+	}
+	if quantiles:
+		Statistics['Sketches']=Sketches
+	if gradients:
+		Statistics['Gradients']=dict((name,(Derivatives[name].mean,Derivative_Batches[name].halfwidth())) for name in GRADIENTS)
+	return Statistics
+
+
+def streaming_statistics(lambd,mu,simulation_time,chunk_size=2**20,seed=None,writer=None,quantiles=False,arrivals=None,services=None,gradients=False):
+	"""
+	Simulate an MM1 queue and update summary statistics as customers are
+	generated, without keeping any customer in memory (memory does not depend
+	on the number of customers).
+
+	Arguments: as for lindley_chunks, an optional Trace_Writer and quantiles
+	(as for chunk_statistics)
 
-	#calculate summary statistics
-	Waits=[a.wait for a in Customers]
-	Mean_Wait=sum(Waits)/len(Waits)
+	Output: as for chunk_statistics
+	"""
+	return chunk_statistics(lindley_chunks(lambd,mu,simulation_time,chunk_size,seed,arrivals,services,gradients),writer,quantiles,gradients)
 
-	Total_Times=[a.wait+a.service_time for a in Customers]
-	Mean_Time=sum(Total_Times)/len(Total_Times)
 
-	Service_Times=[a.service_time for a in Customers]
-	Mean_Service_Time=sum(Service_Times)/len(Service_Times)
+def sequential_statistics(lambd,mu,wait=False,cost=False,confidence=0.95,warmup=0,max_time=None,chunk_size=2**14,seed=None,writer=None,quantiles=False,arrivals=None,services=None,gradients=False):
+	"""
+	Simulate an MM1 queue until the confidence intervals for the mean wait
+	and/or the mean cost (the time in system: nobody balks) are precise
+	enough. The variance of each mean is estimated online with batch means
+	(customers are correlated) and the targets are checked after every block
+	of customers, so the run stops within chunk_size customers of the
+	target being met. The queue must be stable (a ValueError is raised if
+	the arrival rate is not below the service rate) and the run stops with
+	a warning if the targets are not met by max_time.
 
-	Utilisation=sum(Service_Times)/t
+	Arguments:
+		lambd - arrival rate (float)
+		mu - service rate (float)
+		wait - target relative half width of the mean wait (float, False for no target)
+		cost - target relative half width of the mean time in system (float, False for no target)
+		confidence - level of the confidence intervals (float)
+		warmup - customers arriving before this date are left out of the intervals (float)
+		max_time - the run stops at this date even if the targets are not met
+		(float, by default the date by which MAX_CUSTOMERS customers are
+		expected)
+		chunk_size, seed, writer, quantiles, arrivals, services, gradients - as for streaming_statistics
+
+	Output: as for chunk_statistics, and 'Stopping_Date' (the last arrival),
+	'Converged' (a boolean), 'Intervals' (a dictionary mapping 'Wait' and
+	'Time_In_System' to a (mean, half width) tuple) and the BatchMeans of
+	both series
+	"""
+	if not wait and not cost:
+		raise ValueError("a target is needed for the mean wait or the mean cost")
+	arrival_rate=lambd if arrivals is None else arrivals.rate
+	service_rate=mu if services is None else services.rate
+	if arrival_rate>=service_rate:
+		raise ValueError("the queue is unstable (rho=%s>=1): the confidence intervals would never reach their targets" %(arrival_rate/service_rate))
+	if max_time is None:
+		max_time=MAX_CUSTOMERS/arrival_rate
+	Batches={'Wait':BatchMeans(),'Time_In_System':BatchMeans()}
+	targets=[(name,target) for name,target in [('Wait',wait),('Time_In_System',cost)] if target]
+	state={'Converged':False,'Stopping_Date':0.0}
+
+	#hand blocks to chunk_statistics until the targets are met
+	def chunks():
+		for chunk in lindley_chunks(lambd,mu,max_time,chunk_size,seed,arrivals,services,gradients):
+			keep=chunk['Arrival_Date']>=warmup
+			Batches['Wait'].update_array(chunk['Wait'][keep])
+			Batches['Time_In_System'].update_array((chunk['Service_End_Date']-chunk['Arrival_Date'])[keep])
+			state['Stopping_Date']=chunk['Arrival_Date'][-1]
+			yield chunk
+			if all(Batches[name].relativehalfwidth(confidence)<=target for name,target in targets):
+				state['Converged']=True
+				return
+
+	Statistics=chunk_statistics(chunks(),writer,quantiles,gradients)
+	Statistics['Stopping_Date']=state['Stopping_Date']
+	Statistics['Converged']=state['Converged']
+	Statistics['Intervals']=dict((name,(Batches[name].mean(),Batches[name].halfwidth(confidence))) for name in Batches)
+	Statistics['Batch_Means']=Batches
+	if not state['Converged']:
+		sys.stderr.write("Warning: the targets were not met by the last arrival (%s): the intervals are those reached\n" %state['Stopping_Date'])
+	return Statistics
+
+
+def QSim(lambd=False,mu=False,simulation_time=False,seed=None,trace=False,output=False,precision=False,quantiles=False,arrivals=None,services=None,gradients=False):
+	"""
+	This is the main function to call to simulate an MM1 queue.
+
+	By default only running statistics are kept (constant memory). Pass
+	trace=True to keep (and return) the full data set. Pass output='npy' or
+	output='csv' to export the full data set as it is generated (see
+	Trace_Writer): this does not need trace=True. Pass precision (a relative
+	half width, e.g. 0.05) to run until the 95% confidence interval of the mean
+	wait is that precise rather than for a fixed time (simulation_time, if
+	given, is then an upper limit, otherwise about MAX_CUSTOMERS customers:
+	see sequential_statistics). Pass
+	quantiles=True to also print percentiles of the waits and times in system
+	(from bounded memory sketches: see chunk_statistics). Pass arrivals and
+	services (see distributions) for general inter arrival and service times
+	or to replay an arrival trace (which runs until the trace ends if no
+	simulation_time is given). Pass gradients=True to also print the
+	derivatives of the mean wait and mean time in system with respect to the
+	arrival and service rates, estimated from the same run (see
+	lindley_chunks).
+	"""
+
+	#If parameters are not input prompt
+	if not lambd and arrivals is None:
+		lambd=float(input('Inter arrival rate: '))
+	if not mu and services is None:
+		mu=float(input('Service rate: '))
+	if arrivals is not None and arrivals.trace and not simulation_time:
+		simulation_time=float('inf')
+	if not simulation_time and not precision:
+		simulation_time=float(input('Total simulation time: '))
+	if arrivals is not None:
+		lambd='trace' if arrivals.trace else arrivals.rate
+	if services is not None:
+		mu=services.rate
+
+	#export the full data set
+	writer=None
+	if output:
+		name='MM1Q-output-(%s,%s,%s)' %(lambd,mu,simulation_time or 'precision=%s' %precision)
+		if output=='csv':
+			name+='.csv'
+		writer=Trace_Writer(name,output)
+
+#----------------------------------
+#The actual simulation happens here:
+	if precision:
+		Customers=None
+		Statistics=sequential_statistics(lambd,mu,wait=precision,max_time=simulation_time or None,seed=seed,writer=writer,quantiles=quantiles,arrivals=arrivals,services=services,gradients=gradients)
+	elif trace:
+		Customers=lindley(lambd,mu,simulation_time,seed=seed,arrivals=arrivals,services=services,gradients=gradients)
+		Statistics=chunk_statistics([Customers],writer,quantiles,gradients)
+	else:
+		Customers=None
+		Statistics=streaming_statistics(lambd,mu,simulation_time,seed=seed,writer=writer,quantiles=quantiles,arrivals=arrivals,services=services,gradients=gradients)
+	Waits=Statistics['Wait']
+	Total_Times=Statistics['Time_In_System']
+	Service_Times=Statistics['Service_Time']
+	Utilisation=Statistics['Utilisation']
+#----------------------------------
+	if writer is not None:
+		writer.close()
 
 	#output summary statistics to screen
-	print ""
-	print "Summary results:"
-	print ""
-	print "Number of customers: ",len(Customers)
-	print "Mean Service Time: ",Mean_Service_Time
-	print "Mean Wait: ",Mean_Wait
-	print "Mean Time in System: ",Mean_Time
-	print "Utilisation: ",Utilisation
-	print ""
-
-	#prompt user to output full data set to csv
-	if input("Output data to csv (True/False)? "):
-		outfile=open('MM1Q-output-(%s,%s,%s).csv' %(lambd,mu,simulation_time),'wb')
-		output=csv.writer(outfile)
-		output.writerow(['Customer','Arrival_Date','Wait','Service_Start_Date','Service_Time','Service_End_Date'])
-		i=0
-		for customer in Customers:
-			i=i+1
-			outrow=[]
-			outrow.append(i)
-			outrow.append(customer.arrival_date)
-			outrow.append(customer.wait)
-			outrow.append(customer.service_start_date)
-			outrow.append(customer.service_time)
-			outrow.append(customer.service_end_date)
-			output.writerow(outrow)
-		outfile.close()
-	print ""
-	return
+	print("")
+	print("Summary results:")
+	print("")
+	print("Number of customers: ",Waits.count)
+	print("Mean Service Time: ",Service_Times.mean)
+	print("Mean Wait: ",Waits.mean)
+	print("Variance of Wait: ",Waits.variance())
+	print("Mean Time in System: ",Total_Times.mean)
+	print("Variance of Time in System: ",Total_Times.variance())
+	print("Utilisation: ",Utilisation)
+	if precision:
+		Mean,Half_Width=Statistics['Intervals']['Wait']
+		print("Stopping date: ",Statistics['Stopping_Date'])
+		print("Target met: ",Statistics['Converged'])
+		print("95% confidence interval of the mean wait: ",Mean,"+/-",Half_Width)
+	if quantiles:
+		for name,label in [('Wait','Wait'),('Time_In_System','Time in System')]:
+			Percentiles=Statistics['Sketches'][name].percentiles()
+			print("Percentiles of %s: " %label,", ".join("p%s=%.4f" %(p,Percentiles[p]) for p in sorted(Percentiles)))
+	if gradients:
+		for name,label in [('Wait','Mean Wait'),('Time_In_System','Mean Time in System')]:
+			for parameter in ['lambda','mu']:
+				Derivative,Half_Width=Statistics['Gradients']['d%s_d%s' %(name,parameter)]
+				print("Derivative of %s with respect to %s: " %(label,parameter),Derivative,"+/-",Half_Width)
+	if writer is not None:
+		print("Full data set written to: ",writer.path)
+	print("")
+	return Customers
@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+"""
+Library to benchmark the hot paths of the simulations over a ladder of problem sizes and utilisations.
+
+Each benchmark returns the number of events (or customers, calls, values...) that it processed so that results are reported as events per second. Every benchmark is timed on its own and then run again under tracemalloc for its peak memory. Results can be saved as a json baseline and later runs checked against that baseline for regressions.
+
+- BENCHMARKS (the benchmarks: a dictionary mapping names to functions);
+- measure (times a benchmark and measures its peak memory);
+- runbenchmarks (runs benchmarks over a ladder of sizes and utilisations);
+- save, load and compare (baselines).
+"""
+from __future__ import division  # Simplify division
+from time import perf_counter
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sys  # Use to write to out
+import tempfile
+import tracemalloc
+import MM1Q
+import headlessMM1
+import distributions
+
+def qsim(size, rho):
+    """
+    Benchmark of the vectorised MM1Q simulation (streaming statistics, as used by QSim without its printing): about size customers.
+    """
+    return MM1Q.streaming_statistics(rho, 1, size / rho, seed=0)['Customers']
+
+def qsimgg1(size, rho):
+    """
+    Benchmark of the vectorised MM1Q simulation with general times (gamma interarrival times and lognormal service times): about size customers.
+    """
+    return MM1Q.streaming_statistics(None, None, size / rho, seed=0, arrivals=distributions.Gamma(1 / rho, 0.5), services=distributions.Lognormal(1, 2))['Customers']
+
+def sim(size, rho):
+    """
+    Benchmark of Sim.run (headless) with basic players: about size customers (arrivals and ends of service are both events).
+    """
+    q = headlessMM1.Sim(size / rho, rho, 1, seed=0)
+    q.run()
+    return 2 * len(q.completed) + len(q.queue) + len(q.server)
+
+def simwithbalkers(size, rho):
+    """
+    Benchmark of Sim.run (headless) with selfish and optimal players.
+    """
+    q = headlessMM1.Sim(size / rho, rho, 1, costofbalking=[0.5, 5], seed=0)
+    q.run()
+    return 2 * len(q.completed) + len(q.balked) + len(q.queue) + len(q.server)
+
+def simbuffered(size, rho):
+    """
+    Benchmark of Sim.run (headless) with selfish and optimal players drawing their variates from BufferedStreams.
+    """
+    q = headlessMM1.Sim(size / rho, rho, 1, costofbalking=[0.5, 5], streams=headlessMM1.BufferedStreams(0))
+    q.run()
+    return 2 * len(q.completed) + len(q.balked) + len(q.queue) + len(q.server)
+
+def naorthreshold(size, rho):
+    """
+    Benchmark of naorthreshold: size calls with distinct costs of balking (the cache is emptied first).
+    """
+    headlessMM1.naorthresholdcache.clear()
+    for k in range(size):
+        headlessMM1.naorthreshold(rho, 1, 1 + k / 10)
+    return size
+
+def movingaverage(size, rho):
+    """
+    Benchmark of movingaverage (weighted) over size values.
+    """
+    rng = random.Random(0)
+    values = [rng.randint(0, 10) for k in range(size)]
+    weights = [rng.random() for k in range(size)]
+    headlessMM1.movingaverage(values, weights)
+    return size
+
+def collectdata(size, rho):
+    """
+    Benchmark of collectdata: size calls, the queue changing between calls so that every call is recorded.
+    """
+    q = headlessMM1.Sim(size, rho, 1)
+    player = q.newplayer()
+    for k in range(size):
+        if k % 2:
+            q.queue.pop(0)
+        else:
+            q.queue.join(player)
+        q.collectdata(k)
+    return size
+
+def printsummary(size, rho):
+    """
+    Benchmark of printsummary (with selfish and optimal players) after a run of about size customers: the events are the records summarised.
+    """
+    q = headlessMM1.Sim(size / rho, rho, 1, costofbalking=[0.5, 5], seed=0)
+    q.run()
+    stdout = sys.stdout
+    sys.stdout = io.StringIO()
+    try:
+        start = perf_counter()
+        q.printsummary(warmup=0)
+    finally:
+        sys.stdout = stdout
+    return len(q.recorder) + len(q.completed) + len(q.balked), perf_counter() - start  # The run itself is not timed
+
+def csvexport(size, rho):
+    """
+    Benchmark of the csv export of MM1Q (Trace_Writer) of about size customers.
+    """
+    directory = tempfile.mkdtemp()
+    try:
+        writer = MM1Q.Trace_Writer(os.path.join(directory, 'trace.csv'), 'csv')
+        results = MM1Q.streaming_statistics(rho, 1, size / rho, seed=0, writer=writer)
+        writer.close()
+    finally:
+        shutil.rmtree(directory)
+    return results['Customers']
+
+def npyexport(size, rho):
+    """
+    Benchmark of the npy export of MM1Q (Trace_Writer) of about size customers.
+    """
+    directory = tempfile.mkdtemp()
+    try:
+        writer = MM1Q.Trace_Writer(os.path.join(directory, 'trace'), 'npy')
+        results = MM1Q.streaming_statistics(rho, 1, size / rho, seed=0, writer=writer)
+        writer.close()
+    finally:
+        shutil.rmtree(directory)
+    return results['Customers']
+
+BENCHMARKS = {'qsim': qsim, 'qsimgg1': qsimgg1, 'sim': sim, 'simwithbalkers': simwithbalkers, 'simbuffered': simbuffered, 'naorthreshold': naorthreshold,
+              'movingaverage': movingaverage, 'collectdata': collectdata, 'printsummary': printsummary,
+              'csvexport': csvexport, 'npyexport': npyexport}  # Benchmarks: function(size, rho) returning the number of events (or the number of events and the time to count, when only part of the work is timed)
+
+def measure(function, size, rho, repeats=3):
+    """
+    Function to time a benchmark (best of repeats) and measure its peak memory (a further run under tracemalloc).
+
+    Arguments:
+        function - a benchmark
+        size - the size of the problem (integer)
+        rho - the utilisation (float)
+        repeats - the number of timed runs (integer)
+
+    Output: a dictionary with the number of events, the time (seconds), the events per second and the peak memory (bytes)
+    """
+    best = None
+    for k in range(repeats):
+        start = perf_counter()
+        events = function(size, rho)
+        seconds = perf_counter() - start
+        if type(events) is tuple:
+            events, seconds = events
+        if best is None or seconds < best:
+            best = seconds
+    tracemalloc.start()
+    try:
+        function(size, rho)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'events': events, 'seconds': best, 'eventspersecond': events / best if best > 0 else float('inf'), 'peakmemory': peak}
+
+def runbenchmarks(names=None, sizes=(10**3, 10**4, 10**5), utilisations=(0.5, 0.9), repeats=3, verbose=True):
+    """
+    Function to run benchmarks over a ladder of sizes and utilisations.
+
+    Arguments:
+        names - the benchmarks to run (list of keys of BENCHMARKS, by default all of them)
+        sizes - the sizes of the problems (list of integers)
+        utilisations - the utilisations (list of floats)
+        repeats - the number of timed runs of each benchmark (integer)
+        verbose - a boolean to print each result as it is obtained
+
+    Output: a list of dictionaries (one per benchmark, size and utilisation)
+    """
+    if names is None:
+        names = sorted(BENCHMARKS)
+    results = []
+    for name in names:
+        for size in sizes:
+            for rho in utilisations:
+                result = {'benchmark': name, 'size': size, 'utilisation': rho}
+                result.update(measure(BENCHMARKS[name], size, rho, repeats))
+                results.append(result)
+                if verbose:
+                    sys.stdout.write("%-16s size=%-8s rho=%-5s %12.0f events/s %10.1f kB peak\n" % (name, size, rho, result['eventspersecond'], result['peakmemory'] / 1024))
+                    sys.stdout.flush()
+    return results
+
+def save(results, path):
+    """
+    Function to save results as a json baseline (with a description of the machine).
+
+    Arguments: results (list of dictionaries), path (string)
+
+    Output: NA
+    """
+    with open(path, 'w') as f:
+        json.dump({'python': platform.python_version(), 'platform': platform.platform(), 'results': results}, f, indent=1)
+
+def load(path):
+    """
+    Function to read the results of a json baseline.
+
+    Argument: path (string)
+
+    Output: a list of dictionaries
+    """
+    with open(path) as f:
+        return json.load(f)['results']
+
+def compare(results, baseline, tolerance=0.25):
+    """
+    Function to compare results with a baseline.
+
+    Arguments:
+        results, baseline - lists of dictionaries (as returned by runbenchmarks)
+        tolerance - the relative loss of speed (or growth of peak memory) accepted (float)
+
+    Output: a list of strings describing the regressions (empty if there are none)
+    """
+    reference = dict(((result['benchmark'], result['size'], result['utilisation']), result) for result in baseline)
+    regressions = []
+    for result in results:
+        key = (result['benchmark'], result['size'], result['utilisation'])
+        if key not in reference:
+            continue
+        old = reference[key]
+        if result['eventspersecond'] < (1 - tolerance) * old['eventspersecond']:
+            regressions.append("%s size=%s rho=%s: %.0f events/s (baseline: %.0f)" % (key + (result['eventspersecond'], old['eventspersecond'])))
+        if result['peakmemory'] > (1 + tolerance) * old['peakmemory'] and result['peakmemory'] - old['peakmemory'] > 64 * 1024:  # Small absolute changes are noise
+            regressions.append("%s size=%s rho=%s: %.1f kB peak (baseline: %.1f kB)" % (key + (result['peakmemory'] / 1024, old['peakmemory'] / 1024)))
+    return regressions
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Benchmarks of the hot paths of the simulations: events per second and peak memory over a ladder of sizes and utilisations.")
+    parser.add_argument('-b', action="store", dest="names", nargs='+', help='The benchmarks to run (default: all): %s' % ', '.join(sorted(BENCHMARKS)), default=None, choices=sorted(BENCHMARKS))
+    parser.add_argument('-s', action="store", dest="sizes", type=int, nargs='+', help='The sizes of the problems', default=[10**3, 10**4, 10**5])
+    parser.add_argument('-u', action="store", dest="utilisations", type=float, nargs='+', help='The utilisations', default=[0.5, 0.9])
+    parser.add_argument('-n', action="store", dest="repeats", type=int, help='The number of timed runs of each benchmark', default=3)
+    parser.add_argument('-o', action="store", dest="outfile", help='Save the results as a baseline', default=False)
+    parser.add_argument('-c', action="store", dest="baseline", help='Check the results against a baseline', default=False)
+    parser.add_argument('-t', action="store", dest="tolerance", type=float, help='The relative regression accepted by the check', default=0.25)
+    inputs = parser.parse_args()
+    results = runbenchmarks(inputs.names, inputs.sizes, inputs.utilisations, inputs.repeats)
+    if inputs.outfile:
+        save(results, inputs.outfile)
+    if inputs.baseline:
+        regressions = compare(results, load(inputs.baseline), inputs.tolerance)
+        for regression in regressions:
+            sys.stdout.write("Regression: %s\n" % regression)
+        if regressions:
+            sys.exit(1)
+        sys.stdout.write("No regressions against %s\n" % inputs.baseline)
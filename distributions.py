@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+"""
+Library of interarrival and service time distributions for general (G/G/1) queues, sampled in whole blocks with numpy, and of arrival traces read from disk a chunk at a time.
+
+A distribution (or a trace) is used in place of the exponential times of a simulation: MM1Q.lindley_chunks (and QSim) take them as arrivals and services and headlessMM1.BufferedStreams hands their variates out one at a time to the players of headlessMM1.Sim.
+
+- Exponential, Lognormal, Gamma, Deterministic, Empirical (distributions);
+- ArrivalTrace (arrival dates streamed from a large .npy or text file);
+- parse (reads a distribution or a trace from a string such as 'lognormal:1:0.5').
+"""
+from __future__ import division  # Simplify division
+import os
+import numpy as np
+
+class Distribution():
+    """
+    The base class for distributions of times.
+
+    Attributes:
+        - mean: the mean time (float)
+        - rate: 1 / mean (float)
+        - trace: False (times are drawn, not read)
+
+    Methods:
+        - sample: returns an array of times
+        - blocks: generator of blocks of times
+    """
+    trace = False
+
+    def __init__(self, mean):
+        self.mean = mean
+        self.rate = 1 / mean if mean > 0 else float('inf')
+    def sample(self, rng, size):
+        """
+        A method to sample times.
+
+        Arguments: rng (a numpy Generator), size (integer)
+
+        Outputs: an array of size times
+        """
+        raise NotImplementedError
+    def blocks(self, rng, size):
+        """
+        Generator of blocks of size times (for ever).
+        """
+        while True:
+            yield self.sample(rng, size)
+
+class Exponential(Distribution):
+    """
+    Negative exponential times with a given rate (the times of an M/M/1 queue: the same variates as the exponential draws of MM1Q for the same generator).
+    """
+    def __init__(self, rate):
+        Distribution.__init__(self, 1 / rate)
+    def sample(self, rng, size):
+        return rng.exponential(self.mean, size)
+
+class Lognormal(Distribution):
+    """
+    Lognormal times with a given mean and coefficient of variation (standard deviation / mean).
+    """
+    def __init__(self, mean, cv):
+        Distribution.__init__(self, mean)
+        self.cv = cv
+        self.sigma = np.sqrt(np.log(1 + cv ** 2))
+        self.mu = np.log(mean) - self.sigma ** 2 / 2
+    def sample(self, rng, size):
+        return rng.lognormal(self.mu, self.sigma, size)
+
+class Gamma(Distribution):
+    """
+    Gamma times with a given mean and coefficient of variation (cv = 1 is exponential, cv < 1 is less variable as an Erlang distribution).
+    """
+    def __init__(self, mean, cv):
+        if cv <= 0:
+            raise ValueError("the coefficient of variation of a gamma distribution must be positive (see Deterministic)")
+        Distribution.__init__(self, mean)
+        self.cv = cv
+        self.shape = 1 / cv ** 2
+        self.scale = mean * cv ** 2
+    def sample(self, rng, size):
+        return rng.gamma(self.shape, self.scale, size)
+
+class Deterministic(Distribution):
+    """
+    Times that are all equal to a given value (no random numbers are drawn).
+    """
+    def __init__(self, value):
+        Distribution.__init__(self, value)
+    def sample(self, rng, size):
+        return np.full(size, self.mean)
+
+class Empirical(Distribution):
+    """
+    Times drawn (with replacement) from observed values.
+    """
+    def __init__(self, values):
+        self.values = np.asarray(values, dtype=np.float64)
+        if len(self.values) == 0:
+            raise ValueError("an empirical distribution needs at least one value")
+        Distribution.__init__(self, float(self.values.mean()))
+    def sample(self, rng, size):
+        return self.values[rng.integers(0, len(self.values), size)]
+
+class ArrivalTrace():
+    """
+    Arrival dates read from a file a chunk at a time so that traces larger than memory can be replayed: a .npy file (memory-mapped) or a text file with one date per line (or a column of a delimited file). Dates must not decrease. The trace is replayed from time 0: the first arrival is at time 0 and the times between arrivals are those of the trace.
+
+    Attributes:
+        - path: the file
+        - chunk_size: the number of dates read at a time (integer)
+        - column, delimiter, skiprows: for text files, the column of the dates, the delimiter between columns (None: whitespace) and the number of header lines
+        - scale: the dates are multiplied by scale (for example 1 / 60 for dates in seconds and rates per minute)
+        - count: the number of arrivals
+        - rate: the mean arrival rate of the whole trace (the number of arrivals after the first divided by the time from the first to the last, measured once when the trace is opened)
+        - mean: 1 / rate
+        - trace: True
+
+    Methods:
+        - dates: generator of blocks of dates (as in the file)
+        - blocks: generator of blocks of times between arrivals (the first is 0)
+    """
+    trace = True
+
+    def __init__(self, path, chunk_size=2**20, column=0, delimiter=None, skiprows=0, scale=1.0):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.column = column
+        self.delimiter = delimiter
+        self.skiprows = skiprows
+        self.scale = scale
+        self.count, first, last = self.span()
+        if self.count < 2 or last <= first:
+            raise ValueError("an arrival trace needs at least two arrivals at distinct dates: %s has %s arrival(s)%s" % (path, self.count, " at the same date" if self.count >= 2 else ""))
+        self.rate = (self.count - 1) / ((last - first) * scale)
+        self.mean = 1 / self.rate
+    def span(self):
+        """
+        A method to return the number of arrivals and the first and last dates (a .npy file is memory-mapped and only its ends are read, a text file is read once).
+
+        Arguments: NA
+
+        Outputs: a tuple (count, first date, last date), the dates being None if there are no arrivals
+        """
+        if os.path.splitext(self.path)[1] == '.npy':
+            dates = np.load(self.path, mmap_mode='r')
+            if len(dates) == 0:
+                return 0, None, None
+            return len(dates), float(dates[0]), float(dates[-1])
+        count = 0
+        first = last = None
+        for dates in self.dates():
+            if len(dates):
+                first = dates[0] if first is None else first
+                last = dates[-1]
+                count += len(dates)
+        return count, first, last
+    def dates(self):
+        """
+        Generator of blocks of dates (arrays, in the units of the file).
+        """
+        if os.path.splitext(self.path)[1] == '.npy':
+            dates = np.load(self.path, mmap_mode='r')
+            for start in range(0, len(dates), self.chunk_size):
+                yield np.asarray(dates[start:start + self.chunk_size], dtype=np.float64)
+            return
+        with open(self.path) as f:
+            for k in range(self.skiprows):
+                f.readline()
+            while True:
+                lines = f.readlines(16 * self.chunk_size)  # About chunk_size lines
+                if not lines:
+                    return
+                if self.delimiter is None and self.column == 0:
+                    yield np.array(''.join(lines).split(), dtype=np.float64)
+                else:
+                    yield np.array([line.split(self.delimiter)[self.column] for line in lines if line.strip()], dtype=np.float64)
+    def blocks(self, rng=None, size=None):
+        """
+        Generator of blocks of times between arrivals (scaled): the time before the first arrival is 0. The arguments are those of Distribution.blocks and are not used (a trace draws no random numbers).
+        """
+        previous = None
+        for dates in self.dates():
+            if len(dates) == 0:
+                continue
+            if previous is None:
+                previous = dates[0]
+            times = np.diff(dates, prepend=previous) * self.scale
+            if (times < 0).any():
+                raise ValueError("the dates of an arrival trace must not decrease")
+            previous = dates[-1]
+            yield times
+
+def parse(spec):
+    """
+    Function to read a distribution or a trace from a string.
+
+    Argument: spec - 'exponential:rate', 'lognormal:mean:cv', 'gamma:mean:cv', 'deterministic:value', 'empirical:path' (a file of observed times, one per line) or 'trace:path' (a file of arrival dates)
+
+    Output: a Distribution or an ArrivalTrace
+    """
+    name, _, arguments = spec.partition(':')
+    if name == 'trace':
+        return ArrivalTrace(arguments)
+    if name == 'empirical':
+        return Empirical(np.load(arguments) if arguments.endswith('.npy') else np.loadtxt(arguments, ndmin=1))
+    distributions = {'exponential': Exponential, 'lognormal': Lognormal, 'gamma': Gamma, 'deterministic': Deterministic}
+    if name not in distributions:
+        raise ValueError("unknown distribution: %s (expected one of %s, empirical or trace)" % (name, ', '.join(sorted(distributions))))
+    return distributions[name](*[float(argument) for argument in arguments.split(':') if argument])
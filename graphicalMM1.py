@@ -1,398 +1,272 @@
 #!/usr/bin/env python
 """
-Library with some objects that make use of the python Turtle library to show graphics of a discrete event simulation of an MM1 queue (random arrivals and services, a single server).
+Library with some objects that make use of the python Turtle library to show graphics of a discrete event simulation of an MM1 queue (random arrivals and services, a single server by default or several identical servers).
+
+The simulation itself is the headless one (headlessMM1): the players here only add the colour and position that they are drawn with. A Renderer draws the state of the simulation at a fixed frame rate with a fixed number of turtles (one per visible queue slot, one for the server and a few for the last players to leave) so that the animation does not slow down as the queue grows.
 
 There are various objects that allow for the simulation and demonstration of emergent behaviour:
 
 - Player (I use the term player instead of customer as I also allow for the selfish and optimal behaviour: graphical representation: blue coloured dot);
 - SelfishPlayer (inherited from Player: when passed a value of service, a SelfishPlayer will join the queue if and only if it is in their selfish interest: graphical representation: red coloured dot.);
-- OptimalPlayer (uses a result from Naor to ensure that the mean cost is reduced: graphical representation: gold coloured dot.)
+- OptimalPlayer (uses a result from Naor to ensure that the mean cost is reduced: graphical representation: green coloured dot.)
 
 - Queue
 - Server
 
-- Sim (this is the main object that generates all other objects as required).
+- Renderer (draws the queue, the server and the last players to leave);
+
+- Sim (this is the main object that generates all other objects as required);
+- Replay (plays back the event log of a headless run at any speed, with seeking).
 """
 from __future__ import division  # Simplify division
-from turtle import Turtle, mainloop, setworldcoordinates  # Commands needed from Turtle
-from random import expovariate as randexp, random  # Pseudo random number generation
+from turtle import Turtle, mainloop, setworldcoordinates, tracer, update, onkey, listen  # Commands needed from Turtle
+from random import random  # Pseudo random number generation (only used to scatter players that have left)
+from itertools import islice
+from time import time, sleep  # Frame rate of the animation
+from array import array
+from bisect import bisect_left, bisect_right
 import sys  # Use to write to out
+from headlessMM1 import mean, movingaverage, plotwithnobalkers, plotwithbalkers, naorthreshold  # Shared with the headless simulation
+import headlessMM1
 
-def mean(lst):
-    """
-    Function to return the mean of a list.
-
-    Argument: lst - a list of numeric variables
-
-    Output: the mean of lst
-    """
-    if len(lst) > 0:
-        return sum(lst) / len(lst)
-    return False
-
-def movingaverage(lst):
-    """
-    Custom built function to obtain moving average
-
-    Argument: lst - a list of numeric variables
-
-    Output: a list of moving averages
-    """
-    return [mean(lst[:k]) for k in range(1 , len(lst) + 1)]
-
-def plotwithnobalkers(queuelengths, systemstates, timepoints, savefig, string):
-    """
-    A function to plot histograms and timeseries.
-
-    Arguments:
-        - queuelengths (list of integers)
-        - systemstates (list of integers)
-        - timtepoints (list of integers)
-    """
-    try:
-        import matplotlib.pyplot as plt
-    except:
-        sys.stdout.write("matplotlib does not seem to be installed: no  plots can be produced.")
-        return
-
-    plt.figure(1)
-    plt.subplot(221)
-    plt.hist(queuelengths, normed=True, bins=min(20, max(queuelengths)))
-    plt.title("Queue length")
-    plt.subplot(222)
-    plt.hist(systemstates, normed=True, bins=min(20, max(systemstates)))
-    plt.title("System state")
-    plt.subplot(223)
-    plt.plot(timepoints, movingaverage(queuelengths))
-    plt.title("Mean queue length")
-    plt.subplot(224)
-    plt.plot(timepoints, movingaverage(systemstates))
-    plt.title("Mean system state")
-    if savefig:
-        plt.savefig(string)
-    else:
-        plt.show()
-
-def plotwithbalkers(selfishqueuelengths, optimalqueuelengths, selfishsystemstates, optimalsystemstates, timepoints, savefig, string):
-    """
-    A function to plot histograms and timeseries when you have two types of players
-
-    Arguments:
-        - selfishqueuelengths (list of integers)
-        - optimalqueuelengths (list of integers)
-        - selfishsystemstates (list of integers)
-        - optimalsystemstates (list of integers)
-        - timtepoints (list of integers)
-        - savefig (boolean)
-        - string (a string)
-    """
-    try:
-        import matplotlib.pyplot as plt
-    except:
-        sys.stdout.write("matplotlib does not seem to be installed: no  plots can be produced.")
-        return
-    queuelengths = [sum(k) for k in zip(selfishqueuelengths, optimalqueuelengths)]
-    systemstates = [sum(k) for k in zip(selfishsystemstates, optimalsystemstates)]
-    fig = plt.figure(1)
-    plt.subplot(221)
-    plt.hist([selfishqueuelengths, optimalqueuelengths, queuelengths], normed=True, bins=min(20, max(queuelengths)), label=['Selfish players','Optimal players','Total players'], color=['red', 'green', 'blue'])
-    #plt.legend()
-    plt.title("Number in queue")
-    plt.subplot(222)
-    plt.hist([selfishsystemstates, optimalsystemstates, systemstates], normed=True, bins=min(20, max(systemstates)), label=['Selfish players','Optimal players','Total players'], color=['red', 'green', 'blue'])
-    #plt.legend()
-    plt.title("Number in system")
-    plt.subplot(223)
-    plt.plot(timepoints, movingaverage(selfishqueuelengths), label='Selfish players', color='red')
-    plt.plot(timepoints, movingaverage(optimalqueuelengths), label='Optimal players', color='green')
-    plt.plot(timepoints, movingaverage(queuelengths), label='Total', color='blue')
-    #plt.legend()
-    plt.title("Mean number in queue")
-    plt.subplot(224)
-    line1, =  plt.plot(timepoints, movingaverage(selfishsystemstates), label='Selfish players', color='red')
-    line2, = plt.plot(timepoints, movingaverage(optimalsystemstates), label='Optimal players', color='green')
-    line3, = plt.plot(timepoints, movingaverage(systemstates), label='Total', color='blue')
-    #plt.legend()
-    plt.title("Mean number in system")
-    fig.legend([line1,line2,line3],['Selfish players', 'Optimal players', 'Total'],loc='lower center',fancybox=True,ncol=3, bbox_to_anchor=(.5,0))
-    plt.subplots_adjust(bottom=.15)
-    if savefig:
-        plt.savefig(string)
-    else:
-        plt.show()
-
-def naorthreshold(lmbda, mu, costofbalking):
-    """
-    Function to return Naor's threshold for optimal behaviour in an M/M/1 queue. This is taken from Naor's 1969 paper: 'The regulation of queue size by Levying Tolls'
-
-    Arguments:
-        lmbda - arrival rate (float)
-        mu - service rate (float)
-        costofbalking - the value of service, converted to time units. (float)
-
-    Output: A threshold at which optimal customers must no longer join the queue (integer)
+class Player(headlessMM1.Player):
     """
-    n = 0  # Initialise n
-    center = mu * costofbalking  # Center mid point of inequality from Naor's aper
-    rho = lmbda / mu
-    while True:
-        LHS = (n*(1-rho)- rho * (1-rho**n))/((1-rho)**2)
-        RHS = ((n+1)*(1- rho)-rho*(1-rho**(n+1)))/((1-rho)**2)
-        if LHS <= center and center <RHS:
-            return n
-        n += 1  # Continually increase n until LHS and RHS are either side of center
-
-
-class Player(Turtle):
-    """
-    A generic class for our 'customers'. I refer to them as players as I like to consider queues in a game theoretical framework. This class is inherited from the Turtle class so as to have the graphical interface.
-
-    Attributes:
-        lmbda: arrival rate (float)
-        mu: service rate (float)
-        queue: a queue object
-        server: a server object
+    A generic class for our 'customers'. I refer to them as players as I like to consider queues in a game theoretical framework. The behaviour is that of headlessMM1.Player: this class adds the colour and position that the player is drawn with.
 
+    Attributes (on top of those of headlessMM1.Player):
+        colour: the colour of the player (string)
+        position: where the player is drawn (a tuple) once in service or gone (players in the queue are drawn in their queue slot)
 
     Methods:
-        move - move player to a given location
+        look - returns the colour and position of a player of this class after an event (also used to replay event logs)
         arrive - a method to make our player arrive at the queue
         startservice - a method to move our player from the queue to the server
         endservice - a method to complete service
     """
-    def __init__(self, lmbda, mu, queue, server, speed):
+    arrivalcolour = 'blue'
+    balkx = 0  # Where players of this class are drawn when they balk
+    colour = None
+    position = None
+
+    @classmethod
+    def look(cls, event, queueposition, serverposition, jitter=(0, 0)):
         """
+        A method that returns how a player of this class is drawn after an event.
+
         Arguments:
-            lmbda: arrival rate (float)
-            interarrivaltime: a randomly sampled interarrival time (negative exponential for now)
-            mu: service rate (float)
-            service: a randomly sampled service time (negative exponential for now)
-            queue: a queue object
-            shape: the shape of our turtle in the graphics (a circle)
-            server: a server object
-            served: a boolean that indicates whether or not this player has been served.
-            speed: a speed (integer from 0 to 10) to modify the speed of the graphics
-            balked: a boolean indicating whether or not this player has balked (not actually needed for the base Player class... maybe remove... but might be nice to keep here...)
-        """
-        Turtle.__init__(self)  # Initialise all base Turtle attributes
-        self.interarrivaltime = randexp(lmbda)
-        self.lmbda = lmbda
-        self.mu = mu
-        self.queue = queue
-        self.served = False
-        self.server = server
-        self.servicetime = randexp(mu)
-        self.shape('circle')
-        self.speed(speed)
-        self.balked = False
-
-    def move(self, x, y):
-        """
-            A method that moves our player to a given point
-
-            Arguments:
-                x: the x position on the canvas to move the player to
-                y: the y position on the canvas to move the player to.
-
-            Output: NA
-        """
-        self.setx(x)
-        self.sety(y)
+            event - ARRIVAL, BALK, STARTSERVICE or ENDSERVICE
+            queueposition - graphical position of the queue
+            serverposition - graphical position of the server
+            jitter - two numbers between 0 and 1 that scatter the players that have left
+
+        Outputs: a tuple (colour, position)
+        """
+        if event == headlessMM1.ARRIVAL:
+            return cls.arrivalcolour, (queueposition[0] + 5, queueposition[1])
+        if event == headlessMM1.STARTSERVICE:
+            return 'gold', (serverposition[0], serverposition[1])
+        if event == headlessMM1.ENDSERVICE:
+            return 'grey', (serverposition[0] + 50 + jitter[0], serverposition[1] - 50 + jitter[1])
+        return cls.arrivalcolour, (cls.balkx + jitter[0], queueposition[1] - 25 + jitter[1])
 
     def arrive(self, t):
         """
-        A method that make our player arrive (the player is first created to generate an interarrival time, service time etc...).
+        A method that make our player arrive (players of the subclasses may balk).
 
         Arguments: t the time of arrival (a float)
 
         Output: NA
         """
-        self.penup()
-        self.arrivaldate = t
-        self.move(self.queue.position[0] + 5, self.queue.position[1])
-        self.color('blue')
-        self.queue.join(self)
+        super(Player, self).arrive(t)
+        event = headlessMM1.BALK if self.balked else headlessMM1.ARRIVAL
+        self.colour, self.position = self.look(event, self.queue.position, self.server.position, (random(), random()))
 
     def startservice(self, t):
         """
-        A method that makes our player start service (This moves the graphical representation of the player and also make the queue update it's graphics).
+        A method that makes our player start service.
 
         Arguments: t the time of service start (a float)
 
         Output: NA
         """
         if not self.served and not self.balked:
-            self.move(self.server.position[0], self.server.position[1])
-            self.servicedate = t + self.servicetime
-            self.server.start(self)
-            self.color('gold')
-            self.endqueuedate = t
+            super(Player, self).startservice(t)
+            self.colour, self.position = self.look(headlessMM1.STARTSERVICE, self.queue.position, self.server.position)
 
     def endservice(self):
         """
-        A method that makes our player end service (This moves the graphical representation of the player and updates the server to be free).
+        A method that makes our player end service (the player is drawn grey to the side of the server).
 
         Arguments: NA
 
         Output: NA
         """
-        self.color('grey')
-        self.move(self.server.position[0] + 50 + random(), self.server.position[1] - 50 + random())
-        self.server.players = self.server.players[1:]
-        self.endservicedate = self.endqueuedate + self.servicetime
-        self.waitingtime = self.endqueuedate - self.arrivaldate
-        self.served = True
+        super(Player, self).endservice()
+        self.colour, self.position = self.look(headlessMM1.ENDSERVICE, self.queue.position, self.server.position, (random(), random()))
 
-class SelfishPlayer(Player):
+class SelfishPlayer(Player, headlessMM1.SelfishPlayer):
     """
-    A class for a player who acts selfishly (estimating the amount of time that they will wait and comparing to a value of service). The only modification is the arrive method that now allows players to balk.
+    A class for a player who acts selfishly (estimating the amount of time that they will wait and comparing to a value of service). The decision is that of headlessMM1.SelfishPlayer: selfish players are drawn red.
     """
-    def __init__(self, lmbda, mu, queue, server, speed, costofbalking):
-        Player.__init__(self, lmbda, mu, queue, server, speed)
-        self.costofbalking = costofbalking
-    def arrive(self, t):
-        """
-        As described above, this method allows players to balk if the expected time through service is larger than some alternative.
-
-        Arguments: t - time of arrival (a float)
-
-        Output: NA
-        """
-        self.penup()
-        self.arrivaldate = t
-        self.color('red')
-        systemstate = len(self.queue) + len(self.server)
-        if (systemstate + 1) / (self.mu) < self.costofbalking:
-            self.queue.join(self)
-            self.move(self.queue.position[0] + 5, self.queue.position[1])
-        else:
-            self.balk()
-            self.balked = True
-    def balk(self):
-        """
-        Method to make player balk.
-
-        Arguments: NA
+    arrivalcolour = 'red'
 
-        Outputs: NA
-        """
-        self.move(random(), self.queue.position[1] - 25 + random())
-
-class OptimalPlayer(Player):
+class OptimalPlayer(Player, headlessMM1.OptimalPlayer):
     """
-    A class for a player who acts within a socially optimal framework (using the threshold from Naor's paper). The only modification is the arrive method that now allows players to balk and a new attribute for the Naor threshold.
+    A class for a player who acts within a socially optimal framework (using the threshold from Naor's paper). The decision is that of headlessMM1.OptimalPlayer: optimal players are drawn green.
     """
-    def __init__(self, lmbda, mu, queue, server, speed, naorthreshold):
-        Player.__init__(self, lmbda, mu, queue, server, speed)
-        self.naorthreshold = naorthreshold
-    def arrive(self, t):
-        """
-        A method to make player arrive. If more than Naor threshold are present in queue then the player will balk.
-
-        Arguments: t - time of arrival (float)
+    arrivalcolour = 'green'
+    balkx = 10
 
-        Outputs: NA
-        """
-        self.penup()
-        self.arrivaldate = t
-        self.color('green')
-        systemstate = len(self.queue) + len(self.server)
-        if systemstate < self.naorthreshold:
-            self.queue.join(self)
-            self.move(self.queue.position[0] + 5, self.queue.position[1])
-        else:
-            self.balk()
-            self.balked = True
-    def balk(self):
-        """
-        A method to make player balk.
-        """
-        self.move(10 + random(), self.queue.position[1] - 25 + random())
+PLAYERS = [Player, SelfishPlayer, OptimalPlayer]  # The class of each kind of player in event logs
 
-class Queue():
+class Queue(headlessMM1.Queue):
     """
     A class for a queue.
 
     Attributes:
-        players - a list of players in the queue
-        position - graphical position of queue
-
-    Methods:
-        pop - returns first in player from queue and updates queue graphics
-        join - makes a player join the queue
-
+        players - a first in first out queue of players
+        position - graphical position of the head of the queue (later players are drawn to the left)
+        selfish - the number of selfish players in the queue (kept up to date as players join and leave)
     """
     def __init__(self, qposition):
-        self.players = []
+        headlessMM1.Queue.__init__(self)
         self.position = qposition
-    def __iter__(self):
-        return iter(self.players)
-    def __len__(self):
-        return len(self.players)
-    def pop(self, index):
-        """
-        A function to return a player from the queue and update graphics.
 
-        Arguments: index - the location of the player in the queue
+class Server(headlessMM1.Server):
+    """
+    A class for the servers.
 
-        Outputs: returns the relevant player
-        """
-        for p in self.players[:index] + self.players[index + 1:]:  # Shift everyone up one queue spot
-            x = p.position()[0]
-            y = p.position()[1]
-            p.move(x + 10, y)
-        self.position[0] += 10  # Reset queue position for next arrivals
-        return self.players.pop(index)
-    def join(self, player):
-        """
-        A method to make a player join the queue.
+    Attributes:
+        - servers: the number of servers (integer)
+        - busy: a heap of the players in service
+        - position: graphical position of the servers
+        - selfish: the number of selfish players in service
+    """
+    def __init__(self, svrposition, servers=1):
+        headlessMM1.Server.__init__(self, servers)
+        self.position = svrposition
 
-        Arguments: player object
+def canvas():
+    """
+    Function to set the size of the canvas.
 
-        Outputs: NA
-        """
-        self.players.append(player)
-        self.position[0] -= 10
+    Arguments: NA
 
-class Server():
+    Output: the graphical positions of the queue and of the server (lists)
+    """
+    ##################
+    bLx = -10 # This sets the size of the canvas
+    bLy = -110
+    tRx = 230
+    tRy = 5
+    setworldcoordinates(bLx,bLy,tRx,tRy)
+    qposition = [(tRx+bLx)/2, (tRy+bLy)/2]  # The position of the queue
+    ##################
+    return qposition, [qposition[0] + 50, qposition[1]]
+
+class Renderer():
     """
-    A class for the server (this could theoretically be modified to allow for more complex queues than M/M/1)
+    A class that draws the state of a simulation. Turtle is set to only draw when update is called (once per frame) and a fixed number of turtles are used whatever the number of players: each frame the turtles are given the colours and positions of the players they stand for (turtles that have not changed are left alone).
 
     Attributes:
-        - players: list of players in service (at present will be just the one player)
-        - position: graphical position of queue
+        - queueposition: graphical position of the head of the queue
+        - slots: turtles for the first players in the queue (the number of other players in the queue is written instead)
+        - servers: turtles for the players in service (drawn one above the other, the number of players in service is written if they are not all shown)
+        - trail: turtles for the last players to leave (served or balked)
+        - text: a turtle that writes the clock and the length of the queue
 
     Methods:
-        - start: starts the service of a given player
-        - free: a method that returns free if the server is free
+        - show: gives a turtle a colour and a position (or hides it)
+        - draw: draws a frame
     """
-    def __init__(self, svrposition):
-        self.players = []
-        self.position = svrposition
-    def __iter__(self):
-        return iter(self.players)
-    def __len__(self):
-        return len(self.players)
-    def start(self,player):
+    def __init__(self, queueposition, slots=12, servers=1, trail=10):
+        tracer(0, 0)  # Nothing is drawn until update is called
+        self.queueposition = queueposition
+        self.slots = [self.newturtle() for k in range(slots)]
+        self.servers = [self.newturtle() for k in range(servers)]
+        self.trail = [self.newturtle() for k in range(trail)]
+        self.looks = {}  # The last colour and position given to each turtle
+        self.text = Turtle()
+        self.text.hideturtle()
+        self.text.penup()
+        self.text.goto(queueposition[0] - 10 * slots, queueposition[1] + 20)
+        self.written = None
+
+    def newturtle(self):
+        """
+        A method to create a hidden turtle.
+        """
+        turtle = Turtle()
+        turtle.hideturtle()
+        turtle.shape('circle')
+        turtle.penup()
+        return turtle
+
+    def show(self, turtle, colour=None, position=None):
         """
-        A function that starts the service of a player (there is some functionality already in place in case multi server queue ever gets programmed). Moves all graphical stuff.
+        A method to give a turtle a colour and a position (a colour of None hides the turtle).
 
-        Arguments: A player object
+        Arguments: turtle, colour (string), position (tuple)
 
         Outputs: NA
         """
-        self.players.append(player)
-        self.players = sorted(self.players, key = lambda x : x.servicedate)
-        self.nextservicedate =  self.players[0].servicedate
-    def free(self):
-        """
-        Returns True if server is empty.
+        look = None if colour is None else (colour, position[0], position[1])
+        if self.looks.get(turtle) == look:
+            return
+        self.looks[turtle] = look
+        if look is None:
+            turtle.hideturtle()
+            return
+        turtle.color(colour)
+        turtle.goto(position[0], position[1])
+        turtle.showturtle()
+
+    def draw(self, t, queue, queuelength, inservice, left, status=''):
         """
-        return len(self.players) == 0
+        A method to draw a frame (only the players that are shown are passed so the cost of a frame does not depend on the length of the queue).
+
+        Arguments:
+            t - the time (float)
+            queue - the colours of the first players in the queue (list)
+            queuelength - the number of players in the queue (integer)
+            inservice - the colours and positions of the players in service (list of tuples)
+            left - the colours and positions of the last players to leave, oldest first (list of tuples)
+            status - text written after the clock (string)
 
-class Sim():
+        Outputs: NA
+        """
+        for k, turtle in enumerate(self.slots):
+            if k < len(queue):
+                self.show(turtle, queue[k], (self.queueposition[0] + 5 - 10 * k, self.queueposition[1]))
+            else:
+                self.show(turtle)
+        for k, turtle in enumerate(self.servers):
+            if k < len(inservice):
+                colour, position = inservice[k]
+                self.show(turtle, colour, (position[0], position[1] + 10 * (k - (len(self.servers) - 1) / 2)))
+            else:
+                self.show(turtle)
+        left = left[-len(self.trail):]
+        for k, turtle in enumerate(self.trail):
+            if k < len(left):
+                self.show(turtle, *left[k])
+            else:
+                self.show(turtle)
+        text = 't=%.1f queue: %s' % (t, queuelength)
+        if queuelength > len(self.slots):
+            text += ' (%s not shown)' % (queuelength - len(self.slots))
+        if len(inservice) > len(self.servers):
+            text += ' in service: %s' % len(inservice)
+        text += status
+        if text != self.written:
+            self.text.clear()
+            self.text.write(text)
+            self.written = text
+        update()
+
+class Sim(headlessMM1.Sim):
     """
-    The main class for a simulation.
+    The main class for a simulation (the simulation, data handling, summary statistics and plots are those of the headless simulation: this class only adds the animation).
 
     Attributes:
         - costofbalking (by default set to False for a basic simulation). Can be a float (indicating the cost of balking) in which case all players act selfishly. Can also be a list: l. In which case l[0] represents proportion of selfish players (other players being social players). l[1] then indicates cost of balking.
@@ -400,47 +274,33 @@ class Sim():
         - T total run time (float)
         - lmbda: arrival rate (float)
         - mu: service rate (float)
-        - players: list of players (list)
         - queue: a queue object
-        - queuelengthdict: a dictionary that keeps track of queue length at given times (for data handling)
-        - systemstatedict: a dictionary that keeps track of system state at given times (for data handling)
+        - recorder: a run length encoded record of the state of the system (for data handling)
         - server: a server object
-        - speed: the speed of the graphical animation
+        - speed: the simulation time shown per second of animation (float)
+        - fps: the number of frames drawn per second (float)
+        - renderer: a renderer object
+        - progress: a throttled progress reporter
 
     Methods:
-        - run: runs the simulation model
-        - newplayer: generates a new player (that does not arrive until the clock advances past their arrivaldate)
-        - printprogress: print the progress of the simulation to stdout
+        - run: runs the simulation model (a frame at a time)
+        - newplayer: generates a new player
+        - draw: draws the current state
+        - printprogress: print the progress of the simulation to stdout (at most twice a second)
         - collectdata: collects data at time t
         - plot: plots summary graphs
+        - printsummary: prints summary statistics
     """
 
-    def __init__(self, T, lmbda, mu, speed=6, costofbalking=False):
-        ##################
-        bLx = -10 # This sets the size of the canvas (I think that messing with this could increase speed of turtles)
-        bLy = -110
-        tRx = 230
-        tRy = 5
-        setworldcoordinates(bLx,bLy,tRx,tRy)
-        qposition = [(tRx+bLx)/2, (tRy+bLy)/2]  # The position of the queue
-        ##################
-        self.costofbalking = costofbalking
-        self.T = T
-        self.completed = []
-        self.balked = []
-        self.lmbda = lmbda
-        self.mu = mu
-        self.players = []
+    def __init__(self, T, lmbda, mu, speed=6, costofbalking=False, fps=25, slots=12, seed=None, log=False, servers=1, capacity=None, overload=False, warmupdetection=False):
+        qposition, sposition = canvas()
+        headlessMM1.Sim.__init__(self, T, lmbda, mu, costofbalking, seed, log, servers, capacity=capacity, overload=overload, warmupdetection=warmupdetection)
         self.queue = Queue(qposition)
-        self.queuelengthdict = {}
-        self.server = Server([qposition[0] + 50, qposition[1]])
-        self.speed = max(0,min(10,speed))
-        self.naorthreshold = False
-        if type(costofbalking) is list:
-            self.naorthreshold = naorthreshold(lmbda, mu, costofbalking[1])
-        else:
-            self.naorthreshold = naorthreshold(lmbda, mu, costofbalking)
-        self.systemstatedict = {}
+        self.server = Server(sposition, servers)
+        self.speed = speed
+        self.fps = fps
+        self.renderer = Renderer(qposition, slots, min(servers, 8))
+        self.progress = headlessMM1.Progress(0.5)
 
     def newplayer(self):
         """
@@ -448,18 +308,30 @@ class Sim():
 
         Arguments: NA
 
+        Outputs: the new player
+        """
+        if not self.costofbalking:
+            return Player(self.lmbda, self.mu, self.queue, self.server, self.rng)
+        if type(self.costofbalking) is list:
+            if self.rng.random() < self.costofbalking[0]:
+                return SelfishPlayer(self.lmbda, self.mu, self.queue, self.server, self.costofbalking[1], self.rng)
+            return OptimalPlayer(self.lmbda, self.mu, self.queue, self.server, self.naorthreshold, self.rng)
+        return SelfishPlayer(self.lmbda, self.mu, self.queue, self.server, self.costofbalking, self.rng)
+
+    def draw(self, t):
+        """
+        A method to draw the current state of the simulation.
+
+        Arguments: t (float)
+
         Outputs: NA
         """
-        if len(self.players) == 0:
-            if not self.costofbalking:
-                self.players.append(Player(self.lmbda, self.mu, self.queue, self.server,self.speed))
-            elif type(self.costofbalking) is list:
-                if random() < self.costofbalking[0]:
-                    self.players.append(SelfishPlayer(self.lmbda, self.mu, self.queue, self.server,self.speed, self.costofbalking[1]))
-                else:
-                    self.players.append(OptimalPlayer(self.lmbda, self.mu, self.queue, self.server,self.speed, self.naorthreshold))
-            else:
-                self.players.append(SelfishPlayer(self.lmbda, self.mu, self.queue, self.server,self.speed, self.costofbalking))
+        trail = len(self.renderer.trail)
+        left = self.completed[-trail:] + self.balked[-trail:]
+        left.sort(key=lambda player: player.endservicedate if player.served else player.arrivaldate)
+        self.renderer.draw(t, [player.colour for player in islice(self.queue, len(self.renderer.slots))], len(self.queue),
+                           [(player.colour, player.position) for player in self.server],
+                           [(player.colour, player.position) for player in left])
 
     def printprogress(self, t):
         """
@@ -469,220 +341,195 @@ class Sim():
 
         Outputs: NA
         """
-        sys.stdout.write('\r%.2f%% of simulation completed (t=%s of %s)' % (100 * t/self.T, t, self.T))
-        sys.stdout.flush()
+        self.progress.report(t, self.T, force=t >= self.T)
 
     def run(self):
         """
-        The main method which runs the simulation. This will collect relevant data throughout the simulation so that if matplotlib is installed plots of results can be accessed. Furthermore all completed players can be accessed in self.completed.
+        The main method which runs the simulation. Each frame the events of the next speed / fps units of time are carried out and the state is drawn (frames are skipped when drawing falls behind). The data collected is the same as for the headless simulation so that if matplotlib is installed plots of results can be accessed. Furthermore all completed players can be accessed in self.completed.
 
         Arguments: NA
 
         Outputs: NA
         """
+        self.collectdata(0)
+        self.schedule(0, headlessMM1.ARRIVAL, self.newplayer())  # The first player arrives at time 0
+        if self.monitor is not None:
+            self.checkstability()
         t = 0
-        self.newplayer()  # Create a new player
-        nextplayer = self.players.pop()  # Set this player to be the next player
-        nextplayer.arrive(t)  # Make the next player arrive for service (potentially at the queue)
-        nextplayer.startservice(t)  # This player starts service immediately
-        self.newplayer()  # Create a new player that is now waiting to arrive
+        frame = 1 / self.fps
+        nextframe = time()
         while t < self.T:
-            t += 1
-            self.printprogress(t)  # Output progress to screen
-            # Check if service finishes
-            if not self.server.free() and t > self.server.nextservicedate:
-                self.completed.append(self.server.players[0]) # Add completed player to completed list
-                self.server.players[0].endservice()  # End service of a player in service
-                if len(self.queue)>0:  # Check if there is a queue
-                    nextservice = self.queue.pop(0)  # This returns player to go to service and updates queue.
-                    nextservice.startservice(t)
-                    self.newplayer()
-            # Check if player that is waiting arrives
-            if t > self.players[-1].interarrivaltime + nextplayer.arrivaldate:
-                nextplayer = self.players.pop()
-                nextplayer.arrive(t)
-                if nextplayer.balked:
-                    self.balked.append(nextplayer)
-                if self.server.free():
-                    if len(self.queue) == 0:
-                        nextplayer.startservice(t)
-                    else:  # Check if there is a queue
-                        nextservice = self.queue.pop(0)  # This returns player to go to service and updates queue.
-                        nextservice.startservice(t)
-            self.newplayer()
-            self.collectdata(t)
-
-    def collectdata(self,t):
-        """
-        Collect data at each time step: updates data dictionaries.
+            t = min(self.T, t + self.speed * frame)
+            self.advance(t)
+            if self.checkoverload(t):
+                self.T = t  # The last frame is drawn and the run stops
+            nextframe += frame
+            if time() < nextframe or t >= self.T:  # Only draw when on time
+                self.draw(t)
+                self.printprogress(t)
+            delay = nextframe - time()
+            if delay > 0:
+                sleep(delay)
+            else:
+                nextframe = time()  # Do not try to catch up after a slow frame
 
-        Arguments: t (float)
+def jitter(number):
+    """
+    Function to return a fixed scatter for a player of an event log (so that a player is drawn at the same place however the replay gets to it).
 
-        Outputs: NA
-        """
-        if self.costofbalking:
-            selfishqueuelength = len([k for k in self.queue if type(k) is SelfishPlayer])
-            self.queuelengthdict[t] = [selfishqueuelength,len(self.queue) - selfishqueuelength]
-            if self.server.free():
-                self.systemstatedict[t] = [0,0]
-            else:
-                self.systemstatedict[t] = [self.queuelengthdict[t][0] + len([p for p in self.server.players if type(p) is SelfishPlayer]),self.queuelengthdict[t][1] + len([p for p in self.server.players if type(p) is OptimalPlayer])]
-        else:
-            self.queuelengthdict[t] = len(self.queue)
-            if self.server.free():
-                self.systemstatedict[t] = 0
+    Argument: number - the number of the player (integer)
+
+    Output: a tuple of two numbers between 0 and 1
+    """
+    return ((number * 0.6180339887) % 1, (number * 0.7548776662) % 1)
+
+class Replay():
+    """
+    A class to play back the event log of a simulation (see headlessMM1.Sim and headlessMM1.EventLog) at any speed. The state at any date is found from counts of the events so that playback can seek (jump forward or back) at no cost: Right and Left move forward and back by a tenth of the run, Up and Down double and halve the speed and space pauses.
+
+    Attributes:
+        - log: an event log
+        - speed: the simulation time shown per second of animation (float)
+        - fps: the number of frames drawn per second (float)
+        - t: the current date of the playback (float)
+        - paused: a boolean
+        - joined: the numbers, in order, of the players that joined the queue
+        - joinedkinds: the kinds of the players that joined the queue
+        - endat: the positions in the log of the ends of service of the players that joined the queue
+        - counts: for each number of events the numbers of players that have joined the queue, started service and ended service (arrays)
+        - leaving: the positions in the log of the balks and ends of service
+        - renderer: a renderer object
+
+    Methods:
+        - state: returns what to draw at a given date
+        - seek: moves the playback to a date
+        - faster, slower, pause, forward, back: the actions of the keys
+        - play: plays the log back
+    """
+    def __init__(self, log, speed=6, fps=25, slots=12):
+        self.log = log
+        self.speed = speed
+        self.fps = fps
+        self.t = 0
+        self.paused = False
+        self.queueposition, self.serverposition = canvas()
+        self.joined = array('l')
+        self.joinedkinds = array('b')
+        self.endat = array('l')
+        self.counts = dict((event, array('l', [0])) for event in (headlessMM1.ARRIVAL, headlessMM1.STARTSERVICE, headlessMM1.ENDSERVICE))
+        self.leaving = array('l')
+        joined = started = ended = servers = 0
+        for k, (event, player) in enumerate(zip(log.events, log.players)):
+            if event == headlessMM1.ARRIVAL:
+                self.joined.append(player)
+                self.joinedkinds.append(log.kinds[k])
+                self.endat.append(len(log))  # Until the end of service is read
+                joined += 1
+            elif event == headlessMM1.BALK:
+                self.joined.pop()  # The player that just arrived did not join
+                self.joinedkinds.pop()
+                self.endat.pop()
+                joined -= 1
+                self.leaving.append(k)
+            elif event == headlessMM1.STARTSERVICE:
+                started += 1
             else:
-                self.systemstatedict[t] = self.queuelengthdict[t] + 1
-
-    def plot(self, savefig, warmup=0):
-        """
-        Plot the data
-        """
-        string = "lmbda=%s-mu=%s-T=%s-cost=%s.pdf" % (self.lmbda, self.mu, self.T, self.costofbalking) # An identifier
-        if self.costofbalking:
-            selfishqueuelengths = []
-            optimalqueuelengths = []
-            selfishsystemstates = []
-            optimalsystemstates = []
-            timepoints = []
-            for t in self.queuelengthdict:
-                if t >= warmup:
-                    selfishqueuelengths.append(self.queuelengthdict[t][0])
-                    optimalqueuelengths.append(self.queuelengthdict[t][1])
-                    selfishsystemstates.append(self.systemstatedict[t][0])
-                    optimalsystemstates.append(self.systemstatedict[t][1])
-                    timepoints.append(t)
-            plotwithbalkers(selfishqueuelengths, optimalqueuelengths, selfishsystemstates, optimalsystemstates, timepoints, savefig, string)
-        else:
-            queuelengths = []
-            systemstates = []
-            timepoints = []
-            for t in self.queuelengthdict:
-                if t >= warmup:
-                    queuelengths.append(self.queuelengthdict[t])
-                    systemstates.append(self.systemstatedict[t])
-                    timepoints.append(t)
-            plotwithnobalkers(queuelengths, systemstates, timepoints, savefig, string)
-
-    def printsummary(self, warmup=0):
-        """
-        A method to print summary statistics.
+                ended += 1
+                self.endat[bisect_left(self.joined, player)] = k  # Players are numbered in order of arrival
+                self.leaving.append(k)
+            servers = max(servers, started - ended)
+            self.counts[headlessMM1.ARRIVAL].append(joined)
+            self.counts[headlessMM1.STARTSERVICE].append(started)
+            self.counts[headlessMM1.ENDSERVICE].append(ended)
+        self.end = log.dates[-1] if len(log) else 0
+        self.renderer = Renderer(self.queueposition, slots, min(max(servers, 1), 8))
+
+    def state(self, t):
         """
-        if not self.costofbalking:
-            self.queuelengths = []
-            self.systemstates = []
-            for t in self.queuelengthdict:
-                if t >= warmup:
-                    self.queuelengths.append(self.queuelengthdict[t])
-                    self.systemstates.append(self.systemstatedict[t])
-            self.meanqueuelength = mean(self.queuelengths)
-            self.meansystemstate = mean(self.systemstates)
-            self.waitingtimes = []
-            self.servicetimes = []
-            for p in self.completed:
-                if p.arrivaldate >= warmup:
-                    self.waitingtimes.append(p.waitingtime)
-                    self.servicetimes.append(p.servicetime)
-            self.meanwaitingtime = mean(self.waitingtimes)
-            self.meansystemtime = mean(self.servicetimes) + self.meanwaitingtime
-            sys.stdout.write("\n%sSummary statistics%s\n" % (10*"-",10*"-"))
-            sys.stdout.write("Mean queue length: %.02f\n" % self.meanqueuelength)
-            sys.stdout.write("Mean system state: %.02f\n" % self.meansystemstate)
-            sys.stdout.write("Mean waiting time: %.02f\n" % self.meanwaitingtime)
-            sys.stdout.write("Mean system time: %.02f\n" % self.meansystemtime)
-            sys.stdout.write(39 * "-" + "\n")
-        else:
-
-            self.selfishqueuelengths = []
-            self.optimalqueuelengths = []
-            self.selfishsystemstates = []
-            self.optimalsystemstates = []
-            for t in self.queuelengthdict:
-                if t >= warmup:
-                    self.selfishqueuelengths.append(self.queuelengthdict[t][0])
-                    self.optimalqueuelengths.append(self.queuelengthdict[t][1])
-                    self.selfishsystemstates.append(self.systemstatedict[t][0])
-                    self.optimalsystemstates.append(self.systemstatedict[t][1])
-            self.meanselfishqueuelength = mean(self.selfishqueuelengths)
-            self.meanoptimalqueuelength = mean(self.optimalqueuelengths)
-            self.meanqueuelength = mean([sum(k) for k in zip(self.selfishqueuelengths, self.optimalqueuelengths)])
-            self.meanselfishsystemstate = mean(self.selfishsystemstates)
-            self.meanoptimalsystemstate = mean(self.optimalsystemstates)
-            self.meansystemstate = mean([sum(k) for k in zip(self.selfishsystemstates, self.optimalsystemstates)])
-
-            self.selfishwaitingtimes = []
-            self.optimalwaitingtimes = []
-            self.selfishservicetimes = []
-            self.optimalservicetimes = []
-            for p in self.completed:
-                if p.arrivaldate >= warmup:
-                    if type(p) is SelfishPlayer:
-                        self.selfishwaitingtimes.append(p.waitingtime)
-                        self.selfishservicetimes.append(p.servicetime)
-                    else:
-                        self.optimalwaitingtimes.append(p.waitingtime)
-                        self.optimalservicetimes.append(p.servicetime)
-            self.meanselfishwaitingtime = mean(self.selfishwaitingtimes)
-            self.meanselfishsystemtime = mean(self.selfishservicetimes) + self.meanselfishwaitingtime
-            self.meanoptimalwaitingtime = mean(self.optimalwaitingtimes)
-            self.meanoptimalsystemtime = mean(self.optimalservicetimes) + self.meanoptimalwaitingtime
-
-            self.selfishprobbalk = 0
-            self.optimalprobbalk = 0
-            for p in self.balked:
-                if p.arrivaldate >= warmup:
-                    if type(p) is SelfishPlayer:
-                        self.selfishprobbalk += 1
-                    else:
-                        self.optimalprobbalk += 1
-
-            self.meanselfishcost = self.selfishprobbalk * self.costofbalking[1] + sum(self.selfishservicetimes) + sum(self.selfishwaitingtimes)
-            self.meanoptimalcost = self.optimalprobbalk * self.costofbalking[1] + sum(self.optimalservicetimes) + sum(self.optimalwaitingtimes)
-            self.meancost = self.meanselfishcost + self.meanoptimalcost
-            if len(self.selfishwaitingtimes) + self.selfishprobbalk != 0:
-                self.meanselfishcost /= self.selfishprobbalk + len(self.selfishwaitingtimes)
-            else:
-                self.meanselfishcost = False
-            if len(self.optimalwaitingtimes) + self.optimalprobbalk != 0:
-                self.meanoptimalcost /= self.optimalprobbalk + len(self.optimalwaitingtimes)
-            else:
-                self.meanselfishcost = False
+        A method to return what is drawn at date t.
 
-            if self.selfishprobbalk + self.optimalprobbalk + len(self.selfishwaitingtimes) + len(self.optimalwaitingtimes) != 0:
-                self.meancost /= self.selfishprobbalk + self.optimalprobbalk + len(self.selfishwaitingtimes) + len(self.optimalwaitingtimes)
-            else:
-                self.meancost = False
+        Arguments: t (float)
 
-            if self.selfishprobbalk + len(self.selfishwaitingtimes) != 0:
-                self.selfishprobbalk /= self.selfishprobbalk + len(self.selfishwaitingtimes)
-            else:
-                self.selfishprobbalk = False
-            if self.optimalprobbalk + len(self.optimalwaitingtimes) != 0:
-                self.optimalprobbalk /= self.optimalprobbalk + len(self.optimalwaitingtimes)
-            else:
-                self.optimalprobbalk = False
+        Outputs: the colours of the first players in the queue, the length of the queue, the colours and positions of the players in service and of the last players to leave
+        """
+        k = bisect_right(self.log.dates, t)  # The number of events up to t
+        joined = self.counts[headlessMM1.ARRIVAL][k]
+        started = self.counts[headlessMM1.STARTSERVICE][k]
+        ended = self.counts[headlessMM1.ENDSERVICE][k]
+        queue = [PLAYERS[kind].look(headlessMM1.ARRIVAL, self.queueposition, self.serverposition)[0]
+                 for kind in self.joinedkinds[started:min(joined, started + len(self.renderer.slots))]]
+        inservice = []
+        i = started
+        while len(inservice) < started - ended:  # Players that started service and had not ended it by the kth event
+            i -= 1
+            if self.endat[i] >= k:
+                inservice.append(PLAYERS[self.joinedkinds[i]].look(headlessMM1.STARTSERVICE, self.queueposition, self.serverposition))
+        inservice.reverse()
+        last = bisect_right(self.leaving, k - 1)
+        left = [PLAYERS[self.log.kinds[j]].look(self.log.events[j], self.queueposition, self.serverposition, jitter(self.log.players[j]))
+                for j in self.leaving[max(0, last - len(self.renderer.trail)):last]]
+        return queue, joined - started, inservice, left
+
+    def seek(self, t):
+        """
+        A method to move the playback to date t (within the log).
+        """
+        self.t = max(0, min(self.end, t))
 
-            sys.stdout.write("\n%sSummary statistics%s\n" % (10*"=",10*"="))
+    def faster(self):
+        """
+        A method to double the speed of the playback.
+        """
+        self.speed *= 2
+    def slower(self):
+        """
+        A method to halve the speed of the playback.
+        """
+        self.speed /= 2
+    def pause(self):
+        """
+        A method to pause (or restart) the playback.
+        """
+        self.paused = not self.paused
+    def forward(self):
+        """
+        A method to move the playback forward by a tenth of the log.
+        """
+        self.seek(self.t + self.end / 10)
+    def back(self):
+        """
+        A method to move the playback back by a tenth of the log.
+        """
+        self.seek(self.t - self.end / 10)
 
-            sys.stdout.write("\n%sSelfish players%s\n" % (13*"-",10*"-"))
-            sys.stdout.write("Mean number in queue: %.02f\n" % self.meanselfishqueuelength)
-            sys.stdout.write("Mean number in system: %.02f\n" % self.meanselfishsystemstate)
-            sys.stdout.write("Mean waiting time: %.02f\n" % self.meanselfishwaitingtime)
-            sys.stdout.write("Mean system time: %.02f\n" % self.meanselfishsystemtime)
-            sys.stdout.write("Probability of balking: %.02f\n" % self.selfishprobbalk)
+    def play(self, start=0, end=None):
+        """
+        The main method which plays the log back from start to end (by default the whole log): the keys can be used to seek, change the speed and pause.
 
-            sys.stdout.write("\n%sOptimal players%s\n" % (13*"-",10*"-"))
-            sys.stdout.write("Mean number in queue: %.02f\n" % self.meanoptimalqueuelength)
-            sys.stdout.write("Mean number in system: %.02f\n" % self.meanoptimalsystemstate)
-            sys.stdout.write("Mean waiting time: %.02f\n" % self.meanoptimalwaitingtime)
-            sys.stdout.write("Mean system time: %.02f\n" % self.meanoptimalsystemtime)
-            sys.stdout.write("Probability of balking: %.02f\n" % self.optimalprobbalk)
+        Arguments: start (float), end (float)
 
-            sys.stdout.write("\n%sOverall mean cost (in time)%s\n" % (9*"-","-"))
-            sys.stdout.write("All players: %.02f\n" % self.meancost)
-            sys.stdout.write("Selfish players: %.02f\n" % self.meanselfishcost)
-            sys.stdout.write("Optimal players: %.02f\n" % self.meanoptimalcost)
-            sys.stdout.write(39 * "=" + "\n")
+        Outputs: NA
+        """
+        for function, key in [(self.forward, 'Right'), (self.back, 'Left'), (self.faster, 'Up'), (self.slower, 'Down'), (self.pause, 'space')]:
+            onkey(function, key)
+        listen()
+        if end is None:
+            end = self.end
+        self.seek(start)
+        frame = 1 / self.fps
+        nextframe = time()
+        while self.t < end or self.paused:
+            if not self.paused:
+                self.t = min(end, self.t + self.speed * frame)
+            nextframe += frame
+            if time() < nextframe or self.t >= end:  # Only draw when on time
+                queue, queuelength, inservice, left = self.state(self.t)
+                self.renderer.draw(self.t, queue, queuelength, inservice, left, ' speed: %s%s' % (self.speed, ' (paused)' if self.paused else ''))
+            delay = nextframe - time()
+            if delay > 0:
+                sleep(delay)
+            else:
+                nextframe = time()  # Do not try to catch up after a pause or a slow frame
 
 
 if __name__ == '__main__':
@@ -693,9 +540,19 @@ if __name__ == '__main__':
     parser.add_argument('-T', action="store", dest="T", type=float, help='The overall simulation time', default=500)
     parser.add_argument('-p', action="store", dest="probofselfish", help='Proportion of selfish players (default: 0)', default=0, type=float)
     parser.add_argument('-c', action="store", dest="costofbalking", help='Cost of balking (default: False)', default=False, type=float)
-    parser.add_argument('-w', action="store", dest="warmuptime", help='Warm up time', default=0, type=float)
+    parser.add_argument('-w', action="store", dest="warmuptime", help="Warm up time (default: 'auto', detected with MSER-5)", default='auto', type=headlessMM1.warmupargument)
     parser.add_argument('-s', action="store", dest="savefig", help='Boolean to save the figure or not', default=False, type=bool)
+    parser.add_argument('-v', action="store", dest="speed", help='Simulation time shown per second of animation', default=10, type=float)
+    parser.add_argument('-f', action="store", dest="fps", help='Frames per second', default=25, type=float)
+    parser.add_argument('-r', action="store_true", dest="replay", help='Run the headless simulation first and then replay it')
+    parser.add_argument('-e', action="store", dest="logfile", help='Replay an event log saved by headlessMM1 (no simulation is run)', default=False)
+    parser.add_argument('-k', action="store", dest="servers", help='Number of servers', default=1, type=int)
+    parser.add_argument('-K', action="store", dest="capacity", help='Capacity: the largest number in the system (default: no limit)', default=None, type=int)
+    parser.add_argument('-o', action="store", dest="overload", help="What to do if the number in the system grows without limit: 'warn' (default) or 'stop' the run", default='warn', choices=['warn', 'stop'])
     inputs = parser.parse_args()
+    if inputs.logfile:
+        Replay(headlessMM1.EventLog.load(inputs.logfile), speed=inputs.speed, fps=inputs.fps).play()
+        sys.exit()
     lmbda = inputs.lmbda
     mu = inputs.mu
     T = inputs.T
@@ -704,7 +561,15 @@ if __name__ == '__main__':
     costofbalking = inputs.costofbalking
     if costofbalking:
         costofbalking = [inputs.probofselfish, inputs.costofbalking]
-    q = Sim(T, lmbda, mu, speed=10, costofbalking=costofbalking)
-    q.run()
-    q.printsummary(warmup=warmup)
+    if inputs.replay:
+        q = headlessMM1.Sim(T, lmbda, mu, costofbalking=costofbalking, log=True, servers=inputs.servers, capacity=inputs.capacity, overload=inputs.overload,
+                            warmupdetection=warmup == 'auto')
+        q.run()
+        q.printsummary(warmup=warmup)
+        Replay(q.log, speed=inputs.speed, fps=inputs.fps).play()
+    else:
+        q = Sim(T, lmbda, mu, speed=inputs.speed, costofbalking=costofbalking, fps=inputs.fps, servers=inputs.servers, capacity=inputs.capacity, overload=inputs.overload,
+                warmupdetection=warmup == 'auto')
+        q.run()
+        q.printsummary(warmup=warmup)
     q.plot(savefig)
@@ -0,0 +1,2089 @@
+#!/usr/bin/env python
+"""
+Library with a headless (no graphics) discrete event simulation of an MM1 queue (random arrivals and services, a single server by default or several identical servers: M/M/c).
+
+This mirrors the objects in graphicalMM1 but does not depend on the python Turtle library. Rather than moving a clock forward one unit at a time the simulation keeps a calendar of future events (a heap ordered by date) and jumps straight from one event to the next so that cost grows with the number of events (and not with the simulation time) and events happen at their exact dates.
+
+- Player (a basic player that always joins the queue);
+- SelfishPlayer (inherited from Player: joins the queue if and only if it is in their selfish interest);
+- OptimalPlayer (uses a result from Naor to ensure that the mean cost is reduced);
+- Streams (separate random number streams for common random numbers and antithetic variates);
+- BufferedStreams (inherited from Streams: the variates are generated in blocks with numpy);
+
+- Queue
+- Server
+- PlayerRecords (a compact record of the players that have left);
+
+- Sim (this is the main object that generates all other objects as required).
+"""
+from __future__ import division  # Simplify division
+from heapq import heappush, heappop, heapify  # The event calendar and the busy servers
+from collections import deque, namedtuple  # First in first out queue, compact records of players
+from itertools import count, chain, repeat  # Tie breaker for simultaneous events, buffered streams, series of observations
+from random import expovariate as randexp, Random  # Pseudo random number generation
+from math import log, ceil  # Inversion of the exponential distribution (Streams), buckets of quantile sketches
+import sys  # Use to write to out
+from array import array  # Compact storage of the state of the system
+from bisect import bisect_left, bisect_right
+import pickle  # Saving event logs
+import json  # Instrumentation reports
+from time import perf_counter  # Instrumentation
+from statistics import NormalDist  # Quantiles for confidence intervals
+
+ARRIVAL = 0  # Event types held in the calendar
+ENDSERVICE = 1
+BALK = 2  # Further event types held in event logs
+STARTSERVICE = 3
+
+def mean(lst):
+    """
+    Function to return the mean of a list.
+
+    Argument: lst - a list of numeric variables
+
+    Output: the mean of lst
+    """
+    if len(lst) > 0:
+        return sum(lst) / len(lst)
+    return False
+
+def ratio(numerator, denominator):
+    """
+    Function to return a ratio (as for mean: False if there is nothing to divide by).
+
+    Arguments: numerator, denominator (numeric variables)
+
+    Output: numerator / denominator or False
+    """
+    if denominator > 0:
+        return numerator / denominator
+    return False
+
+def movingaverage(lst, weights=None):
+    """
+    Custom built function to obtain moving average (the mean of the first k values for every k): running totals are kept so this is linear in the length of lst.
+
+    Arguments:
+        lst - a list of numeric variables
+        weights - an optional list of weights (for example the length of time for which each value holds)
+
+    Output: a list of moving averages
+    """
+    averages = []
+    total = 0
+    totalweight = 0
+    if weights is None:
+        for value in lst:
+            total += value
+            totalweight += 1
+            averages.append(total / totalweight)
+        return averages
+    for value, weight in zip(lst, weights):
+        total += value * weight
+        totalweight += weight
+        averages.append(total / totalweight if totalweight > 0 else value)
+    return averages
+
+def windowedaverage(lst, window, weights=None):
+    """
+    Function to obtain a moving average over a window of the last values (linear in the length of lst).
+
+    Arguments:
+        lst - a list of numeric variables
+        window - the number of values to average over (integer)
+        weights - an optional list of weights (for example the length of time for which each value holds)
+
+    Output: a list of moving averages
+    """
+    if weights is None:
+        weights = [1] * len(lst)
+    averages = []
+    total = 0
+    totalweight = 0
+    for k in range(len(lst)):
+        total += lst[k] * weights[k]
+        totalweight += weights[k]
+        if k >= window:  # Drop the value that leaves the window
+            total -= lst[k - window] * weights[k - window]
+            totalweight -= weights[k - window]
+        averages.append(total / totalweight if totalweight > 0 else lst[k])
+    return averages
+
+def exponentialaverage(lst, alpha):
+    """
+    Function to obtain an exponentially weighted moving average.
+
+    Arguments:
+        lst - a list of numeric variables
+        alpha - the weight given to each new value (float between 0 and 1)
+
+    Output: a list of moving averages
+    """
+    averages = []
+    for value in lst:
+        if averages:
+            averages.append(alpha * value + (1 - alpha) * averages[-1])
+        else:
+            averages.append(value)
+    return averages
+
+def downsample(lst, maxpoints):
+    """
+    Function to thin a long list down to at most maxpoints evenly spaced values (the last value is always kept) so that it can be drawn quickly.
+
+    Arguments:
+        lst - a list
+        maxpoints - the maximum number of values to keep (integer, False to keep everything)
+
+    Output: a list
+    """
+    if not maxpoints or len(lst) <= max(2, maxpoints):
+        return list(lst)
+    step = -(-(len(lst) - 1) // (max(2, maxpoints) - 1))  # Ceiling division
+    thinned = list(lst[:len(lst) - 1:step])
+    thinned.append(lst[-1])
+    return thinned
+
+def plotwithnobalkers(queuelengths, systemstates, timepoints, savefig, string, durations=None, maxpoints=10000):
+    """
+    A function to plot histograms and timeseries.
+
+    Arguments:
+        - queuelengths (list of integers)
+        - systemstates (list of integers)
+        - timtepoints (list of integers)
+        - savefig (boolean)
+        - string (a string)
+        - durations (list of floats: the time for which each value holds, if None every value has the same weight)
+        - maxpoints (the timeseries are downsampled to at most this many points before being drawn, False to draw every point)
+    """
+    try:
+        import matplotlib.pyplot as plt
+    except:
+        sys.stdout.write("matplotlib does not seem to be installed: no  plots can be produced.")
+        return
+
+    plt.figure(1)
+    plt.subplot(221)
+    plt.hist(queuelengths, weights=durations, density=True, bins=max(1, min(20, max(queuelengths))))
+    plt.title("Queue length")
+    plt.subplot(222)
+    plt.hist(systemstates, weights=durations, density=True, bins=max(1, min(20, max(systemstates))))
+    plt.title("System state")
+    plt.subplot(223)
+    timepoints = downsample(timepoints, maxpoints)
+    plt.plot(timepoints, downsample(movingaverage(queuelengths, durations), maxpoints))
+    plt.title("Mean queue length")
+    plt.subplot(224)
+    plt.plot(timepoints, downsample(movingaverage(systemstates, durations), maxpoints))
+    plt.title("Mean system state")
+    if savefig:
+        plt.savefig(string)
+    else:
+        plt.show()
+
+def plotwithbalkers(selfishqueuelengths, optimalqueuelengths, selfishsystemstates, optimalsystemstates, timepoints, savefig, string, durations=None, maxpoints=10000):
+    """
+    A function to plot histograms and timeseries when you have two types of players
+
+    Arguments:
+        - selfishqueuelengths (list of integers)
+        - optimalqueuelengths (list of integers)
+        - selfishsystemstates (list of integers)
+        - optimalsystemstates (list of integers)
+        - timtepoints (list of integers)
+        - savefig (boolean)
+        - string (a string)
+        - durations (list of floats: the time for which each value holds, if None every value has the same weight)
+        - maxpoints (the timeseries are downsampled to at most this many points before being drawn, False to draw every point)
+    """
+    try:
+        import matplotlib.pyplot as plt
+    except:
+        sys.stdout.write("matplotlib does not seem to be installed: no  plots can be produced.")
+        return
+    queuelengths = [sum(k) for k in zip(selfishqueuelengths, optimalqueuelengths)]
+    systemstates = [sum(k) for k in zip(selfishsystemstates, optimalsystemstates)]
+    weights = None if durations is None else [durations] * 3
+    fig = plt.figure(1)
+    plt.subplot(221)
+    plt.hist([selfishqueuelengths, optimalqueuelengths, queuelengths], weights=weights, density=True, bins=max(1, min(20, max(queuelengths))), label=['Selfish players','Optimal players','Total players'], color=['red', 'green', 'blue'])
+    #plt.legend()
+    plt.title("Number in queue")
+    plt.subplot(222)
+    plt.hist([selfishsystemstates, optimalsystemstates, systemstates], weights=weights, density=True, bins=max(1, min(20, max(systemstates))), label=['Selfish players','Optimal players','Total players'], color=['red', 'green', 'blue'])
+    #plt.legend()
+    plt.title("Number in system")
+    timepoints = downsample(timepoints, maxpoints)
+    plt.subplot(223)
+    plt.plot(timepoints, downsample(movingaverage(selfishqueuelengths, durations), maxpoints), label='Selfish players', color='red')
+    plt.plot(timepoints, downsample(movingaverage(optimalqueuelengths, durations), maxpoints), label='Optimal players', color='green')
+    plt.plot(timepoints, downsample(movingaverage(queuelengths, durations), maxpoints), label='Total', color='blue')
+    #plt.legend()
+    plt.title("Mean number in queue")
+    plt.subplot(224)
+    line1, =  plt.plot(timepoints, downsample(movingaverage(selfishsystemstates, durations), maxpoints), label='Selfish players', color='red')
+    line2, = plt.plot(timepoints, downsample(movingaverage(optimalsystemstates, durations), maxpoints), label='Optimal players', color='green')
+    line3, = plt.plot(timepoints, downsample(movingaverage(systemstates, durations), maxpoints), label='Total', color='blue')
+    #plt.legend()
+    plt.title("Mean number in system")
+    fig.legend([line1,line2,line3],['Selfish players', 'Optimal players', 'Total'],loc='lower center',fancybox=True,ncol=3, bbox_to_anchor=(.5,0))
+    plt.subplots_adjust(bottom=.15)
+    if savefig:
+        plt.savefig(string)
+    else:
+        plt.show()
+
+def naorfunction(n, rho):
+    """
+    Function to return the left hand side of the inequality in Naor's paper: (n(1-rho) - rho(1-rho^n)) / (1-rho)^2. This is increasing in n (the difference between n + 1 and n is 1 + rho + ... + rho^n) and tends to n(n+1)/2 as rho tends to 1. The closed form cancels when n(1-rho) is small (near rho = 1 all precision is lost) so the expansion in powers of e = 1 - rho is then summed instead: the sum over k of C(n+1, k+2)(-e)^k, whose terms fall by a factor of at least n|e| / (k+3).
+
+    Arguments:
+        n - a number of players (integer)
+        rho - the traffic intensity lmbda / mu (float)
+
+    Output: a float
+    """
+    e = 1 - rho
+    if n * abs(e) < 1:
+        total = term = n * (n + 1) / 2
+        k = 0
+        while term and abs(term) > 1e-17 * abs(total):  # The terms are 0 from k = n - 1 on
+            term *= -(n - 1 - k) * e / (k + 3)
+            total += term
+            k += 1
+        return total
+    return (n*(1-rho)- rho * (1-rho**n))/((1-rho)**2)
+
+class MSER():
+    """
+    A streaming MSER (marginal standard error rule) warm up detector. Observations are added in order as they are produced and are grouped in batches (of batchsize observations, or of batchsize units of time when observations are weighted by the time for which they hold). The truncation point is the number of batches d (no more than half of them) that minimises the variance of the means of the batches after d divided by the square of their number: the point after which the series is the most stable. When there are more than maxbatches batches, neighbouring batches are merged and batchsize is doubled so that memory does not grow with the length of the series.
+
+    Attributes:
+        - batchsize: the number of observations (or the time) in a batch
+        - maxbatches: the largest number of batches kept
+        - means: the means of the complete batches (list)
+        - dates: the dates at which each batch starts (list)
+        - total, weight, start: the weighted sum and the weight of the batch being filled and the date it started
+
+    Methods:
+        - update: adds an observation
+        - extend: adds a series of observations
+        - truncation: returns the truncation point (a number of batches and a date)
+    """
+    def __init__(self, batchsize=5, maxbatches=2048):
+        self.batchsize = batchsize
+        self.maxbatches = maxbatches
+        self.means = []
+        self.dates = []
+        self.total = 0.0
+        self.weight = 0.0
+        self.start = None
+    def update(self, value, date, weight=1):
+        """
+        A method to add an observation.
+
+        Arguments:
+            value - the observation (float)
+            date - the date of the observation (float)
+            weight - the weight of the observation: 1 for a series of observations or the time for which the value holds for a time weighted series (the observation is then split between batches when it spans their boundary)
+
+        Outputs: NA
+        """
+        while weight > 0:
+            if self.start is None:
+                self.start = date
+            taken = min(weight, self.batchsize - self.weight)
+            self.total += value * taken
+            self.weight += taken
+            weight -= taken
+            date += taken if weight > 0 else 0
+            if self.weight >= self.batchsize:
+                self.means.append(self.total / self.weight)
+                self.dates.append(self.start)
+                self.total = 0.0
+                self.weight = 0.0
+                self.start = None
+                if len(self.means) >= 2 * self.maxbatches:
+                    self.means = [(a + b) / 2 for a, b in zip(self.means[::2], self.means[1::2])]
+                    self.dates = self.dates[::2]
+                    self.batchsize *= 2
+    def extend(self, values, dates, weights=None):
+        """
+        A method to add a series of observations (as update but faster: an observation that falls within the batch being filled is added in place).
+
+        Arguments:
+            values, dates - the observations and their dates (iterables of floats)
+            weights - the weights of the observations (iterable of floats, None for weights of 1)
+
+        Outputs: NA
+        """
+        total, filled, batchsize = self.total, self.weight, self.batchsize
+        for value, date, weight in zip(values, dates, repeat(1) if weights is None else weights):
+            if self.start is not None and filled + weight < batchsize:
+                total += value * weight
+                filled += weight
+            else:
+                self.total, self.weight = total, filled
+                self.update(value, date, weight)
+                total, filled, batchsize = self.total, self.weight, self.batchsize
+        self.total, self.weight = total, filled
+    def truncation(self):
+        """
+        A method to return the MSER truncation point.
+
+        Arguments: NA
+
+        Outputs: a tuple (number of batches to delete, date at which the kept data starts) or (0, False) if there are too few batches
+        """
+        m = len(self.means)
+        if m < 4:
+            return 0, False
+        best, bestd = None, 0
+        total = 0.0
+        squares = 0.0
+        for d in range(m - 1, -1, -1):  # Suffix sums: the batches from d on
+            total += self.means[d]
+            squares += self.means[d] ** 2
+            if d <= m // 2:
+                n = m - d
+                statistic = max(squares - total ** 2 / n, 0) / n ** 2
+                if best is None or statistic <= best:
+                    best, bestd = statistic, d
+        return bestd, self.dates[bestd]
+
+def tquantile(p, df):
+    """
+    Function to return a quantile of Student's t distribution (Cornish-Fisher expansion about the normal quantile: accurate to about 1e-3 for 5 or more degrees of freedom).
+
+    Arguments:
+        p - probability (float)
+        df - degrees of freedom (integer)
+
+    Output: the p quantile (float)
+    """
+    z = NormalDist().inv_cdf(p)
+    return (z + (z**3 + z) / (4 * df) + (5 * z**5 + 16 * z**3 + 3 * z) / (96 * df**2)
+            + (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / (384 * df**3)
+            + (79 * z**9 + 776 * z**7 + 1482 * z**5 - 1920 * z**3 - 945 * z) / (92160 * df**4))
+
+class BatchMeans():
+    """
+    Online batch means: a confidence interval for the mean of a correlated series (waits in a queue) from the means of consecutive batches of observations. Between batches and 2 * batches complete batches are kept: when there are 2 * batches, neighbouring batches are merged and the batch size is doubled, so batches grow with the series (and become nearly independent) while memory stays bounded.
+
+    Attributes:
+        - batches: the least number of batches used for an interval (integer)
+        - batchsize: the number of observations in a batch (integer)
+        - means: the means of the complete batches (list)
+        - total, count: the sum and number of observations of the batch being filled
+
+    Methods:
+        - update: adds an observation
+        - update_array: adds a numpy array of observations
+        - mean: the mean of the complete batches
+        - halfwidth: the half width of the confidence interval for the mean
+        - relativehalfwidth: halfwidth divided by the mean
+    """
+    def __init__(self, batches=32, batchsize=1):
+        self.batches = batches
+        self.batchsize = batchsize
+        self.means = []
+        self.total = 0.0
+        self.count = 0
+    def merge(self):
+        """
+        A method to merge neighbouring batches (when there are 2 * batches of them).
+        """
+        if len(self.means) >= 2 * self.batches:
+            self.means = [(a + b) / 2 for a, b in zip(self.means[::2], self.means[1::2])]
+            self.batchsize *= 2
+    def update(self, value):
+        """
+        A method to add an observation.
+        """
+        self.total += value
+        self.count += 1
+        if self.count == self.batchsize:
+            self.means.append(self.total / self.count)
+            self.total = 0.0
+            self.count = 0
+            self.merge()
+    def update_array(self, values):
+        """
+        A method to add a numpy array of observations (whole batches are averaged at once).
+        """
+        start = 0
+        while start < len(values):
+            if self.count > 0 or len(values) - start < self.batchsize:  # Fill the batch that has been started
+                taken = min(self.batchsize - self.count, len(values) - start)
+                self.total += float(values[start:start + taken].sum())
+                self.count += taken
+                start += taken
+                if self.count == self.batchsize:
+                    self.means.append(self.total / self.count)
+                    self.total = 0.0
+                    self.count = 0
+                    self.merge()
+                continue
+            full = min((len(values) - start) // self.batchsize, 2 * self.batches - len(self.means))  # Whole batches up to the next merge
+            self.means.extend(values[start:start + full * self.batchsize].reshape(full, self.batchsize).mean(axis=1).tolist())
+            start += full * self.batchsize
+            self.merge()
+    def mean(self):
+        """
+        Returns the mean of the complete batches (False if there are none).
+        """
+        return mean(self.means)
+    def halfwidth(self, confidence=0.95):
+        """
+        Returns the half width of the confidence interval for the mean (infinite if there are fewer than batches batches).
+        """
+        m = len(self.means)
+        if m < max(self.batches, 2):
+            return float('inf')
+        average = sum(self.means) / m
+        std = (sum((x - average) ** 2 for x in self.means) / (m - 1)) ** .5
+        return tquantile((1 + confidence) / 2, m - 1) * std / m ** .5
+    def relativehalfwidth(self, confidence=0.95):
+        """
+        Returns the half width of the confidence interval divided by the mean (infinite if the mean is 0 or unknown).
+        """
+        average = self.mean()
+        if not average:
+            return float('inf')
+        return self.halfwidth(confidence) / abs(average)
+
+class QuantileSketch():
+    """
+    A bounded memory sketch of a distribution that returns quantiles to a given relative accuracy (a logarithmic histogram, as DDSketch). A positive value x is counted in bucket k = ceil(log(x) / log(gamma)) with gamma = (1 + accuracy) / (1 - accuracy): every value of the bucket (gamma**(k-1), gamma**k] is within accuracy of 2 * gamma**k / (gamma + 1), which is returned as the quantile. Values at or below minimum (waits of 0) are counted apart. Observations can be weighted (time weighted queue lengths) and sketches with the same accuracy merge exactly by adding their counts so that sketches of parallel replications combine in to the sketch of all of them. If there are more than maxbuckets buckets the lowest ones are collapsed (only the lowest quantiles lose accuracy).
+
+    Attributes:
+        - accuracy: the relative accuracy of the quantiles (float)
+        - minimum: values at or below this are counted as 0 (float)
+        - buckets: a dictionary mapping bucket indices to the weight of their values
+        - zero: the weight of the values at or below minimum
+        - count: the total weight
+
+    Methods:
+        - update: adds an observation
+        - update_array: adds a numpy array of observations (and of weights)
+        - merge: adds the counts of another sketch
+        - quantile: returns a quantile
+        - percentiles: returns several percentiles
+    """
+    def __init__(self, accuracy=0.01, minimum=1e-9, maxbuckets=4096):
+        self.accuracy = accuracy
+        self.minimum = minimum
+        self.maxbuckets = maxbuckets
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.lngamma = log(self.gamma)
+        self.buckets = {}
+        self.zero = 0
+        self.count = 0
+    def collapse(self):
+        """
+        A method to collapse the lowest buckets in to one when there are more than maxbuckets.
+        """
+        if len(self.buckets) > self.maxbuckets:
+            lowest = sorted(self.buckets)[:len(self.buckets) - self.maxbuckets + 1]
+            self.buckets[lowest[-1]] = sum(self.buckets.pop(k) for k in lowest)
+    def update(self, value, weight=1):
+        """
+        A method to add an observation (with a weight).
+        """
+        self.count += weight
+        if value <= self.minimum:
+            self.zero += weight
+            return
+        k = int(ceil(log(value) / self.lngamma))
+        if k in self.buckets:
+            self.buckets[k] += weight
+        else:
+            self.buckets[k] = weight
+            self.collapse()
+    def update_array(self, values, weights=None):
+        """
+        A method to add a numpy array of observations (and an array of weights, by default all 1).
+        """
+        import numpy as np
+        values = np.asarray(values, dtype=np.float64)
+        positive = values > self.minimum
+        if weights is None:
+            self.count += len(values)
+            self.zero += int(len(values) - positive.sum())
+        else:
+            weights = np.asarray(weights, dtype=np.float64)
+            self.count += float(weights.sum())
+            self.zero += float(weights[~positive].sum())
+            weights = weights[positive]
+        if not positive.any():
+            return
+        indices = np.ceil(np.log(values[positive]) / self.lngamma).astype(np.int64)
+        lowest = int(indices.min())
+        counts = np.bincount(indices - lowest, weights=weights)
+        for k in np.flatnonzero(counts).tolist():
+            self.buckets[k + lowest] = self.buckets.get(k + lowest, 0) + counts[k].item()
+        self.collapse()
+    def merge(self, other):
+        """
+        A method to add the counts of another sketch with the same accuracy and minimum.
+
+        Arguments: other (a QuantileSketch)
+
+        Outputs: this sketch
+        """
+        if (other.accuracy, other.minimum) != (self.accuracy, self.minimum):
+            raise ValueError("only sketches with the same accuracy and minimum can be merged")
+        self.count += other.count
+        self.zero += other.zero
+        for k, weight in other.buckets.items():
+            self.buckets[k] = self.buckets.get(k, 0) + weight
+        self.collapse()
+        return self
+    def quantile(self, q):
+        """
+        A method to return the q quantile (q between 0 and 1): the smallest value with more than a proportion q of the weight at or below it.
+
+        Arguments: q (float)
+
+        Outputs: the quantile (float, within accuracy of the value of that rank, False if the sketch is empty)
+        """
+        if self.count <= 0:
+            return False
+        rank = q * self.count
+        cumulative = self.zero
+        if cumulative > rank or not self.buckets:
+            return 0.0
+        keys = sorted(self.buckets)
+        for k in keys:
+            cumulative += self.buckets[k]
+            if cumulative > rank:
+                break
+        return 2 * self.gamma ** k / (self.gamma + 1)
+    def percentiles(self, percentiles=(50, 90, 95, 99)):
+        """
+        A method to return several percentiles.
+
+        Arguments: percentiles (list of numbers between 0 and 100)
+
+        Outputs: a dictionary mapping each percentile to its value
+        """
+        return dict((p, self.quantile(p / 100)) for p in percentiles)
+
+class GrowthMonitor():
+    """
+    Detects sustained growth of the number in the system (an unstable queue, for example rho >= 1 with no capacity and players that never balk). The number in the system is sampled every window units of time and a least squares line is fitted to the last samples: growth is sustained when the slope is more than tolerance * lmbda (a proportion tolerance of the arrivals never leave) for persistence fits in a row.
+
+    Attributes:
+        - lmbda: the arrival rate (float)
+        - window: the time between samples (float, by default the time of 1000 mean interarrival times)
+        - samples: the last samples (a deque of tuples (date, number in the system))
+        - tolerance: the proportion of the arrivals that may stay (float)
+        - persistence: the number of fits in a row that must show growth (integer)
+        - slope: the slope of the last fit (float)
+        - nextsample: the date of the next sample (float)
+
+    Methods:
+        - update: adds a sample and returns whether growth is sustained
+    """
+    def __init__(self, lmbda, window=None, samples=10, tolerance=0.02, persistence=3):
+        self.lmbda = lmbda
+        self.window = window if window is not None else 1000 / lmbda
+        self.samples = deque(maxlen=samples)
+        self.tolerance = tolerance
+        self.persistence = persistence
+        self.growing = 0  # Fits in a row showing growth
+        self.slope = 0.0
+        self.nextsample = 0
+    def update(self, t, number):
+        """
+        A method to add a sample of the number in the system.
+
+        Arguments: t - the date (float), number - the number in the system (integer)
+
+        Outputs: a boolean (True if the growth is sustained)
+        """
+        self.samples.append((t, number))
+        self.nextsample = t + self.window
+        if len(self.samples) < self.samples.maxlen:
+            return False
+        meandate = sum(date for date, n in self.samples) / len(self.samples)
+        meannumber = sum(n for date, n in self.samples) / len(self.samples)
+        spread = sum((date - meandate) ** 2 for date, n in self.samples)
+        self.slope = sum((date - meandate) * (n - meannumber) for date, n in self.samples) / spread if spread > 0 else 0.0
+        self.growing = self.growing + 1 if self.slope > self.tolerance * self.lmbda else 0
+        return self.growing >= self.persistence
+
+def warmupargument(string):
+    """
+    Function to read the warm up time given on the command line: 'auto' (MSER detection) or a number.
+    """
+    if string == 'auto':
+        return string
+    return float(string)
+
+naorthresholdcache = {}  # Thresholds already computed: {(lmbda, mu, costofbalking): threshold} (with the number of servers added to the key when there is more than one)
+
+def knudsenthreshold(lmbda, mu, costofbalking, servers):
+    """
+    Function to return the socially optimal threshold of an M/M/c queue (Knudsen's 1972 extension of Naor's result: 'Individual and social optimization in a multiserver queue with a general cost-benefit structure'). Joining while fewer than n players are present makes the queue an M/M/c/n queue and the threshold is the n that maximises the net benefit per unit of time lmbda * (1 - P(n present)) * costofbalking - L(n) (with L(n) the mean number present). The benefit is unimodal in n so n is increased until the benefit falls (on a tie the player joins, as with naorthreshold; the sign of the change in benefit from n to n + 1 is computed directly: taking the difference of the two benefits loses all precision once the change is small).
+
+    Arguments:
+        lmbda - arrival rate (float)
+        mu - service rate (float)
+        costofbalking - the value of service, converted to time units. (float)
+        servers - the number of servers (integer)
+
+    Output: A threshold at which optimal customers must no longer join the queue (integer)
+    """
+    weight = 1.0  # Unnormalised probability of n players present
+    total = 1.0  # Sum of the weights up to n
+    present = 0.0  # Sum of k times the weights for k up to n
+    n = 0
+    while costofbalking * min(n + 1, servers) * mu * total + present - (n + 1) * total - lmbda * costofbalking * (total - weight) >= 0:  # The benefit does not fall from n to n + 1 (ties join, as with naorthreshold)
+        weight *= lmbda / (min(n + 1, servers) * mu)
+        total += weight
+        present += (n + 1) * weight
+        n += 1
+        if total > 1e200:  # Rescale (only ratios of the weights are used)
+            weight /= total
+            present /= total
+            total = 1.0
+    return n
+
+def naorthreshold(lmbda, mu, costofbalking, servers=1):
+    """
+    Function to return Naor's threshold for optimal behaviour in an M/M/1 queue. This is taken from Naor's 1969 paper: 'The regulation of queue size by Levying Tolls'
+
+    The threshold is the n for which naorfunction(n) <= mu * costofbalking < naorfunction(n + 1). As naorfunction is increasing, n is bracketed by doubling and then found by bisection (O(log n) evaluations) and rho near 1 is handled with a series (see naorfunction). With more than one server the threshold is that of knudsenthreshold. Results are cached.
+
+    Arguments:
+        lmbda - arrival rate (float)
+        mu - service rate (float)
+        costofbalking - the value of service, converted to time units. (float)
+        servers - the number of servers (integer)
+
+    Output: A threshold at which optimal customers must no longer join the queue (integer)
+    """
+    key = (lmbda, mu, costofbalking)
+    if servers != 1:
+        key += (servers,)
+    if key in naorthresholdcache:
+        return naorthresholdcache[key]
+    if servers != 1:
+        naorthresholdcache[key] = knudsenthreshold(lmbda, mu, costofbalking, servers)
+        return naorthresholdcache[key]
+    center = mu * costofbalking  # Center mid point of inequality from Naor's aper
+    rho = lmbda / mu
+    lower = 0  # naorfunction(lower) <= center
+    upper = 1  # center < naorfunction(upper)
+    if center < 0:
+        upper = lower
+    while naorfunction(upper, rho) <= center:  # Double until center is bracketed
+        lower = upper
+        upper *= 2
+    while upper - lower > 1:  # Bisection
+        middle = (lower + upper) // 2
+        if naorfunction(middle, rho) <= center:
+            lower = middle
+        else:
+            upper = middle
+    naorthresholdcache[key] = lower
+    return lower
+
+def naorthresholds(lmbda, mu, costofbalking):
+    """
+    Function to return Naor's thresholds for whole arrays of parameters at once (the bracketing and bisection of naorthreshold are carried out on all entries together). Requires numpy. Results are added to the cache used by naorthreshold.
+
+    Arguments:
+        lmbda - arrival rates (array like)
+        mu - service rates (array like)
+        costofbalking - the values of service, converted to time units (array like)
+
+    Output: an array of thresholds (integers, with the broadcast shape of the arguments)
+    """
+    import numpy as np
+    lmbda, mu, costofbalking = np.broadcast_arrays(*[np.asarray(k, dtype=float) for k in (lmbda, mu, costofbalking)])
+    center = mu * costofbalking
+    rho = lmbda / mu
+    e = 1 - rho
+    safe = np.where(e == 0, 0.5, rho)  # Avoids dividing by zero where the series is used
+
+    def f(n):
+        n = n.astype(float)
+        series = term = n * (n + 1) / 2  # As for naorfunction: a fixed number of terms is enough while n|e| < 1
+        for k in range(20):
+            term = term * -(n - 1 - k) * e / (k + 3)
+            series = series + term
+        return np.where(n * np.abs(e) < 1, series, (n*(1-safe) - safe * (1-safe**n)) / ((1-safe)**2))
+
+    lower = np.zeros(center.shape, dtype=np.int64)
+    upper = np.where(center < 0, 0, 1).astype(np.int64)
+    growing = f(upper) <= center
+    while growing.any():
+        lower = np.where(growing, upper, lower)
+        upper = np.where(growing, 2 * upper, upper)
+        growing = f(upper) <= center
+    while (upper - lower > 1).any():
+        middle = (lower + upper) // 2
+        below = f(middle) <= center
+        lower = np.where(below, middle, lower)
+        upper = np.where(below, upper, middle)
+    for key in zip(lmbda.ravel().tolist(), mu.ravel().tolist(), costofbalking.ravel().tolist(), lower.ravel().tolist()):
+        naorthresholdcache[key[:3]] = key[3]
+    return lower
+
+
+class Streams():
+    """
+    Random number streams for common random numbers: interarrival times, service times and the types of the players each come from a stream of their own. Two simulations given Streams with the same seed see the same arrivals and services whatever their players decide (even if one of them draws types and the other does not), so that the difference between two policies is not swamped by noise. Antithetic streams use 1 - U in place of every uniform U (long interarrival and service times become short ones and the other way round) and can be paired with the streams of the same seed.
+
+    A Streams can be used in place of the random number generator of a Sim (or of a Player).
+
+    Attributes:
+        - arrivals, services, types: the generators of the three streams (Random)
+        - antithetic: a boolean
+
+    Methods:
+        - interarrivaltime: samples an interarrival time
+        - servicetime: samples a service time
+        - random: samples a uniform number from the types stream
+    """
+    def __init__(self, seed=None, antithetic=False):
+        master = Random(seed)
+        self.arrivals = Random(master.getrandbits(128))
+        self.services = Random(master.getrandbits(128))
+        self.types = Random(master.getrandbits(128))
+        self.antithetic = antithetic
+    def uniform(self, stream):
+        """
+        Returns a uniform number in (0, 1] from one of the streams (1 - U, or U for antithetic streams).
+        """
+        u = stream.random()
+        if self.antithetic:
+            return u if u > 0 else 2 ** -53
+        return 1 - u
+    def interarrivaltime(self, lmbda):
+        """
+        Returns an interarrival time (negative exponential with rate lmbda) from the arrivals stream.
+        """
+        return -log(self.uniform(self.arrivals)) / lmbda
+    def servicetime(self, mu):
+        """
+        Returns a service time (negative exponential with rate mu) from the services stream.
+        """
+        return -log(self.uniform(self.services)) / mu
+    def random(self):
+        """
+        Returns a uniform number in [0, 1) from the types stream (used to choose the type of each player).
+        """
+        return 1 - self.uniform(self.types)
+
+class BufferedStreams(Streams):
+    """
+    Streams whose variates are generated in large blocks (with numpy, one generator per stream) and handed out one at a time, so that the cost of drawing a variate in the loop of a simulation is that of taking the next item of a list. The variates only depend on the seed (not on blocksize) and are transformed as for Streams (inversion, antithetic streams use 1 - U). They are not the variates of Streams with the same seed: the generators differ.
+
+    Interarrival and service times can also come from other distributions (see the distributions module: the rates passed by the players are then not used) and arrivals from a trace (the first player arrives at time 0 and the last one is followed by no other).
+
+    Attributes:
+        - generators: the numpy generators of the arrivals, services and types streams (dictionary)
+        - antithetic: a boolean
+        - blocksize: the number of variates generated at a time (integer)
+        - arrivaldistribution, servicedistribution: the distributions of the times (None for exponential times)
+    """
+    def __init__(self, seed=None, antithetic=False, blocksize=2**14, arrivals=None, services=None):
+        import numpy as np
+        self.np = np
+        if antithetic and (arrivals is not None or services is not None):
+            raise ValueError("antithetic streams are only available for exponential times")
+        self.generators = dict(zip(['arrivals', 'services', 'types'], [np.random.default_rng(stream) for stream in np.random.SeedSequence(seed).spawn(3)]))
+        self.antithetic = antithetic
+        self.blocksize = blocksize
+        self.arrivaldistribution = arrivals
+        self.servicedistribution = services
+        self.nextarrival = chain.from_iterable(self.blocks('arrivals', self.exponentials) if arrivals is None else self.timeblocks('arrivals', arrivals)).__next__
+        self.nextservice = chain.from_iterable(self.blocks('services', self.exponentials) if services is None else self.timeblocks('services', services)).__next__
+        self.nextuniform = chain.from_iterable(self.blocks('types', self.uniforms)).__next__
+    def blocks(self, stream, transform):
+        """
+        Generator of the blocks of a stream (lists of variates).
+        """
+        generator = self.generators[stream]
+        while True:
+            yield transform(generator.random(self.blocksize)).tolist()
+    def timeblocks(self, stream, distribution):
+        """
+        Generator of the blocks of a stream of times from a distribution or a trace (lists). The times of a trace are those before each of its arrivals (the first player arrives at time 0 whatever its time) and are infinite once the trace is exhausted.
+        """
+        for block in distribution.blocks(self.generators[stream], self.blocksize):
+            yield block.tolist()
+        for block in repeat([float('inf')]):
+            yield block
+    def exponentials(self, u):
+        """
+        Returns standard negative exponential variates from an array of uniform numbers in [0, 1).
+        """
+        if self.antithetic:
+            return -self.np.log(self.np.maximum(u, 2 ** -53))
+        return -self.np.log1p(-u)
+    def uniforms(self, u):
+        """
+        Returns the uniform numbers of the types stream (1 - U for antithetic streams).
+        """
+        return 1 - u if self.antithetic else u
+    def interarrivaltime(self, lmbda):
+        if self.arrivaldistribution is None:
+            return self.nextarrival() / lmbda
+        return self.nextarrival()
+    def servicetime(self, mu):
+        if self.servicedistribution is None:
+            return self.nextservice() / mu
+        return self.nextservice()
+    def random(self):
+        return self.nextuniform()
+
+class Player(object):
+    """
+    A generic class for our 'customers' (with no graphical representation).
+
+    Attributes:
+        lmbda: arrival rate (float)
+        mu: service rate (float)
+        queue: a queue object
+        server: a server object
+
+    Methods:
+        arrive - a method to make our player arrive at the queue
+        startservice - a method to move our player from the queue to the server
+        endservice - a method to complete service
+    """
+    selfish = False  # Class attribute used to split players by type
+    kind = 0  # The type of player in event logs (0: basic, 1: selfish, 2: optimal)
+
+    def __init__(self, lmbda, mu, queue, server, rng=None):
+        """
+        Arguments:
+            lmbda: arrival rate (float)
+            interarrivaltime: a randomly sampled interarrival time (negative exponential for now)
+            mu: service rate (float)
+            servicetime: a randomly sampled service time (negative exponential for now)
+            queue: a queue object
+            server: a server object
+            served: a boolean that indicates whether or not this player has been served.
+            balked: a boolean indicating whether or not this player has balked
+            rng: a random number generator with an expovariate method or a Streams (by default the random module is used)
+        """
+        if rng is None:
+            self.interarrivaltime = randexp(lmbda)
+            self.servicetime = randexp(mu)
+        elif isinstance(rng, Streams):
+            self.interarrivaltime = rng.interarrivaltime(lmbda)
+            self.servicetime = rng.servicetime(mu)
+        else:
+            self.interarrivaltime = rng.expovariate(lmbda)
+            self.servicetime = rng.expovariate(mu)
+        self.lmbda = lmbda
+        self.mu = mu
+        self.queue = queue
+        self.served = False
+        self.server = server
+        self.balked = False
+
+    def arrive(self, t):
+        """
+        A method that make our player arrive.
+
+        Arguments: t the time of arrival (a float)
+
+        Output: NA
+        """
+        self.arrivaldate = t
+        self.queue.join(self)
+
+    def startservice(self, t):
+        """
+        A method that makes our player start service.
+
+        Arguments: t the time of service start (a float)
+
+        Output: NA
+        """
+        if not self.served and not self.balked:
+            self.servicedate = t + self.servicetime
+            self.server.start(self)
+            self.endqueuedate = t
+
+    def endservice(self):
+        """
+        A method that makes our player end service (updates the server to be free).
+
+        Arguments: NA
+
+        Output: NA
+        """
+        self.server.end(self)
+        self.endservicedate = self.endqueuedate + self.servicetime
+        self.waitingtime = self.endqueuedate - self.arrivaldate
+        self.served = True
+
+    def balk(self):
+        """
+        Method to make player balk.
+
+        Arguments: NA
+
+        Outputs: NA
+        """
+        self.balked = True
+
+class SelfishPlayer(Player):
+    """
+    A class for a player who acts selfishly (estimating the amount of time that they will wait and comparing to a value of service). The only modification is the arrive method that now allows players to balk.
+    """
+    selfish = True
+    kind = 1
+
+    def __init__(self, lmbda, mu, queue, server, costofbalking, rng=None):
+        Player.__init__(self, lmbda, mu, queue, server, rng)
+        self.costofbalking = costofbalking
+
+    def arrive(self, t):
+        """
+        As described above, this method allows players to balk if the expected time through service is larger than some alternative.
+
+        Arguments: t - time of arrival (a float)
+
+        Output: NA
+        """
+        self.arrivaldate = t
+        systemstate = len(self.queue) + len(self.server)
+        servers = self.server.servers
+        expectedtime = 1 / self.mu  # Expected time through service: the expected wait for the systemstate - servers + 1 services ahead (at rate servers * mu) and then the service itself
+        if systemstate >= servers:
+            expectedtime += (systemstate - servers + 1) / (servers * self.mu)
+        if expectedtime < self.costofbalking:
+            self.queue.join(self)
+        else:
+            self.balk()
+
+class OptimalPlayer(Player):
+    """
+    A class for a player who acts within a socially optimal framework (using the threshold from Naor's paper). The only modification is the arrive method that now allows players to balk and a new attribute for the Naor threshold.
+    """
+    kind = 2
+
+    def __init__(self, lmbda, mu, queue, server, naorthreshold, rng=None):
+        Player.__init__(self, lmbda, mu, queue, server, rng)
+        self.naorthreshold = naorthreshold
+
+    def arrive(self, t):
+        """
+        A method to make player arrive. If more than Naor threshold are present in queue then the player will balk.
+
+        Arguments: t - time of arrival (float)
+
+        Outputs: NA
+        """
+        self.arrivaldate = t
+        systemstate = len(self.queue) + len(self.server)
+        if systemstate < self.naorthreshold:
+            self.queue.join(self)
+        else:
+            self.balk()
+
+class Queue():
+    """
+    A class for a queue.
+
+    Attributes:
+        players - a first in first out queue of players
+        selfish - the number of selfish players in the queue (kept up to date as players join and leave)
+
+    Methods:
+        pop - returns first in player from queue
+        join - makes a player join the queue
+    """
+    def __init__(self):
+        self.players = deque()
+        self.selfish = 0
+    def __iter__(self):
+        return iter(self.players)
+    def __len__(self):
+        return len(self.players)
+    def pop(self, index=0):
+        """
+        A function to return a player from the queue.
+
+        Arguments: index - the location of the player in the queue
+
+        Outputs: returns the relevant player
+        """
+        if index == 0:
+            player = self.players.popleft()
+        else:
+            player = self.players[index]
+            del self.players[index]
+        self.selfish -= player.selfish
+        return player
+    def join(self, player):
+        """
+        A method to make a player join the queue.
+
+        Arguments: player object
+
+        Outputs: NA
+        """
+        self.players.append(player)
+        self.selfish += player.selfish
+
+class Server():
+    """
+    A class for the servers (one or more identical servers: M/M/c).
+
+    Attributes:
+        - servers: the number of servers (integer)
+        - busy: a heap of the players in service ordered by the date they end service (date, tie breaker, player) so that starts and ends of service cost O(log servers)
+        - selfish: the number of selfish players in service
+
+    Methods:
+        - start: starts the service of a given player
+        - end: ends the service of a given player
+        - free: a method that returns True if a server is free
+        - nextservicedate: the date of the next end of service
+    """
+    def __init__(self, servers=1):
+        self.servers = servers
+        self.busy = []
+        self.tiebreaker = count()  # Simultaneous ends of service in order of start (as in the calendar)
+        self.selfish = 0
+    def __iter__(self):
+        return (player for _, _, player in self.busy)
+    def __len__(self):
+        return len(self.busy)
+    def start(self, player):
+        """
+        A function that starts the service of a player.
+
+        Arguments: A player object
+
+        Outputs: NA
+        """
+        heappush(self.busy, (player.servicedate, next(self.tiebreaker), player))
+        self.selfish += player.selfish
+    def end(self, player):
+        """
+        A function that ends the service of a player (the player is the first of the heap when ends of service are carried out in date order).
+
+        Arguments: A player object
+
+        Outputs: NA
+        """
+        if self.busy[0][2] is player:
+            heappop(self.busy)
+        else:
+            self.busy = [entry for entry in self.busy if entry[2] is not player]
+            heapify(self.busy)
+        self.selfish -= player.selfish
+    def free(self):
+        """
+        Returns True if a server is free.
+        """
+        return len(self.busy) < self.servers
+    def nextservicedate(self):
+        """
+        Returns the date of the next end of service (False if no server is busy).
+        """
+        if self.busy:
+            return self.busy[0][0]
+        return False
+
+PlayerRecord = namedtuple('PlayerRecord', ['arrivaldate', 'waitingtime', 'servicetime', 'selfish', 'served', 'balked'])  # A player that has left (as read from PlayerRecords)
+
+class PlayerRecords():
+    """
+    A compact record of the players that have left (either all completed or all balked): columns of typed arrays in place of player objects (about 25 bytes a player rather than an object with all of its attributes) for long runs. Players are appended as they leave and read back (by iterating or indexing) as PlayerRecord tuples with the attributes of players that summaries use.
+
+    Attributes:
+        - arrivaldates, waitingtimes, servicetimes: arrays of floats (waiting times of balked players are 0)
+        - kinds: the kinds of the players (array of integers: see Player.kind)
+        - balked: a boolean (records of players that balked rather than completed service)
+
+    Methods:
+        - append: records a player
+    """
+    def __init__(self, balked=False):
+        self.arrivaldates = array('d')
+        self.waitingtimes = array('d')
+        self.servicetimes = array('d')
+        self.kinds = array('b')
+        self.balked = balked
+    def __len__(self):
+        return len(self.arrivaldates)
+    def __iter__(self):
+        served = not self.balked
+        for date, wait, service, kind in zip(self.arrivaldates, self.waitingtimes, self.servicetimes, self.kinds):
+            yield PlayerRecord(date, wait, service, kind == SelfishPlayer.kind, served, self.balked)
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return [self[i] for i in range(*k.indices(len(self)))]
+        return PlayerRecord(self.arrivaldates[k], self.waitingtimes[k], self.servicetimes[k], self.kinds[k] == SelfishPlayer.kind, not self.balked, self.balked)
+    def append(self, player):
+        """
+        A method to record a player that has left.
+
+        Arguments: player
+
+        Outputs: NA
+        """
+        self.arrivaldates.append(player.arrivaldate)
+        self.waitingtimes.append(0.0 if self.balked else player.waitingtime)
+        self.servicetimes.append(player.servicetime)
+        self.kinds.append(player.kind)
+
+class BlockedCounts():
+    """
+    A compact count of the arrivals blocked by a full system (blocked players are counted, not kept): the record of the state (StateRecorder) in which each arrival was blocked, its date and its kind are kept in typed arrays (17 bytes an arrival). The system is full for the whole of that record, so the arrivals blocked after a warm up time are those of the record in effect at that time dated on or after it, and those of the later records.
+
+    Attributes:
+        - records: the index of the record in which each arrival was blocked (array of integers, increasing)
+        - dates: the date of each blocked arrival (array of floats, increasing)
+        - kinds: the kind of each blocked player (array of integers: see Player.kind)
+
+    Methods:
+        - add: counts a blocked arrival
+        - since: returns the numbers of selfish and optimal players blocked from a record and a date on
+    """
+    def __init__(self):
+        self.records = array('l')
+        self.dates = array('d')
+        self.kinds = array('b')
+    def __len__(self):
+        return len(self.dates)
+    def add(self, record, date, kind):
+        """
+        A method to count a blocked arrival.
+
+        Arguments: record - the index of the record of the current state (integer), date - the date of the arrival (float), kind - the kind of the blocked player (integer)
+
+        Outputs: NA
+        """
+        self.records.append(record)
+        self.dates.append(date)
+        self.kinds.append(kind)
+    def since(self, record, date=0):
+        """
+        A method to return the numbers of players blocked from a record on, leaving out those of that record blocked before date.
+
+        Arguments: record - the index of a record (integer), date - a date within that record (float)
+
+        Outputs: a tuple (selfish, optimal) of integers
+        """
+        first = bisect_left(self.dates, date, bisect_left(self.records, record))
+        selfish = sum(1 for kind in self.kinds[first:] if kind == SelfishPlayer.kind)
+        return selfish, len(self.dates) - first - selfish
+
+class StateRecorder():
+    """
+    A compact, run length encoded, record of the state of the system. A row (time, selfish and optimal numbers in the queue, selfish and optimal numbers in the system) is stored in typed arrays only when the state changes (basic players are counted as optimal players).
+
+    Attributes:
+        - timepoints: the dates at which the state changed (array of floats)
+        - selfishqueuelengths, optimalqueuelengths, selfishsystemstates, optimalsystemstates: the state from each of the timepoints (arrays of integers)
+
+    Methods:
+        - record: records the state at a given time
+        - window: returns the records over a time window with the time for which each one holds
+        - timeaverage: returns the time weighted averages of the state over a time window
+    """
+    columns = ['selfishqueuelengths', 'optimalqueuelengths', 'selfishsystemstates', 'optimalsystemstates']
+
+    def __init__(self):
+        self.timepoints = array('d')
+        self.selfishqueuelengths = array('l')
+        self.optimalqueuelengths = array('l')
+        self.selfishsystemstates = array('l')
+        self.optimalsystemstates = array('l')
+        self.last = None  # The last recorded state
+    def __len__(self):
+        return len(self.timepoints)
+    def record(self, t, selfishqueuelength, optimalqueuelength, selfishsystemstate, optimalsystemstate):
+        """
+        A method to record the state of the system at time t (nothing is stored if the state has not changed).
+
+        Arguments: t (float) and the four counts (integers)
+
+        Outputs: NA
+        """
+        state = (selfishqueuelength, optimalqueuelength, selfishsystemstate, optimalsystemstate)
+        if state == self.last:
+            return
+        self.last = state
+        if len(self.timepoints) > 0 and self.timepoints[-1] == t:  # Simultaneous events: only the last state holds
+            self.selfishqueuelengths[-1] = selfishqueuelength
+            self.optimalqueuelengths[-1] = optimalqueuelength
+            self.selfishsystemstates[-1] = selfishsystemstate
+            self.optimalsystemstates[-1] = optimalsystemstate
+            return
+        self.timepoints.append(t)
+        self.selfishqueuelengths.append(selfishqueuelength)
+        self.optimalqueuelengths.append(optimalqueuelength)
+        self.selfishsystemstates.append(selfishsystemstate)
+        self.optimalsystemstates.append(optimalsystemstate)
+    def window(self, start, end):
+        """
+        A method to return the records that hold over [start, end].
+
+        Arguments: start (float), end (float)
+
+        Outputs: a tuple (timepoints, durations, columns) where timepoints are clipped to start, durations are the times for which each record holds within the window and columns is a dictionary mapping each of the columns to a list.
+        """
+        first = max(0, bisect_right(self.timepoints, start) - 1)
+        last = bisect_right(self.timepoints, end)
+        timepoints = [max(t, start) for t in self.timepoints[first:last]]
+        durations = [upper - lower for lower, upper in zip(timepoints, timepoints[1:] + [end])]
+        columns = dict((column, getattr(self, column)[first:last].tolist()) for column in self.columns)
+        return timepoints, durations, columns
+    def timeaverage(self, start, end):
+        """
+        A method to return the time weighted average of each of the columns over [start, end].
+
+        Arguments: start (float), end (float)
+
+        Outputs: a dictionary mapping each of the columns to its average (False if the window is empty)
+        """
+        timepoints, durations, columns = self.window(start, end)
+        total = sum(durations)
+        if total <= 0:
+            return dict((column, False) for column in self.columns)
+        return dict((column, sum(v * d for v, d in zip(columns[column], durations)) / total) for column in self.columns)
+
+class EventLog():
+    """
+    A compact log of the events of a simulation (so that a run can be replayed without being simulated again). One row is stored in typed arrays for each arrival, balk, start of service and end of service.
+
+    Attributes:
+        - dates: the dates of the events (array of floats)
+        - events: the event types (ARRIVAL, BALK, STARTSERVICE or ENDSERVICE)
+        - players: the player concerned (players are numbered in order of arrival)
+        - kinds: the type of the player concerned (0: basic, 1: selfish, 2: optimal)
+        - arrivals: the number of players that have arrived
+
+    Methods:
+        - record: records an event
+        - save: writes the log to a file
+        - load: reads a log from a file
+    """
+    def __init__(self):
+        self.dates = array('d')
+        self.events = array('b')
+        self.players = array('l')
+        self.kinds = array('b')
+        self.arrivals = 0
+    def __len__(self):
+        return len(self.dates)
+    def record(self, t, event, player):
+        """
+        A method to record an event (players are given their number when they arrive).
+
+        Arguments: t (float), event (integer), player
+
+        Outputs: NA
+        """
+        if event == ARRIVAL:
+            player.number = self.arrivals
+            self.arrivals += 1
+        self.dates.append(t)
+        self.events.append(event)
+        self.players.append(player.number)
+        self.kinds.append(player.kind)
+    def save(self, filename):
+        """
+        A method to write the log to a file.
+        """
+        with open(filename, 'wb') as f:
+            pickle.dump(self, f, pickle.HIGHEST_PROTOCOL)
+    @staticmethod
+    def load(filename):
+        """
+        A method to read a log written by save.
+
+        Arguments: filename (string)
+
+        Outputs: an EventLog
+        """
+        with open(filename, 'rb') as f:
+            return pickle.load(f)
+
+class Progress():
+    """
+    A throttled progress reporter: writes the progress of a run to stdout at most once every interval seconds (of wall time) however often it is called.
+
+    Attributes:
+        - interval: the least time between two writes (seconds)
+        - last: the wall time of the last write
+
+    Methods:
+        - report: writes the progress (if interval has passed since the last write)
+    """
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.last = None
+    def report(self, t, T, force=False):
+        """
+        A method to write the progress of a run.
+
+        Arguments: t - the simulation time (float), T - the overall simulation time (float), force - a boolean to write whatever the time since the last write
+
+        Outputs: True if the progress was written
+        """
+        now = perf_counter()
+        if not force and self.last is not None and now - self.last < self.interval:
+            return False
+        self.last = now
+        sys.stdout.write('\r%.2f%% of simulation completed (t=%.2f of %s)' % (100 * t / T, t, T))
+        sys.stdout.flush()
+        return True
+
+class Instrumentation():
+    """
+    Counters and cumulative timings of the parts of a run (used by Sim.run when the simulation is created with instrument=True: otherwise nothing is measured and the run does not pay for it). The event loop of Sim.advance is not changed: the calls that it makes (taking and adding events, the handling of arrivals and services, creating players, collecting data, logging) are replaced on the simulation by timed versions (see hook).
+
+    Attributes:
+        - counts: the number of arrivals, balks, blocked arrivals, starts of service, ends of service, records of the state and events
+        - timings: the cumulative wall time (seconds) spent taking events from and adding events to the calendar, in arrivals (the decision to join or balk), in starting services (including Queue.pop), in ending services, creating players, in collectdata, logging events and reporting progress
+        - progress: a Progress reporter (or None)
+        - checkevery: the number of events between two calls to the progress reporter
+        - wall: the wall time of the runs (seconds)
+
+    Methods:
+        - timed: returns a timed version of a function
+        - hook: times the calls made by the event loop of a simulation
+        - begin, end: called by Sim.advance before and after the events of a step
+        - dump: returns the counters, timings and rates as a dictionary
+        - printreport: prints the dump
+        - save: writes the dump to a json file
+    """
+    sections = ['calendar', 'arrival', 'startservice', 'endservice', 'newplayer', 'collectdata', 'log', 'progress']
+
+    def __init__(self, progress=False, interval=1.0, checkevery=4096):
+        self.counts = dict((key, 0) for key in ['events', 'arrivals', 'balks', 'blocks', 'startservices', 'endservices', 'records'])
+        self.timings = dict((section, 0.0) for section in self.sections)
+        self.progress = Progress(interval) if progress else None
+        self.checkevery = checkevery
+        self.wall = 0.0
+        self.nested = [0.0]  # The time spent in timed calls made by the timed call under way
+    def timed(self, function, section, counter=None):
+        """
+        A method to return a version of a function that adds the time spent in it to a section (less the time spent in the timed functions that it calls, so that sections do not overlap) and counts its calls.
+
+        Arguments: function, section (a key of timings), counter (a key of counts or None)
+
+        Outputs: a function
+        """
+        clock = perf_counter
+        timings = self.timings
+        counts = self.counts
+        nested = self.nested
+        def timedfunction(*args):
+            start = clock()
+            outer = nested[0]
+            nested[0] = 0.0
+            result = function(*args)
+            elapsed = clock() - start
+            timings[section] += elapsed - nested[0]
+            nested[0] = outer + elapsed
+            if counter is not None:
+                counts[counter] += 1
+            return result
+        return timedfunction
+    def hook(self, sim):
+        """
+        A method to time the calls made by the event loop of a simulation: the methods are replaced on the simulation (not on its class) by timed versions, so that simulations without instrumentation run the same loop untimed. The progress is reported after the data is collected (every checkevery events).
+
+        Arguments: sim - a Sim
+
+        Outputs: NA
+        """
+        sim.nextevent = self.timed(sim.nextevent, 'calendar', 'events')
+        sim.schedule = self.timed(sim.schedule, 'calendar')
+        sim.arrival = self.timed(sim.arrival, 'arrival', 'arrivals')
+        sim.startservice = self.timed(sim.startservice, 'startservice', 'startservices')
+        sim.endservice = self.timed(sim.endservice, 'endservice', 'endservices')
+        sim.newplayer = self.timed(sim.newplayer, 'newplayer')
+        collectdata = sim.collectdata
+        if self.progress is not None:
+            report = self.timed(self.progress.report, 'progress')
+            counts = self.counts
+            checkevery = self.checkevery
+            def collectdataandreport(t):
+                collectdata(t)
+                if counts['events'] % checkevery == 0:
+                    report(t, sim.T)
+            sim.collectdata = self.timed(collectdataandreport, 'collectdata')
+        else:
+            sim.collectdata = self.timed(collectdata, 'collectdata')
+        if sim.log is not None:
+            sim.log.record = self.timed(sim.log.record, 'log')
+    def begin(self, sim):
+        """
+        A method to start measuring a step of a run (called by Sim.advance).
+        """
+        self.start = perf_counter()
+        self.before = (len(sim.balked), len(sim.blocked), len(sim.recorder))
+    def end(self, sim, until):
+        """
+        A method to finish measuring a step of a run (called by Sim.advance): players that balked or were blocked and records of the state are counted and the progress is reported at the end of the run.
+        """
+        balked, blocked, records = self.before
+        self.counts['balks'] += len(sim.balked) - balked
+        self.counts['blocks'] += len(sim.blocked) - blocked
+        self.counts['records'] += len(sim.recorder) - records
+        if self.progress is not None and until >= sim.T:  # The end of the run
+            start = perf_counter()
+            self.progress.report(sim.T, sim.T, force=True)
+            sys.stdout.write('\n')
+            self.timings['progress'] += perf_counter() - start
+        self.wall += perf_counter() - self.start
+    def dump(self):
+        """
+        A method to return the measurements of the run.
+
+        Arguments: NA
+
+        Outputs: a dictionary with the counts, the timings (seconds), the share of the wall time of each section, the wall time, the events per second and the time spent per event (microseconds)
+        """
+        events = self.counts['events']
+        return {'counts': dict(self.counts),
+                'timings': dict(self.timings),
+                'shares': dict((section, ratio(self.timings[section], self.wall)) for section in self.sections),
+                'wall': self.wall,
+                'eventspersecond': ratio(events, self.wall),
+                'microsecondsperevent': ratio(1e6 * self.wall, events)}
+    def printreport(self):
+        """
+        A method to print the measurements of the run.
+        """
+        dump = self.dump()
+        sys.stdout.write("\n%sInstrumentation%s\n" % (12*"-",12*"-"))
+        for key in sorted(dump['counts']):
+            sys.stdout.write("%s: %s\n" % (key, dump['counts'][key]))
+        for section in self.sections:
+            sys.stdout.write("%s: %.04fs (%.01f%%)\n" % (section, dump['timings'][section], 100 * (dump['shares'][section] or 0)))
+        sys.stdout.write("Wall time: %.04fs (%.0f events/s)\n" % (dump['wall'], dump['eventspersecond'] or 0))
+        sys.stdout.write(39 * "-" + "\n")
+    def save(self, filename):
+        """
+        A method to write the measurements of the run to a json file.
+        """
+        with open(filename, 'w') as f:
+            json.dump(self.dump(), f, indent=1)
+
+class Sim():
+    """
+    The main class for a headless simulation.
+
+    Attributes:
+        - costofbalking (by default set to False for a basic simulation). Can be a float (indicating the cost of balking) in which case all players act selfishly. Can also be a list: l. In which case l[0] represents proportion of selfish players (other players being social players). l[1] then indicates cost of balking.
+        - naorthreshold (by default set to False for a basic simulation). Can be an integer (calculated using costofbalking, or the threshold argument: to evaluate other thresholds when there is no closed form, see optimisation).
+        - T total run time (float)
+        - lmbda: arrival rate (float)
+        - mu: service rate (float)
+        - queue: a queue object
+        - server: a server object (with servers identical servers)
+        - calendar: a heap of future events (date, tie breaker, event type, player)
+        - recorder: a run length encoded record of the state of the system (for data handling)
+        - rng: the random number generator of this simulation (seeded with the seed argument so that runs can be reproduced, or the streams argument: a Streams for common random numbers)
+        - log: an event log of the run (only kept if the log argument is True, otherwise None)
+        - instrumentation: counters and timings of the run (only kept if the instrument argument is True, otherwise None)
+        - completed, balked: the players that completed service and that balked (lists, or PlayerRecords if the compact argument is True)
+        - capacity: the largest number in the system (M/M/c/K, None for no limit): players arriving to a full system are blocked
+        - blocked: the counts of the players that were blocked (BlockedCounts: blocked players are counted, not kept)
+        - overload: what to do when the number in the system grows without limit (False: nothing, 'warn': write a warning, 'stop': write a warning and stop the run)
+        - monitor: a growth monitor (None if overload is False)
+        - overloaded: the date at which sustained growth was detected (False if it was not)
+        - warmupdetectors: MSER detectors of the warm up of the number in the queue and of the waits, fed as the run goes (None unless the warmupdetection argument is True: runs with a known warm up time do not pay for them, and a warm up of 'auto' needs them)
+
+    Methods:
+        - run: runs the simulation model
+        - advance: carries out the events up to a given date
+        - arrival, startservice, endservice: carry out an event
+        - stable: whether the configuration is stable
+        - checkoverload: samples the number in the system for the growth monitor
+        - runtoprecision: runs the simulation model until confidence intervals are precise enough
+        - printintervals: prints the intervals reached by runtoprecision
+        - newplayer: generates a new player
+        - schedule: adds an event to the calendar
+        - collectdata: collects data at time t
+        - plot: plots summary graphs
+        - waitseries: returns the waits of the players that completed service
+        - feedwarmup: hands the data produced so far to the warm up detectors
+        - detectwarmup: detects the warm up time (MSER-5)
+        - resolvewarmup: returns the warm up time to use
+        - playertotals: totals the players that arrived after a warm up time
+        - summarise: computes summary statistics
+        - printsummary: prints summary statistics
+        - quantilesketches: sketches the distributions of the waiting times, system times and numbers in the queue
+        - printpercentiles: prints percentiles of these distributions
+    """
+
+    metrics = ['meanqueuelength', 'meansystemstate', 'meanwaitingtime', 'meansystemtime',
+               'meanselfishqueuelength', 'meanselfishsystemstate', 'meanselfishwaitingtime', 'meanselfishsystemtime', 'selfishprobbalk',
+               'meanoptimalqueuelength', 'meanoptimalsystemstate', 'meanoptimalwaitingtime', 'meanoptimalsystemtime', 'optimalprobbalk',
+               'meancost', 'meanselfishcost', 'meanoptimalcost', 'probblock']  # Names of the statistics returned by summarise
+
+    def __init__(self, T, lmbda, mu, costofbalking=False, seed=None, log=False, servers=1, instrument=False, progress=False, streams=None,
+                 capacity=None, compact=False, overload=False, threshold=None, warmupdetection=False):
+        self.rng = streams if streams is not None else Random(seed)
+        self.costofbalking = costofbalking
+        self.T = T
+        self.completed = PlayerRecords() if compact else []
+        self.balked = PlayerRecords(balked=True) if compact else []
+        self.capacity = capacity
+        self.blocked = BlockedCounts()
+        self.overload = overload
+        self.monitor = GrowthMonitor(lmbda) if overload else None
+        self.overloaded = False
+        self.lmbda = lmbda
+        self.mu = mu
+        self.queue = Queue()
+        self.server = Server(servers)
+        self.calendar = []
+        self.tiebreaker = count()
+        self.naorthreshold = False
+        if type(costofbalking) is list:
+            self.naorthreshold = naorthreshold(lmbda, mu, costofbalking[1], servers)
+        elif costofbalking:
+            self.naorthreshold = naorthreshold(lmbda, mu, costofbalking, servers)
+        if threshold is not None:
+            self.naorthreshold = threshold
+        self.recorder = StateRecorder()
+        self.warmupdetectors = {'queuelength': MSER(5 / lmbda), 'waitingtime': MSER(5)} if warmupdetection else None  # Fed as the run goes (see feedwarmup)
+        self.fedrecords = 0
+        self.fedplayers = 0
+        self.log = EventLog() if log else None
+        self.instrumentation = Instrumentation(progress) if instrument else None
+        if instrument:
+            self.instrumentation.hook(self)
+
+    def newplayer(self):
+        """
+        A method to generate a new player (takes in to account cost of balking). So if no cost of balking is passed: only generates a basic player. If a float is passed as cost of balking: generates selfish players with that float as worth of service. If a list is passed then it creates a player (either selfish or optimal) according to a random selection.
+
+        Arguments: NA
+
+        Outputs: the new player
+        """
+        if not self.costofbalking:
+            return Player(self.lmbda, self.mu, self.queue, self.server, self.rng)
+        if type(self.costofbalking) is list:
+            if self.rng.random() < self.costofbalking[0]:
+                return SelfishPlayer(self.lmbda, self.mu, self.queue, self.server, self.costofbalking[1], self.rng)
+            return OptimalPlayer(self.lmbda, self.mu, self.queue, self.server, self.naorthreshold, self.rng)
+        return SelfishPlayer(self.lmbda, self.mu, self.queue, self.server, self.costofbalking, self.rng)
+
+    def schedule(self, t, event, player):
+        """
+        A method to add an event to the calendar.
+
+        Arguments: t - date of the event (float), event - ARRIVAL or ENDSERVICE, player - the player concerned
+
+        Outputs: NA
+        """
+        heappush(self.calendar, (t, next(self.tiebreaker), event, player))
+
+    def run(self):
+        """
+        The main method which runs the simulation: events are taken from the calendar in date order until the calendar holds no event before T. All completed players can be accessed in self.completed.
+
+        Arguments: NA
+
+        Outputs: NA
+        """
+        self.collectdata(0)
+        self.schedule(0, ARRIVAL, self.newplayer())  # The first player arrives at time 0
+        if self.monitor is not None:
+            self.checkstability()
+        step = self.monitor.window if self.monitor is not None else 1000 / self.lmbda  # The warm up detectors are fed after each step
+        t = 0
+        while t < self.T:
+            t = min(t + step, self.T)
+            self.advance(t)
+            if self.checkoverload(t):
+                self.T = t  # Summaries and plots cover the run that was carried out
+                break
+
+    def stable(self):
+        """
+        A method to return whether the configuration is stable: the number in the system is bounded if there is a capacity or if players may balk (selfish and optimal players balk beyond a threshold), otherwise the utilisation must be below 1.
+
+        Arguments: NA
+
+        Outputs: a boolean
+        """
+        return self.capacity is not None or bool(self.costofbalking) or self.lmbda < self.server.servers * self.mu
+
+    def checkstability(self):
+        """
+        A method to write a warning if the configuration is not stable (so that a mis-specified run is noticed before memory runs out).
+        """
+        if not self.stable():
+            sys.stderr.write("Warning: rho = %.2f >= 1 with no capacity and players who never balk: the queue is unstable and grows without limit\n" % (self.lmbda / (self.server.servers * self.mu)))
+
+    def checkoverload(self, t):
+        """
+        A method to sample the number in the system for the growth monitor (once a window has passed) and act on sustained growth: a warning is written (once) and, if overload is 'stop', the run is to stop.
+
+        Arguments: t (float)
+
+        Outputs: a boolean (True if the run should stop)
+        """
+        monitor = self.monitor
+        if monitor is None or t < monitor.nextsample:
+            return False
+        if monitor.update(t, len(self.queue) + len(self.server)) and self.overloaded is False:
+            self.overloaded = t
+            sys.stderr.write("Warning: the number in the system has grown by %.3f per unit of time (%.1f%% of arrivals stay) up to t=%.2f: the queue looks unstable%s\n" % (monitor.slope, 100 * monitor.slope / self.lmbda, t, " (the run is stopped)" if self.overload == 'stop' else ""))
+        return self.overloaded is not False and self.overload == 'stop'
+
+    nextevent = staticmethod(heappop)  # Takes the next event from the calendar (replaced by a timed version with instrumentation)
+
+    def advance(self, until):
+        """
+        A method to carry out the events of the calendar up to a given date (so that a run can be carried out in steps, for example one frame of an animation at a time). With instrumentation the calls made by the loop are timed (see Instrumentation.hook).
+
+        Arguments: until - the date of the last event to carry out (float)
+
+        Outputs: NA
+        """
+        instrumentation = self.instrumentation
+        if instrumentation is not None:
+            instrumentation.begin(self)
+        log = self.log
+        calendar = self.calendar
+        nextevent, arrival, endservice, collectdata = self.nextevent, self.arrival, self.endservice, self.collectdata
+        while calendar and calendar[0][0] <= until:
+            t, _, event, player = nextevent(calendar)
+            if log is not None:
+                log.record(t, event, player)
+            if event == ARRIVAL:
+                arrival(t, player)
+            else:
+                endservice(t, player)
+            collectdata(t)
+        self.feedwarmup()
+        if instrumentation is not None:
+            instrumentation.end(self, until)
+
+    def arrival(self, t, player):
+        """
+        A method to carry out the arrival of a player: a player arriving to a full system is blocked (counted, not kept), otherwise the player joins the queue (starting service if a server is free) or balks. The next player is then scheduled.
+
+        Arguments: t - the date of the arrival (float), player - the arriving player
+
+        Outputs: NA
+        """
+        if self.capacity is not None and len(self.queue) + len(self.server) >= self.capacity:
+            self.blocked.add(len(self.recorder) - 1, t, player.kind)
+            if self.log is not None:
+                self.log.record(t, BALK, player)
+        else:
+            player.arrive(t)
+            if player.balked:
+                self.balked.append(player)
+                if self.log is not None:
+                    self.log.record(t, BALK, player)
+            elif self.server.free():
+                self.startservice(t)
+        nextplayer = self.newplayer()
+        self.schedule(t + nextplayer.interarrivaltime, ARRIVAL, nextplayer)
+
+    def startservice(self, t):
+        """
+        A method to start the service of the first player in the queue and schedule the end of that service.
+
+        Arguments: t - the date (float)
+
+        Outputs: NA
+        """
+        nextservice = self.queue.pop(0)
+        nextservice.startservice(t)
+        self.schedule(nextservice.servicedate, ENDSERVICE, nextservice)
+        if self.log is not None:
+            self.log.record(t, STARTSERVICE, nextservice)
+
+    def endservice(self, t, player):
+        """
+        A method to carry out the end of the service of a player (the next player in the queue, if any, starts service).
+
+        Arguments: t - the date (float), player - the player whose service ends
+
+        Outputs: NA
+        """
+        player.endservice()
+        self.completed.append(player)
+        if len(self.queue) > 0:
+            self.startservice(t)
+
+    def runtoprecision(self, wait=False, cost=False, confidence=0.95, warmup=0, step=None):
+        """
+        A method to run the simulation model until the confidence intervals for the mean waiting time and/or the mean cost (of all players, in time) are precise enough, T being an upper limit. The variance of each mean is estimated online with batch means (BatchMeans) of the players in the order they leave (served, balked or, when there is a cost of balking, blocked by a full system: blocked players are costed as players who balk, as in summarise) and the targets are checked every step. At the end T is the stopping date so that summarise, printsummary and plot cover the run that was carried out.
+
+        Arguments:
+            wait - target relative half width of the mean waiting time (float, False for no target)
+            cost - target relative half width of the mean cost (float, False for no target)
+            confidence - level of the confidence intervals (float)
+            warmup - players arriving before this date are left out of the intervals (float: a warm up time can not be detected before the run)
+            step - time between checks of the targets (float, by default the time of 100 mean interarrival times)
+
+        Outputs: a dictionary mapping 'wait' and 'cost' to a tuple (mean, half width). These are also kept as self.intervals with the stopping date as self.stoppingtime and whether the targets were met as self.converged.
+        """
+        if not wait and not cost:
+            raise ValueError("a target is needed for the mean waiting time or the mean cost")
+        if step is None:
+            step = 100 / self.lmbda
+        costofbalking = self.costofbalking[1] if type(self.costofbalking) is list else self.costofbalking
+        batches = {'wait': BatchMeans(), 'cost': BatchMeans()}
+        targets = [(name, target) for name, target in [('wait', wait), ('cost', cost)] if target]
+        completed = balked = blocked = 0  # Players already handed to the batch means
+        self.converged = False
+        self.collectdata(0)
+        self.schedule(0, ARRIVAL, self.newplayer())
+        if self.monitor is not None:
+            self.checkstability()
+        t = 0
+        while t < self.T and not self.converged:
+            t = min(t + step, self.T)
+            self.advance(t)
+            if self.checkoverload(t):
+                break
+            leaving = [(p.arrivaldate + p.waitingtime + p.servicetime, p) for p in self.completed[completed:]]
+            leaving += [(p.arrivaldate, p) for p in self.balked[balked:]]
+            if costofbalking:
+                leaving += [(date, None) for date in self.blocked.dates[blocked:]]  # Blocked players leave as they arrive
+            completed, balked, blocked = len(self.completed), len(self.balked), len(self.blocked)
+            leaving.sort(key=lambda x: x[0])
+            for date, p in leaving:
+                if p is None:
+                    if date >= warmup:
+                        batches['cost'].update(costofbalking)
+                    continue
+                if p.arrivaldate < warmup:
+                    continue
+                if p.balked:
+                    batches['cost'].update(costofbalking)
+                else:
+                    batches['wait'].update(p.waitingtime)
+                    batches['cost'].update(p.waitingtime + p.servicetime)
+            self.converged = all(batches[name].relativehalfwidth(confidence) <= target for name, target in targets)
+        self.T = self.stoppingtime = t
+        self.intervals = dict((name, (batches[name].mean(), batches[name].halfwidth(confidence))) for name in batches)
+        return self.intervals
+
+    def printintervals(self, confidence=0.95):
+        """
+        A method to print the stopping date and the confidence intervals reached by runtoprecision.
+        """
+        sys.stdout.write("\n%sSequential stopping%s\n" % (10*"-",10*"-"))
+        sys.stdout.write("Stopping time: %.02f (targets %s)\n" % (self.stoppingtime, "met" if self.converged else "not met"))
+        for name, label in [('wait', 'waiting time'), ('cost', 'cost')]:
+            mean, halfwidth = self.intervals[name]
+            if mean is False:
+                sys.stdout.write("Mean %s: no data\n" % label)
+            else:
+                sys.stdout.write("Mean %s: %.04f +/- %.04f (%g%% confidence)\n" % (label, mean, halfwidth, 100 * confidence))
+        sys.stdout.write(39 * "-" + "\n")
+
+    def collectdata(self, t):
+        """
+        Collect data at time t: the recorder only stores the state if it has changed. The number of selfish players is kept up to date by the queue and the server as players join and leave.
+
+        Arguments: t (float)
+
+        Outputs: NA
+        """
+        selfishqueuelength = self.queue.selfish
+        optimalqueuelength = len(self.queue) - selfishqueuelength
+        self.recorder.record(t, selfishqueuelength, optimalqueuelength,
+                             selfishqueuelength + self.server.selfish, optimalqueuelength + len(self.server) - self.server.selfish)
+
+    def waitseries(self):
+        """
+        A method to return the waits of the players that completed service.
+
+        Arguments: NA
+
+        Outputs: an iterator of tuples (arrival date, waiting time) in the order the players completed service
+        """
+        return ((player.arrivaldate, player.waitingtime) for player in self.completed)
+
+    def feedwarmup(self):
+        """
+        A method to hand the data produced since the last call to the warm up detectors (called at the end of every advance so that the warm up is detected as the run goes): the states whose duration is known (all but the last) and the waits of the players that completed service.
+
+        Arguments: NA
+
+        Outputs: NA
+        """
+        if self.warmupdetectors is None:
+            return
+        recorder = self.recorder
+        first, last = self.fedrecords, len(recorder) - 1  # The last state may still change or be extended
+        if last > first:
+            timepoints = recorder.timepoints[first:last + 1]
+            lengths = [selfish + optimal for selfish, optimal in zip(recorder.selfishqueuelengths[first:last], recorder.optimalqueuelengths[first:last])]
+            self.warmupdetectors['queuelength'].extend(lengths, timepoints[:-1], [upper - lower for lower, upper in zip(timepoints, timepoints[1:])])
+            self.fedrecords = last
+        completed = self.completed
+        first = self.fedplayers
+        if len(completed) > first:
+            if isinstance(completed, PlayerRecords):
+                self.warmupdetectors['waitingtime'].extend(completed.waitingtimes[first:], completed.arrivaldates[first:])
+            else:
+                players = completed[first:]
+                self.warmupdetectors['waitingtime'].extend([player.waitingtime for player in players], [player.arrivaldate for player in players])
+            self.fedplayers = len(completed)
+
+    def detectwarmup(self):
+        """
+        A method to return the warm up time detected with MSER-5 on the number in the queue (time weighted, in batches of the time of five mean interarrival times) and on the waits (in batches of five players). The detectors are fed as the run goes (see feedwarmup) so the recorded data are not read again. The later of the two truncation points is used.
+
+        Arguments: NA
+
+        Outputs: the warm up time (float, 0 if there is too little data)
+        """
+        if self.warmupdetectors is None:
+            raise ValueError("warm up detection was not turned on for this simulation (warmupdetection=True)")
+        self.feedwarmup()
+        self.warmuptimes = dict((name, float(detector.truncation()[1] or 0)) for name, detector in self.warmupdetectors.items())
+        return max(self.warmuptimes.values())
+
+    def resolvewarmup(self, warmup):
+        """
+        A method to return the warm up time to use: warmup itself or, if warmup is 'auto', the detected warm up time (kept as self.warmup).
+        """
+        if warmup == 'auto':
+            warmup = self.detectwarmup()
+        self.warmup = warmup
+        return warmup
+
+    def plot(self, savefig, warmup=0):
+        """
+        Plot the data (histograms and running means are weighted by the time for which each state holds). A warmup of 'auto' uses the detected warm up time.
+        """
+        warmup = self.resolvewarmup(warmup)
+        string = "lmbda=%s-mu=%s-T=%s-cost=%s.pdf" % (self.lmbda, self.mu, self.T, self.costofbalking) # An identifier
+        timepoints, durations, columns = self.recorder.window(warmup, self.T)
+        endpoints = [t + d for t, d in zip(timepoints, durations)]  # Running means are known at the end of each record
+        if self.costofbalking:
+            plotwithbalkers(columns['selfishqueuelengths'], columns['optimalqueuelengths'], columns['selfishsystemstates'], columns['optimalsystemstates'], endpoints, savefig, string, durations)
+        else:
+            queuelengths = [sum(k) for k in zip(columns['selfishqueuelengths'], columns['optimalqueuelengths'])]
+            systemstates = [sum(k) for k in zip(columns['selfishsystemstates'], columns['optimalsystemstates'])]
+            plotwithnobalkers(queuelengths, systemstates, endpoints, savefig, string, durations)
+
+    def playertotals(self, warmup=0):
+        """
+        A method to total the players that arrived after warmup (the data that summarise needs about players).
+
+        Arguments: warmup (float)
+
+        Outputs: a dictionary mapping 'selfish' and 'optimal' to a list [number served, total waiting time, total service time, number balked] (basic players are counted as optimal players)
+        """
+        totals = {'selfish': [0, 0, 0, 0], 'optimal': [0, 0, 0, 0]}
+        for p in self.completed:
+            if p.arrivaldate >= warmup:
+                total = totals['selfish' if p.selfish else 'optimal']
+                total[0] += 1
+                total[1] += p.waitingtime
+                total[2] += p.servicetime
+        for p in self.balked:
+            if p.arrivaldate >= warmup:
+                totals['selfish' if p.selfish else 'optimal'][3] += 1
+        return totals
+
+    def summarise(self, warmup=0):
+        """
+        A method to compute summary statistics (numbers in queue and in system are time weighted averages over [warmup, T]). The statistics are kept as attributes. When there is a cost of balking, players blocked by a full system are costed as players who balk (the mean costs are over every arrival, blocked or not) and the probabilities of balking are over the players who were not blocked. Blocked players are those blocked from warmup on (see BlockedCounts).
+
+        Arguments: warmup (float, or 'auto' for the detected warm up time)
+
+        Outputs: a dictionary mapping each of the names in self.metrics to its value (False if there is no data)
+        """
+        warmup = self.resolvewarmup(warmup)
+        averages = self.recorder.timeaverage(warmup, self.T)
+        self.meanselfishqueuelength = averages['selfishqueuelengths']
+        self.meanoptimalqueuelength = averages['optimalqueuelengths']
+        self.meanqueuelength = self.meanselfishqueuelength + self.meanoptimalqueuelength
+        self.meanselfishsystemstate = averages['selfishsystemstates']
+        self.meanoptimalsystemstate = averages['optimalsystemstates']
+        self.meansystemstate = self.meanselfishsystemstate + self.meanoptimalsystemstate
+
+        if type(self.costofbalking) is list:
+            costofbalking = self.costofbalking[1]
+        else:
+            costofbalking = self.costofbalking
+
+        totals = self.playertotals(warmup)
+        selfishserved, selfishwaiting, selfishservice, selfishbalked = totals['selfish']
+        optimalserved, optimalwaiting, optimalservice, optimalbalked = totals['optimal']
+        self.meanwaitingtime = ratio(selfishwaiting + optimalwaiting, selfishserved + optimalserved)
+        self.meansystemtime = ratio(selfishservice + optimalservice + selfishwaiting + optimalwaiting, selfishserved + optimalserved)
+        self.meanselfishwaitingtime = ratio(selfishwaiting, selfishserved)
+        self.meanselfishsystemtime = ratio(selfishservice + selfishwaiting, selfishserved)
+        self.meanoptimalwaitingtime = ratio(optimalwaiting, optimalserved)
+        self.meanoptimalsystemtime = ratio(optimalservice + optimalwaiting, optimalserved)
+
+        selfishplayers = selfishbalked + selfishserved
+        optimalplayers = optimalbalked + optimalserved
+        selfishblocked, optimalblocked = self.blocked.since(bisect_right(self.recorder.timepoints, warmup) - 1, warmup)  # The record in effect at the warm up on
+        selfishcosted, optimalcosted = (selfishblocked, optimalblocked) if costofbalking else (0, 0)  # Blocked players are costed as players who balk
+        selfishcost = (selfishbalked + selfishcosted) * costofbalking + selfishservice + selfishwaiting
+        optimalcost = (optimalbalked + optimalcosted) * costofbalking + optimalservice + optimalwaiting
+        self.meanselfishcost = ratio(selfishcost, selfishplayers + selfishcosted)
+        self.meanoptimalcost = ratio(optimalcost, optimalplayers + optimalcosted)
+        self.meancost = ratio(selfishcost + optimalcost, selfishplayers + optimalplayers + selfishcosted + optimalcosted)
+        self.selfishprobbalk = ratio(selfishbalked, selfishplayers)
+        self.optimalprobbalk = ratio(optimalbalked, optimalplayers)
+        blocked = selfishblocked + optimalblocked
+        self.probblock = ratio(blocked, blocked + selfishplayers + optimalplayers)
+        return dict((metric, getattr(self, metric)) for metric in self.metrics)
+
+    def quantilesketches(self, warmup=0, accuracy=0.01):
+        """
+        A method to sketch (QuantileSketch) the distributions of the waiting times and system times of the players that arrived after warmup and of the number in the queue over [warmup, T] (time weighted), for each type of player and for all players.
+
+        Arguments: warmup (float, or 'auto' for the detected warm up time), accuracy (the relative accuracy of the quantiles: float)
+
+        Outputs: a dictionary mapping 'selfish', 'optimal' and 'all' to dictionaries mapping 'waitingtime', 'systemtime' and 'queuelength' to a QuantileSketch (basic players are counted as optimal players)
+        """
+        warmup = self.resolvewarmup(warmup)
+        sketches = dict((kind, dict((name, QuantileSketch(accuracy)) for name in ['waitingtime', 'systemtime', 'queuelength'])) for kind in ['selfish', 'optimal', 'all'])
+        for p in self.completed:
+            if p.arrivaldate >= warmup:
+                for kind in ['selfish' if p.selfish else 'optimal', 'all']:
+                    sketches[kind]['waitingtime'].update(p.waitingtime)
+                    sketches[kind]['systemtime'].update(p.waitingtime + p.servicetime)
+        timepoints, durations, columns = self.recorder.window(warmup, self.T)
+        for d, selfish, optimal in zip(durations, columns['selfishqueuelengths'], columns['optimalqueuelengths']):
+            if d > 0:
+                sketches['selfish']['queuelength'].update(selfish, d)
+                sketches['optimal']['queuelength'].update(optimal, d)
+                sketches['all']['queuelength'].update(selfish + optimal, d)
+        return sketches
+
+    def printpercentiles(self, warmup=0, percentiles=(50, 90, 95, 99)):
+        """
+        A method to print percentiles of the waiting times, system times and numbers in the queue (for each type of player if there are players who may balk).
+        """
+        sketches = self.quantilesketches(warmup)
+        kinds = [('all', 'All players'), ('selfish', 'Selfish players'), ('optimal', 'Optimal players')] if self.costofbalking else [('all', 'All players')]
+        sketch = sketches['all']['waitingtime']
+        sys.stdout.write("\n%sPercentiles (%g%% accuracy)%s\n" % (5*"-", 100 * sketch.accuracy, 5*"-"))
+        for kind, label in kinds:
+            sys.stdout.write("%s:\n" % label)
+            for name, description in [('waitingtime', 'Waiting time'), ('systemtime', 'System time'), ('queuelength', 'Number in queue')]:
+                values = sketches[kind][name].percentiles(percentiles)
+                if name == 'queuelength':  # Numbers in the queue are integers (rounding the sketch is exact below 1 / (2 * accuracy))
+                    values = dict((p, value if value is False else "%d" % round(value)) for p, value in values.items())
+                else:
+                    values = dict((p, value if value is False else "%.02f" % value) for p, value in values.items())
+                sys.stdout.write("%s: %s\n" % (description, ", ".join("p%s=%s" % (p, values[p] if values[p] is not False else "-") for p in percentiles)))
+        sys.stdout.write(39 * "-" + "\n")
+
+    def printsummary(self, warmup=0):
+        """
+        A method to print summary statistics (numbers in queue and in system are time weighted averages over [warmup, T]). A warmup of 'auto' uses (and prints) the detected warm up time.
+        """
+        detected = warmup == 'auto'
+        self.summarise(warmup)
+        if detected:
+            sys.stdout.write("\nWarm up time (MSER-5): %.02f (queue length: %.02f, waiting time: %.02f)\n" % (self.warmup, self.warmuptimes['queuelength'], self.warmuptimes['waitingtime']))
+        if not self.costofbalking:
+            sys.stdout.write("\n%sSummary statistics%s\n" % (10*"-",10*"-"))
+            sys.stdout.write("Mean queue length: %.02f\n" % self.meanqueuelength)
+            sys.stdout.write("Mean system state: %.02f\n" % self.meansystemstate)
+            sys.stdout.write("Mean waiting time: %.02f\n" % self.meanwaitingtime)
+            sys.stdout.write("Mean system time: %.02f\n" % self.meansystemtime)
+            if self.capacity is not None:
+                sys.stdout.write("Probability of blocking: %.02f\n" % self.probblock)
+            sys.stdout.write(39 * "-" + "\n")
+            return
+
+        sys.stdout.write("\n%sSummary statistics%s\n" % (10*"=",10*"="))
+
+        sys.stdout.write("\n%sSelfish players%s\n" % (13*"-",10*"-"))
+        sys.stdout.write("Mean number in queue: %.02f\n" % self.meanselfishqueuelength)
+        sys.stdout.write("Mean number in system: %.02f\n" % self.meanselfishsystemstate)
+        sys.stdout.write("Mean waiting time: %.02f\n" % self.meanselfishwaitingtime)
+        sys.stdout.write("Mean system time: %.02f\n" % self.meanselfishsystemtime)
+        sys.stdout.write("Probability of balking: %.02f\n" % self.selfishprobbalk)
+
+        sys.stdout.write("\n%sOptimal players%s\n" % (13*"-",10*"-"))
+        sys.stdout.write("Mean number in queue: %.02f\n" % self.meanoptimalqueuelength)
+        sys.stdout.write("Mean number in system: %.02f\n" % self.meanoptimalsystemstate)
+        sys.stdout.write("Mean waiting time: %.02f\n" % self.meanoptimalwaitingtime)
+        sys.stdout.write("Mean system time: %.02f\n" % self.meanoptimalsystemtime)
+        sys.stdout.write("Probability of balking: %.02f\n" % self.optimalprobbalk)
+
+        sys.stdout.write("\n%sOverall mean cost (in time)%s\n" % (9*"-","-"))
+        sys.stdout.write("All players: %.02f\n" % self.meancost)
+        sys.stdout.write("Selfish players: %.02f\n" % self.meanselfishcost)
+        sys.stdout.write("Optimal players: %.02f\n" % self.meanoptimalcost)
+        if self.capacity is not None:
+            sys.stdout.write("Probability of blocking: %.02f\n" % self.probblock)
+        sys.stdout.write(39 * "=" + "\n")
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="A headless (next event) simulation of an MM1 queue. Also, allows for some agent based aspects which at present illustrate results from Naor's paper: 'The Regulation of Queue Size by Levying Tolls'")
+    parser.add_argument('-l', action="store", dest="lmbda", type=float, help='The arrival rate', default=2)
+    parser.add_argument('-m', action="store", dest="mu", type=float, help='The service rate', default = 1)
+    parser.add_argument('-T', action="store", dest="T", type=float, help='The overall simulation time', default=500)
+    parser.add_argument('-p', action="store", dest="probofselfish", help='Proportion of selfish players (default: 0)', default=0, type=float)
+    parser.add_argument('-c', action="store", dest="costofbalking", help='Cost of balking (default: False)', default=False, type=float)
+    parser.add_argument('-w', action="store", dest="warmuptime", help="Warm up time (default: 'auto', detected with MSER-5)", default='auto', type=warmupargument)
+    parser.add_argument('-e', action="store", dest="logfile", help='File to save the event log to (for replay with graphicalMM1)', default=False)
+    parser.add_argument('-k', action="store", dest="servers", help='Number of servers', default=1, type=int)
+    parser.add_argument('-i', action="store_true", dest="instrument", help='Count and time the parts of the run, report progress and print the measurements')
+    parser.add_argument('-j', action="store", dest="metricsfile", help='File to save the measurements of an instrumented run to (json)', default=False)
+    parser.add_argument('-a', action="store", dest="waitprecision", help='Run until the 95%% confidence interval of the mean waiting time has this relative half width (T is then an upper limit)', default=False, type=float)
+    parser.add_argument('-q', action="store_true", dest="percentiles", help='Print percentiles of the waiting times, system times and numbers in the queue')
+    parser.add_argument('-K', action="store", dest="capacity", help='Capacity: the largest number in the system (default: no limit)', default=None, type=int)
+    parser.add_argument('-o', action="store", dest="overload", help="What to do if the number in the system grows without limit: 'warn' (default) or 'stop' the run", default='warn', choices=['warn', 'stop'])
+    parser.add_argument('-z', action="store_true", dest="compact", help='Keep compact records of the players that have left rather than the players themselves')
+    parser.add_argument('-A', action="store", dest="arrivals", help="Interarrival times (in place of exponential with rate -l): 'lognormal:mean:cv', 'gamma:mean:cv', 'deterministic:value', 'empirical:file' or 'trace:file' (arrival dates)", default=None)
+    parser.add_argument('-S', action="store", dest="services", help="Service times (in place of exponential with rate -m): as for -A (but not a trace)", default=None)
+    parser.add_argument('-s', action="store", dest="seed", help='Seed', default=None, type=int)
+    parser.add_argument('-b', action="store", dest="costprecision", help='Run until the 95%% confidence interval of the mean cost has this relative half width (T is then an upper limit)', default=False, type=float)
+    inputs = parser.parse_args()
+    costofbalking = inputs.costofbalking
+    if costofbalking:
+        costofbalking = [inputs.probofselfish, inputs.costofbalking]
+    instrument = inputs.instrument or bool(inputs.metricsfile)
+    lmbda, mu, streams = inputs.lmbda, inputs.mu, None
+    if inputs.arrivals or inputs.services:
+        import distributions
+        arrivals = distributions.parse(inputs.arrivals) if inputs.arrivals else None
+        services = distributions.parse(inputs.services) if inputs.services else None
+        if arrivals is not None:
+            lmbda = arrivals.rate  # Used by the players' decisions and the checks of stability
+        if services is not None:
+            mu = services.rate
+        streams = BufferedStreams(inputs.seed, arrivals=arrivals, services=services)
+    q = Sim(inputs.T, lmbda, mu, costofbalking=costofbalking, seed=inputs.seed, log=bool(inputs.logfile), servers=inputs.servers, instrument=instrument, progress=instrument,
+            capacity=inputs.capacity, compact=inputs.compact, overload=inputs.overload, streams=streams, warmupdetection=inputs.warmuptime == 'auto')
+    if inputs.waitprecision or inputs.costprecision:
+        q.runtoprecision(inputs.waitprecision, inputs.costprecision, warmup=0 if inputs.warmuptime == 'auto' else inputs.warmuptime)
+        q.printintervals()
+    else:
+        q.run()
+    q.printsummary(warmup=inputs.warmuptime)
+    if inputs.percentiles:
+        q.printpercentiles(warmup=inputs.warmuptime)
+    if instrument:
+        q.instrumentation.printreport()
+    if inputs.metricsfile:
+        q.instrumentation.save(inputs.metricsfile)
+    if inputs.logfile:
+        q.log.save(inputs.logfile)
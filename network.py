@@ -0,0 +1,326 @@
+#!/usr/bin/env python
+"""
+Library with a headless discrete event simulation of a network of queues (Jackson networks: each station has its own external Poisson arrivals, one or more exponential servers and routing probabilities to the other stations; a tandem is the special case where station i routes to station i + 1 with probability 1).
+
+The stations are made of the Queue and Server of headlessMM1 and share a single event calendar. Statistics are accumulated as the simulation runs (time weighted areas and totals) so that memory does not grow with the number of events.
+
+- Customer;
+- Station (a queue and its servers, with the statistics of the station);
+- arrivalrates (solves the traffic equations: the expected arrival rate at each station);
+- tandem (returns the routing matrix of a tandem);
+
+- Network (this is the main object that generates all other objects as required).
+"""
+from __future__ import division  # Simplify division
+from heapq import heappush, heappop  # The event calendar
+from itertools import count  # Tie breaker for simultaneous events
+from random import Random  # Pseudo random number generation
+from bisect import bisect_right  # Routing
+import sys  # Use to write to out
+import headlessMM1
+from headlessMM1 import ARRIVAL, ENDSERVICE, ratio
+
+def arrivalrates(externalrates, routing, tolerance=1e-12, iterations=100000):
+    """
+    Function to return the total arrival rate at each station: the solution of the traffic equations lmbda[j] = externalrates[j] + sum_i lmbda[i] * routing[i][j] (found by fixed point iteration). A ValueError is raised if the iteration has not converged after the given number of iterations (there is no solution when customers can never leave some of the stations).
+
+    Arguments:
+        externalrates - the external arrival rate at each station (list of floats)
+        routing - routing[i][j] is the probability of going to station j after service at station i (list of lists: the rest of the probability is that of leaving the network)
+        tolerance - the largest change accepted between two iterations (float)
+        iterations - the largest number of iterations (integer)
+
+    Output: a list of floats
+    """
+    rates = list(externalrates)
+    for _ in range(iterations):
+        following = [externalrates[j] + sum(rates[i] * routing[i][j] for i in range(len(rates))) for j in range(len(rates))]
+        if max(abs(a - b) for a, b in zip(following, rates)) < tolerance:
+            return following
+        rates = following
+    raise ValueError("the traffic equations did not converge in %s iterations: can customers leave every station of the network?" % iterations)
+
+def tandem(stations):
+    """
+    Function to return the routing matrix of a tandem (all customers go through the stations in order).
+
+    Argument: stations - the number of stations (integer)
+
+    Output: a list of lists
+    """
+    return [[1 if j == i + 1 else 0 for j in range(stations)] for i in range(stations)]
+
+class Customer(object):
+    """
+    A class for a customer of the network.
+
+    Attributes:
+        arrivaldate: the date the customer entered the network (float)
+        stationarrivaldate: the date the customer arrived at the current station (float)
+        servicetime: the service time at the current station (float)
+        servicedate: the date the current service ends (float)
+        visits: the number of services so far (integer)
+    """
+    selfish = False  # Read by the queue and the server of headlessMM1
+
+    def __init__(self, t):
+        self.arrivaldate = t
+        self.visits = 0
+
+class Station():
+    """
+    A class for a station: a queue, one or more servers and the routing out of the station.
+
+    Attributes:
+        - number: the position of the station in the network (integer)
+        - externalrate: the rate of arrivals from outside of the network (float)
+        - mu: the service rate of each server (float)
+        - queue: a headlessMM1.Queue
+        - server: a headlessMM1.Server
+        - destinations, cumulative: the stations customers can go to next and the cumulative probabilities of going to them (lists)
+        - last: the date of the last change of state
+        - queuearea, systemarea, busyarea: the areas under the number in the queue, the number at the station and the number of busy servers since the warm up time (floats)
+        - visits, waitingtime, systemtime: the number of services that started after the warm up time and have ended and the totals of their waiting and system times
+
+    Methods:
+        - update: adds to the areas up to a given date
+        - next: samples the station a customer goes to after service
+    """
+    def __init__(self, number, externalrate, mu, servers, routing):
+        self.number = number
+        self.externalrate = externalrate
+        self.mu = mu
+        self.queue = headlessMM1.Queue()
+        self.server = headlessMM1.Server(servers)
+        self.destinations = []
+        self.cumulative = []
+        total = 0
+        for j, probability in enumerate(routing):
+            if probability > 0:
+                total += probability
+                self.destinations.append(j)
+                self.cumulative.append(total)
+        if total > 1 + 1e-9:
+            raise ValueError("the routing probabilities out of station %s add up to more than 1" % number)
+        self.last = 0
+        self.queuearea = 0
+        self.systemarea = 0
+        self.busyarea = 0
+        self.visits = 0
+        self.waitingtime = 0
+        self.systemtime = 0
+
+    def update(self, t, warmup):
+        """
+        A method to add to the areas the time since the last change of state (only the time after warmup is counted).
+
+        Arguments: t (float), warmup (float)
+
+        Outputs: NA
+        """
+        start = self.last if self.last > warmup else warmup
+        if t > start:
+            busy = len(self.server)
+            self.queuearea += (t - start) * len(self.queue)
+            self.systemarea += (t - start) * (len(self.queue) + busy)
+            self.busyarea += (t - start) * busy
+        self.last = t
+
+    def next(self, u):
+        """
+        A method to return the station a customer goes to after service.
+
+        Argument: u - a uniform random number (float)
+
+        Outputs: a station number (integer) or None if the customer leaves the network
+        """
+        k = bisect_right(self.cumulative, u)
+        if k < len(self.destinations):
+            return self.destinations[k]
+        return None
+
+class Network():
+    """
+    The main class for a simulation of a network of queues.
+
+    Attributes:
+        - T: total run time (float)
+        - externalrates: the rate of arrivals from outside of the network at each station (list of floats)
+        - mu: the service rate at each station (list of floats)
+        - servers: the number of servers at each station (list of integers)
+        - routing: routing[i][j] is the probability of going to station j after service at station i (list of lists)
+        - warmup: statistics are only collected after this time (float)
+        - stations: a list of station objects
+        - calendar: a heap of future events (date, tie breaker, event type, station, customer)
+        - rng: the random number generator of this simulation (seeded with the seed argument so that runs can be reproduced)
+        - completed, systemtime, visits: the number of customers that entered the network after warmup and left it, and the totals of their times in the network and of their numbers of services
+        - events: the number of events carried out
+
+    Methods:
+        - run: runs the simulation model
+        - schedule: adds an event to the calendar
+        - join: makes a customer join a station
+        - summarise: computes summary statistics
+        - printsummary: prints summary statistics
+    """
+    def __init__(self, T, externalrates, mu, routing, servers=None, warmup=0, seed=None):
+        if servers is None:
+            servers = [1] * len(mu)
+        if not len(externalrates) == len(mu) == len(servers) == len(routing):
+            raise ValueError("there must be one arrival rate, service rate, number of servers and row of the routing matrix per station")
+        self.T = T
+        self.externalrates = externalrates
+        self.mu = mu
+        self.servers = servers
+        self.routing = routing
+        self.warmup = warmup
+        self.rng = Random(seed)
+        self.stations = [Station(i, externalrates[i], mu[i], servers[i], routing[i]) for i in range(len(mu))]
+        self.calendar = []
+        self.tiebreaker = count()
+        self.completed = 0
+        self.systemtime = 0
+        self.visits = 0
+        self.events = 0
+
+    def schedule(self, t, event, station, customer):
+        """
+        A method to add an event to the calendar.
+
+        Arguments: t - date of the event (float), event - ARRIVAL or ENDSERVICE, station - the station concerned, customer - the customer concerned (None for the external arrivals: the customer is created when it arrives)
+
+        Outputs: NA
+        """
+        heappush(self.calendar, (t, next(self.tiebreaker), event, station, customer))
+
+    def join(self, t, station, customer):
+        """
+        A method to make a customer join a station (the customer starts service at once if a server is free).
+
+        Arguments: t (float), station, customer
+
+        Outputs: NA
+        """
+        station.update(t, self.warmup)
+        customer.stationarrivaldate = t
+        if station.server.free():
+            self.startservice(t, station, customer)
+        else:
+            station.queue.join(customer)
+
+    def startservice(self, t, station, customer):
+        """
+        A method to start the service of a customer at a station.
+
+        Arguments: t (float), station, customer
+
+        Outputs: NA
+        """
+        customer.servicetime = self.rng.expovariate(station.mu)
+        customer.servicedate = t + customer.servicetime
+        customer.waitingtime = t - customer.stationarrivaldate
+        station.server.start(customer)
+        self.schedule(customer.servicedate, ENDSERVICE, station, customer)
+
+    def run(self):
+        """
+        The main method which runs the simulation: events are taken from the calendar in date order until the calendar holds no event before T.
+
+        Arguments: NA
+
+        Outputs: NA
+        """
+        rng = self.rng
+        warmup = self.warmup
+        for station in self.stations:
+            if station.externalrate > 0:
+                self.schedule(rng.expovariate(station.externalrate), ARRIVAL, station, None)
+        events = 0
+        while self.calendar and self.calendar[0][0] <= self.T:
+            t, _, event, station, customer = heappop(self.calendar)
+            events += 1
+            if event == ARRIVAL:
+                self.schedule(t + rng.expovariate(station.externalrate), ARRIVAL, station, None)
+                self.join(t, station, Customer(t))
+            else:
+                station.update(t, warmup)
+                station.server.end(customer)
+                customer.visits += 1
+                if customer.stationarrivaldate >= warmup:
+                    station.visits += 1
+                    station.waitingtime += customer.waitingtime
+                    station.systemtime += t - customer.stationarrivaldate
+                if len(station.queue) > 0:
+                    self.startservice(t, station, station.queue.pop(0))
+                destination = station.next(rng.random())
+                if destination is None:
+                    if customer.arrivaldate >= warmup:
+                        self.completed += 1
+                        self.systemtime += t - customer.arrivaldate
+                        self.visits += customer.visits
+                else:
+                    self.join(t, self.stations[destination], customer)
+        for station in self.stations:
+            station.update(self.T, warmup)
+        self.events = events
+
+    def summarise(self):
+        """
+        A method to compute summary statistics (numbers in queue and at the station are time weighted averages over [warmup, T]).
+
+        Arguments: NA
+
+        Outputs: a dictionary with the list of the statistics of each station (mean queue length, mean system state, mean waiting time, mean system time, utilisation and throughput) and the end to end statistics (mean system time, mean number of visits and throughput)
+        """
+        duration = self.T - self.warmup
+        stations = []
+        for station in self.stations:
+            stations.append({'meanqueuelength': ratio(station.queuearea, duration),
+                             'meansystemstate': ratio(station.systemarea, duration),
+                             'meanwaitingtime': ratio(station.waitingtime, station.visits),
+                             'meansystemtime': ratio(station.systemtime, station.visits),
+                             'utilisation': ratio(station.busyarea, duration * station.server.servers),
+                             'throughput': ratio(station.visits, duration)})
+        return {'stations': stations,
+                'meansystemtime': ratio(self.systemtime, self.completed),
+                'meanvisits': ratio(self.visits, self.completed),
+                'throughput': ratio(self.completed, duration)}
+
+    def printsummary(self):
+        """
+        A method to print summary statistics.
+        """
+        summary = self.summarise()
+        rates = arrivalrates(self.externalrates, self.routing)
+        sys.stdout.write("\n%sSummary statistics%s\n" % (10*"=",10*"="))
+        for k, station in enumerate(summary['stations']):
+            sys.stdout.write("\n%sStation %s%s\n" % (13*"-", k + 1, 10*"-"))
+            sys.stdout.write("Mean queue length: %.02f\n" % station['meanqueuelength'])
+            sys.stdout.write("Mean system state: %.02f\n" % station['meansystemstate'])
+            sys.stdout.write("Mean waiting time: %.02f\n" % station['meanwaitingtime'])
+            sys.stdout.write("Mean system time: %.02f\n" % station['meansystemtime'])
+            sys.stdout.write("Utilisation: %.02f (expected: %.02f)\n" % (station['utilisation'], rates[k] / (self.mu[k] * self.servers[k])))
+        sys.stdout.write("\n%sEnd to end%s\n" % (13*"-", 10*"-"))
+        sys.stdout.write("Mean system time: %.02f\n" % summary['meansystemtime'])
+        sys.stdout.write("Mean number of visits: %.02f\n" % summary['meanvisits'])
+        sys.stdout.write("Throughput: %.02f\n" % summary['throughput'])
+        sys.stdout.write(39 * "=" + "\n")
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="A headless simulation of a network of queues (a tandem unless a routing matrix is given).")
+    parser.add_argument('-l', action="store", dest="lmbda", type=float, nargs='+', help='The external arrival rate at each station', default=[1, 0, 0])
+    parser.add_argument('-m', action="store", dest="mu", type=float, nargs='+', help='The service rate at each station', default=[2, 2, 2])
+    parser.add_argument('-k', action="store", dest="servers", type=int, nargs='+', help='The number of servers at each station (default: 1)', default=None)
+    parser.add_argument('-r', action="store", dest="routing", type=float, nargs='+', help='The routing matrix, row by row (default: a tandem)', default=None)
+    parser.add_argument('-T', action="store", dest="T", type=float, help='The overall simulation time', default=500)
+    parser.add_argument('-w', action="store", dest="warmuptime", help='Warm up time', default=0, type=float)
+    inputs = parser.parse_args()
+    stations = len(inputs.mu)
+    routing = tandem(stations)
+    if inputs.routing:
+        routing = [inputs.routing[i * stations:(i + 1) * stations] for i in range(stations)]
+    n = Network(inputs.T, inputs.lmbda, inputs.mu, routing, servers=inputs.servers, warmup=inputs.warmuptime)
+    n.run()
+    n.printsummary()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+"""
+Library to search by simulation for the threshold of the optimal players that minimises the mean cost (when there is no closed form: general interarrival or service times, several servers, a capacity...).
+
+Candidate thresholds (integers, or the thresholds that candidate costs of balking give through headlessMM1.naorthreshold) are screened by sequential ranking and selection. Replication r of every candidate is run on the same random numbers (common random numbers: the same arrivals, services and types of players) so that candidates are compared through paired differences of their mean costs. After every stage the candidates that are significantly worse than another candidate are eliminated and only the survivors are given more replications, so the search needs a fraction of the runs of a full grid. The runs of a stage are carried out across a pool of processes.
+
+- thresholdcost (runs a single replication of a candidate threshold and returns its mean cost);
+- candidates (returns the thresholds given by some costs of balking);
+
+- ThresholdSearch (this is the main object that runs the search and reports the best threshold).
+"""
+from __future__ import division  # Simplify division
+from math import ceil
+from multiprocessing import Pool  # Parallel runs
+import sys  # Use to write to out
+import headlessMM1
+import replications
+from headlessMM1 import tquantile  # Quantiles for confidence intervals
+from replications import runreplication
+
+def thresholdcost(stream, threshold, T, lmbda, mu, costofbalking, servers=1, capacity=None, warmup=0, arrivals=None, services=None):
+    """
+    Function to run a single replication of the headless simulation in which every player is an optimal player with a given threshold.
+
+    Arguments:
+        stream - a numpy SeedSequence (the same for every candidate in a replication: common random numbers)
+        threshold - the threshold of the optimal players (integer)
+        T, lmbda, mu, costofbalking, servers, capacity - as for headlessMM1.Sim
+        warmup - the warm up time (float)
+        arrivals, services - distributions of the interarrival and service times (see distributions, None for exponential times)
+
+    Output: the mean cost of the players (float: a ValueError is raised if no player arrived after the warm up, as every candidate then has no cost to compare)
+    """
+    seed = replications.seedint(stream)
+    if arrivals is None and services is None:
+        streams = headlessMM1.Streams(seed)
+    else:
+        streams = headlessMM1.BufferedStreams(seed, arrivals=arrivals, services=services)
+    q = headlessMM1.Sim(T, lmbda, mu, costofbalking=[0, costofbalking], servers=servers, streams=streams, capacity=capacity, compact=True, threshold=threshold)
+    q.run()
+    cost = q.summarise(warmup)['meancost']
+    if cost is False:
+        raise ValueError("no player arrived after the warm up (%s) of a run of length %s: the candidates can not be compared" % (warmup, T))
+    return cost
+
+def candidates(lmbda, mu, costs, servers=1):
+    """
+    Function to return the thresholds that some costs of balking give (Naor's threshold, or Knudsen's with several servers).
+
+    Arguments:
+        lmbda, mu, servers - as for headlessMM1.naorthreshold
+        costs - the costs of balking (list of floats)
+
+    Output: a sorted list of distinct thresholds
+    """
+    return sorted(set(headlessMM1.naorthreshold(lmbda, mu, cost, servers) for cost in costs))
+
+class ThresholdSearch():
+    """
+    A class for a search of the threshold that minimises the mean cost (sequential screening of the candidates on common random numbers).
+
+    A candidate i is eliminated after a stage if another surviving candidate j has a lower mean cost by more than the one sided upper confidence bound of the paired difference less delta: mean(i - j) > max(W - delta, 0) with W = t * std(i - j) / sqrt(n) (Bonferroni corrected over the comparisons with the other candidates and the stages, so the best candidate survives with probability at least confidence). The search stops when a single candidate survives, when the survivors are all within delta of each other or after maxreplications replications.
+
+    Attributes:
+        - parameters: keyword parameters passed to thresholdcost (T, lmbda, mu, costofbalking, servers, capacity, warmup, arrivals, services)
+        - thresholds: the candidate thresholds (list of integers, by default 1 to twice Naor's threshold + 1)
+        - confidence: the probability that the best threshold survives (float)
+        - delta: the indifference zone: differences of mean cost smaller than delta do not matter (float)
+        - initial, step, maxreplications: the replications of the first stage, the replications added at each stage and the most replications of a candidate (integers)
+        - seed: the seed of the search (integer or None)
+        - processes: the number of worker processes (by default the number of cores, 1 runs everything in this process)
+        - costs: a dictionary mapping each candidate to its mean cost in each replication
+        - surviving: the candidates that have not been eliminated (list)
+        - eliminated: a dictionary mapping eliminated candidates to (the number of replications, the candidate that eliminated them)
+        - best: the surviving candidate with the lowest mean cost
+        - runs: the number of runs carried out (gridruns: the number of runs of a full grid of maxreplications replications)
+
+    Methods:
+        - run: runs the search
+        - evaluate: runs some replications of some candidates
+        - eliminate: eliminates the candidates that are significantly worse than another one
+        - summarise: the mean cost of each candidate with a confidence interval
+        - statement: the conclusion of the search (string)
+        - printsummary: prints the results of the search
+    """
+    def __init__(self, T, lmbda, mu, costofbalking, thresholds=None, servers=1, capacity=None, warmup=0, arrivals=None, services=None,
+                 confidence=0.95, delta=0, initial=10, step=10, maxreplications=100, seed=None, processes=None):
+        self.parameters = {'T': T, 'lmbda': lmbda, 'mu': mu, 'costofbalking': costofbalking, 'servers': servers, 'capacity': capacity,
+                           'warmup': warmup, 'arrivals': arrivals, 'services': services}
+        if thresholds is None:
+            thresholds = range(1, 2 * headlessMM1.naorthreshold(lmbda, mu, costofbalking, servers) + 2)
+        self.thresholds = sorted(set(thresholds))
+        self.confidence = confidence
+        self.delta = delta
+        self.initial = min(max(initial, 2), maxreplications)
+        self.step = max(step, 1)
+        self.maxreplications = maxreplications
+        self.seed = seed
+        self.processes = processes
+        self.costs = dict((threshold, []) for threshold in self.thresholds)
+        self.surviving = list(self.thresholds)
+        self.eliminated = {}
+        self.best = False
+        self.indifferent = False
+        self.runs = 0
+        self.gridruns = len(self.thresholds) * maxreplications
+
+    def run(self):
+        """
+        The main method which runs the search: stages of replications of the surviving candidates, each followed by an elimination.
+
+        Arguments: NA
+
+        Outputs: the best threshold (integer)
+        """
+        stages = 1 + int(ceil((self.maxreplications - self.initial) / self.step))
+        alpha = (1 - self.confidence) / (max(len(self.thresholds) - 1, 1) * stages)
+        self.streams = replications.streams(self.seed, self.maxreplications)
+        pool = Pool(self.processes) if self.processes != 1 else None
+        try:
+            done, target = 0, self.initial
+            while True:
+                self.evaluate(self.surviving, done, target, pool)
+                done = target
+                self.eliminate(alpha, done)
+                if len(self.surviving) == 1 or self.indifferent or done >= self.maxreplications:
+                    break
+                target = min(done + self.step, self.maxreplications)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        self.best = min(self.surviving, key=lambda threshold: sum(self.costs[threshold]))
+        return self.best
+
+    def evaluate(self, thresholds, start, stop, pool=None):
+        """
+        A method to run replications start to stop - 1 of some candidates (all of the runs in parallel when a pool is given).
+
+        Arguments: thresholds (list of integers), start, stop (integers), pool (a multiprocessing Pool or None)
+
+        Outputs: NA
+        """
+        tasks = [(thresholdcost, self.streams[r], dict(self.parameters, threshold=threshold)) for threshold in thresholds for r in range(start, stop)]
+        if pool is None:
+            results = [runreplication(task) for task in tasks]
+        else:
+            results = pool.map(runreplication, tasks, chunksize=1)
+        for (function, stream, parameters), cost in zip(tasks, results):
+            self.costs[parameters['threshold']].append(cost)
+        self.runs += len(tasks)
+
+    def eliminate(self, alpha, n):
+        """
+        A method to eliminate the surviving candidates that are significantly worse than another surviving candidate (paired differences of the first n replications).
+
+        Arguments: alpha - the error allowed for each comparison (float), n - the number of replications (integer)
+
+        Outputs: NA
+        """
+        t = tquantile(1 - alpha, n - 1)
+        worse = {}
+        self.indifferent = True
+        for i in self.surviving:
+            for j in self.surviving:
+                if i == j:
+                    continue
+                differences = [a - b for a, b in zip(self.costs[i][:n], self.costs[j][:n])]
+                average = sum(differences) / n
+                std = (sum((d - average) ** 2 for d in differences) / (n - 1)) ** .5
+                bound = t * std / n ** .5
+                if bound > self.delta:
+                    self.indifferent = False
+                if average > max(bound - self.delta, 0) and i not in worse:
+                    worse[i] = (n, j)
+        self.eliminated.update(worse)
+        self.surviving = [threshold for threshold in self.surviving if threshold not in worse]
+        if len(self.surviving) == 1:
+            self.indifferent = False
+
+    def summarise(self, confidence=0.95):
+        """
+        A method to summarise the mean cost of each candidate.
+
+        Arguments: confidence - the confidence level of the intervals (float)
+
+        Outputs: a dictionary mapping each candidate to a dictionary with the mean cost, the half width of its confidence interval, the number of replications and (the number of replications, the candidate that eliminated it) or False if it survived
+        """
+        summary = {}
+        for threshold in self.thresholds:
+            values = self.costs[threshold]
+            n = len(values)
+            if n == 0:
+                continue
+            average = sum(values) / n
+            std = (sum((value - average) ** 2 for value in values) / (n - 1)) ** .5 if n > 1 else 0
+            halfwidth = tquantile((1 + confidence) / 2, n - 1) * std / n ** .5 if n > 1 else float('inf')
+            summary[threshold] = {'mean': average, 'halfwidth': halfwidth, 'n': n, 'eliminated': self.eliminated.get(threshold, False)}
+        return summary
+
+    def statement(self):
+        """
+        A method to return the conclusion of the search.
+
+        Arguments: NA
+
+        Outputs: a string
+        """
+        within = " (to within %s)" % self.delta if self.delta else ""
+        if len(self.surviving) == 1:
+            return "Threshold %s minimises the mean cost%s with %.0f%% confidence" % (self.best, within, 100 * self.confidence)
+        survivors = ", ".join(str(threshold) for threshold in self.surviving)
+        if self.indifferent and not self.delta:
+            return "Thresholds %s give the same mean cost in every replication (best estimate: %s)" % (survivors, self.best)
+        if self.indifferent:
+            return "Thresholds %s are within %s of the least mean cost with %.0f%% confidence (best estimate: %s)" % (survivors, self.delta, 100 * self.confidence, self.best)
+        return "The threshold that minimises the mean cost is one of %s with %.0f%% confidence (best estimate: %s, more replications are needed to separate them)" % (survivors, 100 * self.confidence, self.best)
+
+    def printsummary(self, confidence=0.95):
+        """
+        A method to print the mean cost of each candidate, the runs carried out and the conclusion of the search.
+        """
+        summary = self.summarise(confidence)
+        sys.stdout.write("\n%sThreshold search (%.0f%% CI)%s\n" % (5*"-", 100 * confidence, 5*"-"))
+        for threshold in sorted(summary):
+            line = "Threshold %s: %.04f +/- %.04f (%s replications" % (threshold, summary[threshold]['mean'], summary[threshold]['halfwidth'], summary[threshold]['n'])
+            if summary[threshold]['eliminated']:
+                line += ", eliminated by %s" % summary[threshold]['eliminated'][1]
+            sys.stdout.write(line + ")\n")
+        p = self.parameters
+        sys.stdout.write("Naor's threshold (exponential times): %s\n" % headlessMM1.naorthreshold(p['lmbda'], p['mu'], p['costofbalking'], p['servers']))
+        sys.stdout.write("Runs: %s (a full grid: %s, %.1f%%)\n" % (self.runs, self.gridruns, 100 * self.runs / self.gridruns))
+        sys.stdout.write(self.statement() + "\n")
+        sys.stdout.write(39 * "-" + "\n")
+
+
+if __name__ == '__main__':
+    import argparse
+    import distributions
+    parser = argparse.ArgumentParser(description="Search by simulation for the threshold of the optimal players that minimises the mean cost (sequential ranking and selection on common random numbers, run across a pool of processes).")
+    parser.add_argument('-l', action="store", dest="lmbda", type=float, help='The arrival rate', default=2)
+    parser.add_argument('-m', action="store", dest="mu", type=float, help='The service rate', default = 1)
+    parser.add_argument('-T', action="store", dest="T", type=float, help='The overall simulation time of each run', default=500)
+    parser.add_argument('-c', action="store", dest="costofbalking", help='Cost of balking', default=5, type=float)
+    parser.add_argument('-w', action="store", dest="warmuptime", help='Warm up time (default: 0)', default=0, type=float)
+    parser.add_argument('-k', action="store", dest="servers", help='Number of servers', default=1, type=int)
+    parser.add_argument('-K', action="store", dest="capacity", help='Capacity: the largest number in the system (default: no limit)', default=None, type=int)
+    parser.add_argument('-A', action="store", dest="arrivals", help="Interarrival times (in place of exponential with rate -l): 'lognormal:mean:cv', 'gamma:mean:cv', 'deterministic:value', 'empirical:file' or 'trace:file' (arrival dates)", default=None)
+    parser.add_argument('-S', action="store", dest="services", help="Service times (in place of exponential with rate -m): as for -A (but not a trace)", default=None)
+    parser.add_argument('-t', action="store", dest="thresholds", nargs='+', help="Candidate thresholds (default: 1 to twice Naor's threshold + 1)", default=None, type=int)
+    parser.add_argument('-C', action="store", dest="costs", nargs='+', help="Candidate costs of balking: the candidates are the thresholds they give (in place of -t)", default=None, type=float)
+    parser.add_argument('-d', action="store", dest="delta", help='Indifference zone: differences of mean cost that do not matter (default: 0)', default=0, type=float)
+    parser.add_argument('-e', action="store", dest="confidence", help='Confidence level (default: 0.95)', default=0.95, type=float)
+    parser.add_argument('-n', action="store", dest="initial", help='Replications of the first stage', default=10, type=int)
+    parser.add_argument('-i', action="store", dest="step", help='Replications added at each stage', default=10, type=int)
+    parser.add_argument('-N', action="store", dest="maxreplications", help='Most replications of a candidate', default=100, type=int)
+    parser.add_argument('-j', action="store", dest="processes", help='Number of processes (default: number of cores)', default=None, type=int)
+    parser.add_argument('-r', action="store", dest="seed", help='Seed of the search', default=None, type=int)
+    inputs = parser.parse_args()
+    lmbda, mu = inputs.lmbda, inputs.mu
+    arrivals = distributions.parse(inputs.arrivals) if inputs.arrivals else None
+    services = distributions.parse(inputs.services) if inputs.services else None
+    if arrivals is not None:
+        lmbda = arrivals.rate
+    if services is not None:
+        mu = services.rate
+    thresholds = inputs.thresholds
+    if inputs.costs:
+        thresholds = candidates(lmbda, mu, inputs.costs, inputs.servers)
+    search = ThresholdSearch(inputs.T, lmbda, mu, inputs.costofbalking, thresholds=thresholds, servers=inputs.servers, capacity=inputs.capacity,
+                             warmup=inputs.warmuptime, arrivals=arrivals, services=services, confidence=inputs.confidence, delta=inputs.delta,
+                             initial=inputs.initial, step=inputs.step, maxreplications=inputs.maxreplications, seed=inputs.seed, processes=inputs.processes)
+    search.run()
+    search.printsummary(inputs.confidence)
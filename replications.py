@@ -0,0 +1,286 @@
+#!/usr/bin/env python
+"""
+Library to run independent replications of a simulation across a pool of processes.
+
+Every replication is given its own random number stream: the streams are spawned from a single seed (using numpy's SeedSequence) so that they are statistically independent and a whole set of replications can be reproduced from that one seed whatever the number of processes.
+
+- qsim (runs the vectorised MM1Q simulation and returns its metrics);
+- sim (runs the headless simulation and returns its metrics);
+- paired (runs several configurations of the headless simulation on common random numbers and returns their metrics and paired differences);
+- printcomparison (prints the paired differences and what independent runs would have given);
+
+- Replications (this is the main object that runs the replications and merges the results).
+"""
+from __future__ import division  # Simplify division
+from multiprocessing import Pool  # Parallel replications
+import sys  # Use to write to out
+import numpy as np
+import MM1Q
+import headlessMM1
+from headlessMM1 import tquantile  # Quantiles for confidence intervals
+
+def streams(seed, replications):
+    """
+    Function to return independent seeds for a number of replications.
+
+    Arguments:
+        seed - the seed of the whole set of replications (integer or None)
+        replications - the number of streams (integer)
+
+    Output: a list of numpy SeedSequence objects
+    """
+    return np.random.SeedSequence(seed).spawn(replications)
+
+def seedint(stream):
+    """
+    Function to turn a SeedSequence into an integer seed (for generators from the random module).
+
+    Argument: stream - a numpy SeedSequence
+
+    Output: a 128 bit integer
+    """
+    return sum(int(word) << (32 * k) for k, word in enumerate(stream.generate_state(4)))
+
+def qsim(stream, lambd, mu, simulation_time, quantiles=False):
+    """
+    Function to run a single replication of the vectorised MM1Q simulation.
+
+    Arguments:
+        stream - a numpy SeedSequence
+        lambd, mu, simulation_time - as for MM1Q.QSim
+        quantiles - a boolean to also return sketches of the distributions of the waits and times in system
+
+    Output: a dictionary of metrics (with quantiles=True, also 'waitingtimesketch' and 'systemtimesketch': headlessMM1.QuantileSketch objects)
+    """
+    results = MM1Q.streaming_statistics(lambd, mu, simulation_time, seed=stream, quantiles=quantiles)
+    metrics = {'customers': results['Customers'],
+               'meanwaitingtime': results['Wait'].mean,
+               'meansystemtime': results['Time_In_System'].mean,
+               'meanservicetime': results['Service_Time'].mean,
+               'utilisation': results['Utilisation']}
+    if quantiles:
+        metrics['waitingtimesketch'] = results['Sketches']['Wait']
+        metrics['systemtimesketch'] = results['Sketches']['Time_In_System']
+    return metrics
+
+def sim(stream, T, lmbda, mu, costofbalking=False, warmup=0, quantiles=False):
+    """
+    Function to run a single replication of the headless simulation.
+
+    Arguments:
+        stream - a numpy SeedSequence
+        T, lmbda, mu, costofbalking - as for headlessMM1.Sim
+        warmup - the warm up time (float, or 'auto' to detect it)
+        quantiles - a boolean to also return sketches of the distributions of the waiting times, system times and numbers in the queue
+
+    Output: a dictionary of metrics (as returned by headlessMM1.Sim.summarise; with quantiles=True, also headlessMM1.QuantileSketch objects named as waitingtimesketch or selfishwaitingtimesketch for each of the sketches of headlessMM1.Sim.quantilesketches)
+    """
+    q = headlessMM1.Sim(T, lmbda, mu, costofbalking=costofbalking, seed=seedint(stream), warmupdetection=warmup == 'auto')
+    q.run()
+    metrics = q.summarise(warmup)
+    if quantiles:
+        for kind, sketches in q.quantilesketches(q.warmup).items():
+            for name, sketch in sketches.items():
+                metrics['%s%ssketch' % ('' if kind == 'all' else kind, name)] = sketch
+    return metrics
+
+def paired(stream, T, lmbda, mu, configurations, warmup=0, antithetic=False, metrics=('meanwaitingtime', 'meancost')):
+    """
+    Function to run a single replication of a paired comparison of configurations of the headless simulation with common random numbers: every configuration is run on a headlessMM1.Streams with the same seed so that all of them see the same arrivals and services (and types of players) and only the policy differs. With antithetic=True every configuration is also run on the antithetic streams and each metric is the mean of the two runs.
+
+    Arguments:
+        stream - a numpy SeedSequence
+        T, lmbda, mu - as for headlessMM1.Sim
+        configurations - the costs of balking to compare (list, each as for headlessMM1.Sim: for example [[0, 5], [1, 5]] compares all optimal with all selfish players)
+        warmup - the warm up time (float, or 'auto' to detect it: the latest warm up detected over all the runs is used for every run so that they stay paired)
+        antithetic - a boolean to also run on antithetic streams
+        metrics - the metrics to compare (names from headlessMM1.Sim.metrics)
+
+    Output: a dictionary mapping metric[k] to the metric of configuration k and metric[k]-[0] to its paired difference with the first configuration (False where there is no data)
+    """
+    seed = seedint(stream)
+    sims = []
+    for costofbalking in configurations:
+        sims.append([])
+        for flip in ([False, True] if antithetic else [False]):
+            q = headlessMM1.Sim(T, lmbda, mu, costofbalking=costofbalking, streams=headlessMM1.Streams(seed, flip), warmupdetection=warmup == 'auto')
+            q.run()
+            sims[-1].append(q)
+    if warmup == 'auto':
+        warmup = max(q.detectwarmup() for runs in sims for q in runs)
+    values = []
+    for runs in sims:
+        runs = [q.summarise(warmup) for q in runs]
+        values.append(dict((metric, False if any(run[metric] is False for run in runs) else sum(run[metric] for run in runs) / len(runs)) for metric in metrics))
+    results = {}
+    for k, value in enumerate(values):
+        for metric in metrics:
+            results['%s[%s]' % (metric, k)] = value[metric]
+            if k > 0:
+                results['%s[%s]-[0]' % (metric, k)] = False if value[metric] is False or values[0][metric] is False else value[metric] - values[0][metric]
+    return results
+
+def printcomparison(replications, confidence=0.95):
+    """
+    Function to print the paired differences of a set of replications of paired with the half width that the same number of independent runs would have given (the standard deviations of the two configurations combined as if they were not correlated).
+
+    Arguments:
+        replications - a Replications of paired that has been run
+        confidence - the confidence level of the intervals (float)
+
+    Output: NA
+    """
+    summary = replications.summarise(confidence)
+    sys.stdout.write("\n%sPaired differences (%.0f%% CI)%s\n" % (5*"-", 100 * confidence, 5*"-"))
+    for difference in sorted(name for name in summary if name.endswith('-[0]')):
+        metric = difference[:difference.index('[')]
+        first, other = summary.get(metric + '[0]'), summary.get(difference[:-4])
+        line = "%s: %.04f +/- %.04f" % (difference, summary[difference]['mean'], summary[difference]['halfwidth'])
+        n = summary[difference]['n']
+        if first and other and n > 1:
+            independent = tquantile((1 + confidence) / 2, n - 1) * ((first['std'] ** 2 + other['std'] ** 2) / n) ** .5
+            line += " (independent runs: +/- %.04f)" % independent
+        sys.stdout.write(line + "\n")
+    sys.stdout.write(39 * "-" + "\n")
+
+def runreplication(task):
+    """
+    Function to run a single replication in a worker process.
+
+    Argument: task - a tuple (function, stream, parameters)
+
+    Output: the dictionary of metrics returned by function
+    """
+    function, stream, parameters = task
+    return function(stream, **parameters)
+
+class Replications():
+    """
+    A class for a set of independent replications.
+
+    Attributes:
+        - function: a module level function taking a SeedSequence and keyword parameters and returning a dictionary of metrics (for example qsim or sim)
+        - replications: the number of replications (integer)
+        - seed: the seed of the whole set of replications (integer or None)
+        - processes: the number of worker processes (by default the number of cores, 1 runs everything in this process)
+        - parameters: keyword parameters passed to function
+        - results: a list with the dictionary of metrics of each replication
+
+    Methods:
+        - run: runs the replications
+        - summarise: merges the results into means with confidence intervals
+        - mergesketches: merges the quantile sketches of the replications
+        - printsummary: prints the merged results
+    """
+    def __init__(self, function, replications, seed=None, processes=None, **parameters):
+        self.function = function
+        self.replications = replications
+        self.seed = seed
+        self.processes = processes
+        self.parameters = parameters
+        self.results = []
+
+    def run(self):
+        """
+        The main method which runs the replications (each one with its own stream).
+
+        Arguments: NA
+
+        Outputs: NA
+        """
+        tasks = [(self.function, stream, self.parameters) for stream in streams(self.seed, self.replications)]
+        if self.processes == 1:
+            self.results = [runreplication(task) for task in tasks]
+            return
+        pool = Pool(self.processes)
+        try:
+            self.results = pool.map(runreplication, tasks, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+
+    def summarise(self, confidence=0.95):
+        """
+        A method to merge the results of the replications.
+
+        Arguments: confidence - the confidence level of the intervals (float)
+
+        Outputs: a dictionary mapping each metric to a dictionary with the mean, standard deviation, half width of the confidence interval and number of replications with a value for that metric (metrics that are False in a replication are left out of it, quantile sketches are merged by mergesketches)
+        """
+        summary = {}
+        for metric in sorted(set(metric for result in self.results for metric in result)):
+            values = [result[metric] for result in self.results if metric in result and result[metric] is not False]
+            n = len(values)
+            if n == 0 or isinstance(values[0], headlessMM1.QuantileSketch):
+                continue
+            average = sum(values) / n
+            std = (sum((value - average) ** 2 for value in values) / (n - 1)) ** .5 if n > 1 else 0
+            halfwidth = tquantile((1 + confidence) / 2, n - 1) * std / n ** .5 if n > 1 else float('inf')
+            summary[metric] = {'mean': average, 'std': std, 'halfwidth': halfwidth, 'n': n}
+        return summary
+
+    def mergesketches(self):
+        """
+        A method to merge the quantile sketches of the replications (the sketch of all of the customers of all of the replications).
+
+        Arguments: NA
+
+        Outputs: a dictionary mapping each metric that is a headlessMM1.QuantileSketch to the merged sketch
+        """
+        sketches = {}
+        for result in self.results:
+            for metric, value in result.items():
+                if isinstance(value, headlessMM1.QuantileSketch):
+                    if metric not in sketches:
+                        sketches[metric] = headlessMM1.QuantileSketch(value.accuracy, value.minimum, value.maxbuckets)
+                    sketches[metric].merge(value)
+        return sketches
+
+    def printsummary(self, confidence=0.95, percentiles=(50, 90, 95, 99)):
+        """
+        A method to print the mean of each metric with a confidence interval (and percentiles of the merged quantile sketches).
+        """
+        summary = self.summarise(confidence)
+        sys.stdout.write("\n%sReplications (%s, %.0f%% CI)%s\n" % (5*"-", len(self.results), 100 * confidence, 5*"-"))
+        for metric in sorted(summary):
+            sys.stdout.write("%s: %.04f +/- %.04f\n" % (metric, summary[metric]['mean'], summary[metric]['halfwidth']))
+        sketches = self.mergesketches()
+        for metric in sorted(sketches):
+            values = sketches[metric].percentiles(percentiles)
+            sys.stdout.write("%s: %s\n" % (metric, ", ".join("p%s=%s" % (p, "%.04f" % values[p] if values[p] is not False else "-") for p in percentiles)))
+        sys.stdout.write(39 * "-" + "\n")
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Independent replications of the headless simulation of an MM1 queue run across a pool of processes.")
+    parser.add_argument('-l', action="store", dest="lmbda", type=float, help='The arrival rate', default=2)
+    parser.add_argument('-m', action="store", dest="mu", type=float, help='The service rate', default = 1)
+    parser.add_argument('-T', action="store", dest="T", type=float, help='The overall simulation time', default=500)
+    parser.add_argument('-p', action="store", dest="probofselfish", help='Proportion of selfish players (default: 0)', default=0, type=float)
+    parser.add_argument('-c', action="store", dest="costofbalking", help='Cost of balking (default: False)', default=False, type=float)
+    parser.add_argument('-w', action="store", dest="warmuptime", help="Warm up time (default: 'auto', detected with MSER-5)", default='auto', type=headlessMM1.warmupargument)
+    parser.add_argument('-n', action="store", dest="replications", help='Number of replications', default=10, type=int)
+    parser.add_argument('-j', action="store", dest="processes", help='Number of processes (default: number of cores)', default=None, type=int)
+    parser.add_argument('-r', action="store", dest="seed", help='Seed of the replications', default=None, type=int)
+    parser.add_argument('-x', action="store_true", dest="compare", help='Compare all optimal players ([0]) with all selfish players ([1]) on common random numbers (needs a cost of balking)')
+    parser.add_argument('-a', action="store_true", dest="antithetic", help='With -x: also run every comparison on antithetic streams')
+    parser.add_argument('-q', action="store_true", dest="quantiles", help='Also print percentiles of the waiting times, system times and numbers in the queue (sketches merged over the replications)')
+    inputs = parser.parse_args()
+    costofbalking = inputs.costofbalking
+    if inputs.compare:
+        if not costofbalking:
+            parser.error("a comparison needs a cost of balking (-c)")
+        r = Replications(paired, inputs.replications, seed=inputs.seed, processes=inputs.processes,
+                         T=inputs.T, lmbda=inputs.lmbda, mu=inputs.mu, configurations=[[0, costofbalking], [1, costofbalking]],
+                         warmup=inputs.warmuptime, antithetic=inputs.antithetic)
+        r.run()
+        r.printsummary()
+        printcomparison(r)
+    else:
+        if costofbalking:
+            costofbalking = [inputs.probofselfish, inputs.costofbalking]
+        r = Replications(sim, inputs.replications, seed=inputs.seed, processes=inputs.processes,
+                         T=inputs.T, lmbda=inputs.lmbda, mu=inputs.mu, costofbalking=costofbalking, warmup=inputs.warmuptime, quantiles=inputs.quantiles)
+        r.run()
+        r.printsummary()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+"""
+Library to sweep the headless simulation of an MM1 queue over a grid (or a list) of configurations.
+
+A configuration is a dictionary with values for lmbda, mu, costofbalking and probofselfish (the same parameters as the -l, -m, -c and -p options of graphicalMM1). Runs are scheduled across a pool of processes and every result is appended to a single csv file as soon as it is available, with the settings of the run (T, warmup and seed). Configurations already in that file with the same settings are skipped so that an interrupted sweep can be resumed without redoing any work (a row cut short by an interruption is dropped and run again).
+
+- grid (returns the list of configurations of a grid);
+- key (identifies a configuration and the settings of its run in the csv file);
+- Sweep (this is the main object that runs the sweep).
+"""
+from __future__ import division  # Simplify division
+from itertools import product  # Grids of configurations
+from multiprocessing import Pool  # Parallel runs
+import csv
+import os
+import sys  # Use to write to out
+import zlib  # Seeds that only depend on the configuration
+import numpy as np
+import headlessMM1
+import replications
+
+PARAMETERS = ['lmbda', 'mu', 'costofbalking', 'probofselfish']  # The parameters of a configuration
+SETTINGS = ['T', 'warmup', 'seed']  # The settings of the runs of a sweep (written with every row)
+
+def grid(lmbda, mu, costofbalking=(False,), probofselfish=(0,)):
+    """
+    Function to return every combination of some values of the parameters.
+
+    Arguments: a list of values for each of the parameters
+
+    Output: a list of configurations (dictionaries)
+    """
+    return [dict(zip(PARAMETERS, values)) for values in product(lmbda, mu, costofbalking, probofselfish)]
+
+def configurationkey(configuration):
+    """
+    Function to return a key that identifies a configuration (the same whether the configuration was built here or read back from the csv file).
+
+    Argument: configuration - a dictionary
+
+    Output: a tuple of floats (a cost of balking of False is read as 0)
+    """
+    return tuple(0.0 if configuration[parameter] in (False, 'False') else float(configuration[parameter]) for parameter in PARAMETERS)
+
+def key(configuration, T, warmup, seed):
+    """
+    Function to return a key that identifies a configuration and the settings of its run (the same whether the configuration was built here or read back from the csv file).
+
+    Arguments:
+        configuration - a dictionary
+        T, warmup, seed - the settings of the run (as given to Sweep or as read from the csv file)
+
+    Output: a tuple (the configurationkey then T, the warm up time and the seed)
+    """
+    return configurationkey(configuration) + (float(T), 'auto' if warmup == 'auto' else float(warmup), int(seed))
+
+def complete(row, columns):
+    """
+    Function to check that a row read back from the csv file holds a value that parses for every column (a row cut short by an interruption does not).
+
+    Arguments: row - a dictionary (from csv.DictReader), columns - the columns of the file
+
+    Output: a boolean
+    """
+    if None in row or any(row.get(column) is None for column in columns):
+        return False
+    try:
+        key(row, row['T'], row['warmup'], row['seed'])
+        for column in columns:
+            if column not in PARAMETERS + SETTINGS and row[column] not in ('False', 'True'):
+                float(row[column])
+    except ValueError:
+        return False
+    return True
+
+def truncatepartial(path):
+    """
+    Function to remove a last row that was cut short by an interruption (everything after the last end of line).
+
+    Argument: path - the csv file
+
+    Output: a boolean (True if a partial row was removed)
+    """
+    with open(path, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        end = size
+        while end > 0:
+            start = max(0, end - 4096)
+            f.seek(start)
+            block = f.read(end - start)
+            newline = block.rfind(b'\n')
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        if end == size:
+            return False
+        f.truncate(end)
+        return True
+
+def runpoint(task):
+    """
+    Function to run the simulation at one configuration (in a worker process).
+
+    Argument: task - a tuple (configuration, T, warmup, seed)
+
+    Output: a dictionary with the configuration, the settings of the run and the metrics of headlessMM1.Sim.summarise
+    """
+    configuration, T, warmup, seed = task
+    costofbalking = configuration['costofbalking']
+    if costofbalking:
+        costofbalking = [configuration['probofselfish'], costofbalking]
+    stream = np.random.SeedSequence([seed, zlib.crc32(repr(configurationkey(configuration)).encode())])
+    q = headlessMM1.Sim(T, configuration['lmbda'], configuration['mu'], costofbalking=costofbalking, seed=replications.seedint(stream), warmupdetection=warmup == 'auto')
+    q.run()
+    row = dict(configuration, T=T, warmup=warmup, seed=seed)
+    row.update(q.summarise(warmup))
+    return row
+
+class Sweep():
+    """
+    A class for a sweep over a list of configurations.
+
+    Attributes:
+        - configurations: a list of configurations (for example from grid)
+        - outfile: the csv file that the results are appended to
+        - T: the overall simulation time of each run (float)
+        - warmup: the warm up time of each run (float, or 'auto' to detect it in each run)
+        - seed: the seed of the sweep (integer: the seed of each run is derived from it and from the configuration so that results do not depend on the order of the runs)
+        - processes: the number of worker processes (by default the number of cores)
+
+    Methods:
+        - completed: returns the keys of the configurations (and settings) already in outfile
+        - run: runs the configurations that are not yet in outfile with the settings of this sweep
+    """
+    columns = PARAMETERS + SETTINGS + headlessMM1.Sim.metrics
+
+    def __init__(self, configurations, outfile, T, warmup=0, seed=0, processes=None):
+        self.configurations = configurations
+        self.outfile = outfile
+        self.T = T
+        self.warmup = warmup
+        if seed is None:
+            raise ValueError("a sweep needs a seed: the seed of each run is derived from it so that an interrupted sweep can be resumed")
+        self.seed = seed
+        self.processes = processes
+
+    def completed(self):
+        """
+        A method to read the configurations that already have results: only rows that end with an end of line and whose every field parses are counted (so that a row cut short is run again). A file written with other columns (by an earlier version) raises a ValueError rather than being mixed with new rows.
+
+        Arguments: NA
+
+        Outputs: a set of keys (see key)
+        """
+        if not os.path.exists(self.outfile) or os.path.getsize(self.outfile) == 0:
+            return set()
+        with open(self.outfile, newline='') as f:
+            reader = csv.DictReader(line for line in f if line.endswith('\n'))
+            if reader.fieldnames != self.columns:
+                raise ValueError("%s has other columns than the results of a sweep (%s): use another file" % (self.outfile, ', '.join(self.columns)))
+            return set(key(row, row['T'], row['warmup'], row['seed']) for row in reader if complete(row, self.columns))
+
+    def run(self):
+        """
+        The main method which runs the sweep: results are written to outfile as each run completes.
+
+        Arguments: NA
+
+        Outputs: the number of configurations that were run (integer)
+        """
+        done = self.completed()
+        tasks = []
+        for configuration in self.configurations:
+            if key(configuration, self.T, self.warmup, self.seed) not in done:
+                done.add(key(configuration, self.T, self.warmup, self.seed))  # Also skips duplicates in the list
+                tasks.append((configuration, self.T, self.warmup, self.seed))
+        if not tasks:
+            return 0
+        newfile = not os.path.exists(self.outfile) or os.path.getsize(self.outfile) == 0
+        if not newfile:
+            truncatepartial(self.outfile)  # The last row was cut short by an interruption
+        with open(self.outfile, 'a', newline='') as f:
+            output = csv.DictWriter(f, self.columns)
+            if newfile:
+                output.writeheader()
+            pool = Pool(self.processes)
+            try:
+                for k, row in enumerate(pool.imap_unordered(runpoint, tasks), 1):
+                    output.writerow(dict((column, repr(value) if type(value) is float else value) for column, value in row.items()))
+                    f.flush()  # Every completed run survives an interruption
+                    sys.stdout.write('\r%s of %s configurations completed' % (k, len(tasks)))
+                    sys.stdout.flush()
+            finally:
+                pool.close()
+                pool.join()
+        sys.stdout.write('\n')
+        return len(tasks)
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="A sweep of the headless simulation of an MM1 queue over a grid of arrival rates, service rates, costs of balking and proportions of selfish players. Results are appended to a csv file and configurations already in that file are skipped.")
+    parser.add_argument('-l', action="store", dest="lmbda", type=float, nargs='+', help='The arrival rates', default=[2])
+    parser.add_argument('-m', action="store", dest="mu", type=float, nargs='+', help='The service rates', default=[1])
+    parser.add_argument('-T', action="store", dest="T", type=float, help='The overall simulation time of each run', default=500)
+    parser.add_argument('-p', action="store", dest="probofselfish", nargs='+', help='Proportions of selfish players (default: 0)', default=[0], type=float)
+    parser.add_argument('-c', action="store", dest="costofbalking", nargs='+', help='Costs of balking (default: False)', default=[False], type=float)
+    parser.add_argument('-w', action="store", dest="warmuptime", help="Warm up time (default: 'auto', detected with MSER-5)", default='auto', type=headlessMM1.warmupargument)
+    parser.add_argument('-o', action="store", dest="outfile", help='The csv file of results', default='sweep.csv')
+    parser.add_argument('-j', action="store", dest="processes", help='Number of processes (default: number of cores)', default=None, type=int)
+    parser.add_argument('-r', action="store", dest="seed", help='Seed of the sweep', default=0, type=int)
+    inputs = parser.parse_args()
+    s = Sweep(grid(inputs.lmbda, inputs.mu, inputs.costofbalking, inputs.probofselfish), inputs.outfile, inputs.T,
+              warmup=inputs.warmuptime, seed=inputs.seed, processes=inputs.processes)
+    s.run()
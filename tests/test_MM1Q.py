@@ -0,0 +1,182 @@
+"""
+Tests of the vectorised engine of MM1Q.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import numpy as np
+import MM1Q
+
+
+class TestLindley(unittest.TestCase):
+    def test_plain_loop(self):
+        """The array form of the recursion gives the waits of a customer by customer loop"""
+        data = MM1Q.lindley(0.9, 1, 2000, chunk_size=100, seed=1)
+        arrival_dates, service_times = data['Arrival_Date'], data['Service_Time']
+        wait, service_end_date = 0.0, 0.0
+        for n in range(len(arrival_dates)):
+            wait = max(0.0, service_end_date - arrival_dates[n])
+            service_end_date = arrival_dates[n] + wait + service_times[n]
+            self.assertAlmostEqual(data['Wait'][n], wait, places=9)
+        self.assertTrue(np.allclose(data['Service_End_Date'], data['Arrival_Date'] + data['Wait'] + data['Service_Time']))
+
+    def test_chunk_size(self):
+        """A seed gives the same customers whatever the size of the blocks"""
+        small = MM1Q.lindley(0.8, 1, 1000, chunk_size=37, seed=5)
+        large = MM1Q.lindley(0.8, 1, 1000, chunk_size=2**20, seed=5)
+        self.assertTrue(np.array_equal(small['Customer'], large['Customer']))
+        for column in MM1Q.COLUMNS:
+            self.assertTrue(np.allclose(small[column], large[column]), column)
+
+    def test_end_of_run(self):
+        """Customers arrive until the first arrival after the end of the run"""
+        data = MM1Q.lindley(1, 2, 500, chunk_size=64, seed=2)
+        self.assertTrue((data['Arrival_Date'][:-1] < 500).all())
+        self.assertGreaterEqual(data['Arrival_Date'][-1], 500)
+        self.assertTrue((data['Wait'] >= 0).all())
+
+    def test_mean_wait(self):
+        """The mean wait is close to that of an M/M/1 queue: rho / (mu - lambd)"""
+        data = MM1Q.lindley(0.5, 1, 200000, seed=3)
+        self.assertAlmostEqual(data['Wait'].mean(), 1.0, delta=0.05)
+
+
+class TestRunningStat(unittest.TestCase):
+    def test_update(self):
+        """Welford's update gives the mean and sample variance of the observations"""
+        values = np.random.default_rng(0).normal(3, 2, 1000)
+        stat = MM1Q.RunningStat()
+        for value in values:
+            stat.update(value)
+        self.assertEqual(stat.count, 1000)
+        self.assertAlmostEqual(stat.mean, values.mean())
+        self.assertAlmostEqual(stat.variance(), values.var(ddof=1))
+        self.assertAlmostEqual(stat.total(), values.sum())
+
+    def test_update_array(self):
+        """Adding blocks gives the same result as adding each observation"""
+        values = np.random.default_rng(1).exponential(1, 1000)
+        single, blocks = MM1Q.RunningStat(), MM1Q.RunningStat()
+        for value in values:
+            single.update(value)
+        for start in range(0, 1000, 77):
+            blocks.update_array(values[start:start + 77])
+        blocks.update_array(values[:0])
+        self.assertEqual(blocks.count, single.count)
+        self.assertAlmostEqual(blocks.mean, single.mean)
+        self.assertAlmostEqual(blocks.variance(), single.variance())
+
+
+class TestStreamingStatistics(unittest.TestCase):
+    def test_full_data(self):
+        """The streamed statistics are those of the full data set"""
+        data = MM1Q.lindley(0.9, 1, 5000, chunk_size=500, seed=7)
+        statistics = MM1Q.streaming_statistics(0.9, 1, 5000, chunk_size=500, seed=7)
+        self.assertEqual(statistics['Customers'], len(data['Wait']))
+        self.assertAlmostEqual(statistics['Wait'].mean, data['Wait'].mean())
+        self.assertAlmostEqual(statistics['Wait'].variance(), data['Wait'].var(ddof=1))
+        self.assertAlmostEqual(statistics['Time_In_System'].mean, (data['Service_End_Date'] - data['Arrival_Date']).mean())
+        self.assertAlmostEqual(statistics['Utilisation'], data['Service_Time'].sum() / data['Arrival_Date'][-1])
+
+
+class TestSequentialStatistics(unittest.TestCase):
+    def test_targets(self):
+        """The run stops once the intervals are precise enough"""
+        statistics = MM1Q.sequential_statistics(0.5, 1, wait=0.02, cost=0.02, chunk_size=1000, seed=1)
+        self.assertTrue(statistics['Converged'])
+        for name in ['Wait', 'Time_In_System']:
+            average, halfwidth = statistics['Intervals'][name]
+            self.assertLessEqual(halfwidth / average, 0.02)
+        self.assertAlmostEqual(statistics['Wait'].mean, 1.0, delta=0.05)
+
+    def test_limit(self):
+        """The run stops at max_time with a warning when the targets are not met"""
+        with mock.patch('sys.stderr') as stderr:
+            statistics = MM1Q.sequential_statistics(0.9, 1, wait=0.0001, max_time=500, chunk_size=100, seed=1)
+        self.assertFalse(statistics['Converged'])
+        self.assertLessEqual(statistics['Stopping_Date'] - 500, 100)
+        self.assertIn('Warning', stderr.write.call_args[0][0])
+
+    def test_arguments(self):
+        """A target is needed and the queue must be stable"""
+        self.assertRaises(ValueError, MM1Q.sequential_statistics, 0.5, 1)
+        self.assertRaises(ValueError, MM1Q.sequential_statistics, 1, 1, wait=0.1)
+
+
+class TestGradients(unittest.TestCase):
+    def test_plain_loop(self):
+        """The derivatives follow the recursion dW(n+1) = dW(n) + dS(n) - dA(n+1) while customers wait (0 otherwise)"""
+        data = MM1Q.lindley(0.9, 1, 3000, chunk_size=97, seed=4, gradients=True)
+        inter_arrival_times = np.diff(data['Arrival_Date'], prepend=0.0)
+        service_times = data['Service_Time']
+        for parameter, d_inter_arrival_times, d_service_times in [('lambda', -inter_arrival_times / 0.9, 0 * service_times),
+                                                                  ('mu', 0 * inter_arrival_times, -service_times)]:
+            d_wait = 0.0
+            expected = [d_wait]
+            for n in range(1, len(service_times)):
+                d_wait = d_wait + d_service_times[n - 1] - d_inter_arrival_times[n] if data['Wait'][n] > 0 else 0.0
+                expected.append(d_wait)
+            self.assertTrue(np.allclose(data['dWait_d' + parameter], expected), parameter)
+            self.assertTrue(np.allclose(data['dTime_In_System_d' + parameter], np.array(expected) + d_service_times), parameter)
+
+    def test_chunk_size(self):
+        """The derivatives do not depend on the size of the blocks (busy periods carried over between blocks)"""
+        small = MM1Q.lindley(0.9, 1, 3000, chunk_size=31, seed=5, gradients=True)
+        large = MM1Q.lindley(0.9, 1, 3000, seed=5, gradients=True)
+        for name in MM1Q.GRADIENTS:
+            self.assertTrue(np.allclose(small[name], large[name]), name)
+
+    def test_mm1(self):
+        """The mean derivatives are those of the M/M/1 formulas: W = lambd / (mu * (mu - lambd)) and T = 1 / (mu - lambd)"""
+        statistics = MM1Q.streaming_statistics(0.5, 1, 200000, seed=6, gradients=True)
+        expected = {'dWait_dlambda': 4, 'dWait_dmu': -3, 'dTime_In_System_dlambda': 4, 'dTime_In_System_dmu': -4}
+        for name, value in expected.items():
+            mean, halfwidth = statistics['Gradients'][name]
+            self.assertLess(halfwidth, 1)
+            self.assertAlmostEqual(mean, value, delta=2 * halfwidth)
+
+
+class TestTraceWriter(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_npy(self):
+        """Blocks written as .npy columns are read back as the full data set"""
+        path = os.path.join(self.directory, 'trace')
+        writer = MM1Q.Trace_Writer(path)
+        statistics = MM1Q.streaming_statistics(0.9, 1, 3000, chunk_size=256, seed=2, writer=writer)
+        writer.close()
+        data = MM1Q.lindley(0.9, 1, 3000, chunk_size=256, seed=2)
+        for column in MM1Q.COLUMNS:
+            saved = np.load(os.path.join(path, column + '.npy'), mmap_mode='r')
+            self.assertEqual(saved.dtype, MM1Q.DTYPES[column])
+            self.assertTrue(np.array_equal(saved, data[column]), column)
+        self.assertEqual(writer.count, statistics['Customers'])
+
+    def test_csv(self):
+        """Rows written as csv hold the same values"""
+        path = os.path.join(self.directory, 'trace.csv')
+        writer = MM1Q.Trace_Writer(path, format='csv')
+        for chunk in MM1Q.lindley_chunks(0.5, 1, 200, chunk_size=50, seed=3):
+            writer.write(chunk)
+        writer.close()
+        data = MM1Q.lindley(0.5, 1, 200, chunk_size=50, seed=3)
+        saved = np.genfromtxt(path, delimiter=',', names=True)
+        for column in MM1Q.COLUMNS:
+            self.assertTrue(np.array_equal(saved[column], data[column]), column)
+
+    def test_format(self):
+        self.assertRaises(ValueError, MM1Q.Trace_Writer, os.path.join(self.directory, 'trace'), 'txt')
+
+
+if __name__ == '__main__':
+    unittest.main()
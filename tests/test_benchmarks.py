@@ -0,0 +1,44 @@
+"""
+Tests of the benchmark suite.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import benchmarks
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_every_benchmark(self):
+        """Every benchmark runs at a small size and counts its events"""
+        results = benchmarks.runbenchmarks(sizes=[200], utilisations=[0.5], repeats=1, verbose=False)
+        self.assertEqual(sorted(result['benchmark'] for result in results), sorted(benchmarks.BENCHMARKS))
+        for result in results:
+            self.assertGreater(result['events'], 0, result['benchmark'])
+            self.assertGreater(result['eventspersecond'], 0, result['benchmark'])
+            self.assertGreater(result['peakmemory'], 0, result['benchmark'])
+
+    def test_baseline(self):
+        """A saved baseline is read back and regressions beyond the tolerance are reported"""
+        baseline = [{'benchmark': 'sim', 'size': 1000, 'utilisation': 0.5, 'eventspersecond': 1000.0, 'peakmemory': 10 ** 6}]
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'baseline.json')
+        benchmarks.save(baseline, path)
+        self.assertEqual(benchmarks.load(path), baseline)
+        same = [dict(baseline[0], eventspersecond=800.0, peakmemory=1.2 * 10 ** 6)]
+        self.assertEqual(benchmarks.compare(same, baseline), [])
+        slower = [dict(baseline[0], eventspersecond=700.0)]
+        self.assertEqual(len(benchmarks.compare(slower, baseline)), 1)
+        larger = [dict(baseline[0], peakmemory=2 * 10 ** 6)]
+        self.assertEqual(len(benchmarks.compare(larger, baseline)), 1)
+        other = [dict(baseline[0], size=10, eventspersecond=1.0)]
+        self.assertEqual(benchmarks.compare(other, baseline), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
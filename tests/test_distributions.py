@@ -0,0 +1,106 @@
+"""
+Tests of the general distributions and of the arrival traces.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import numpy as np
+import distributions
+import headlessMM1
+import MM1Q
+
+
+class TestDistributions(unittest.TestCase):
+    def test_moments(self):
+        """Samples have the mean and coefficient of variation asked for"""
+        rng = np.random.default_rng(0)
+        for distribution, cv in [(distributions.Exponential(2), 1), (distributions.Lognormal(3, 0.5), 0.5), (distributions.Gamma(3, 2), 2), (distributions.Deterministic(1.5), 0)]:
+            times = distribution.sample(rng, 200000)
+            self.assertAlmostEqual(times.mean(), distribution.mean, delta=0.02 * distribution.mean)
+            self.assertAlmostEqual(times.std() / times.mean(), cv, delta=0.05)
+            self.assertAlmostEqual(distribution.rate, 1 / distribution.mean)
+            self.assertTrue((times >= 0).all())
+
+    def test_empirical(self):
+        """Empirical times are drawn from the values"""
+        distribution = distributions.Empirical([1, 2, 4])
+        times = distribution.sample(np.random.default_rng(1), 3000)
+        self.assertEqual(set(times.tolist()), {1, 2, 4})
+        self.assertAlmostEqual(distribution.mean, 7 / 3)
+        self.assertRaises(ValueError, distributions.Empirical, [])
+
+    def test_parse(self):
+        self.assertEqual(distributions.parse('exponential:2').rate, 2)
+        self.assertEqual(distributions.parse('deterministic:0.5').mean, 0.5)
+        lognormal = distributions.parse('lognormal:1:0.5')
+        self.assertIsInstance(lognormal, distributions.Lognormal)
+        self.assertEqual(lognormal.mean, 1)
+        self.assertRaises(ValueError, distributions.parse, 'weibull:1:2')
+
+    def test_md1(self):
+        """The mean wait of an M/D/1 queue is that of the Pollaczek-Khinchine formula"""
+        data = MM1Q.lindley(0.8, 1, 100000, seed=2, services=distributions.Deterministic(1))
+        self.assertAlmostEqual(data['Wait'].mean(), 0.8 / (2 * 0.2), delta=0.2)
+
+
+class TestArrivalTrace(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.dates = 10 + np.cumsum(np.random.default_rng(3).exponential(0.5, 1000))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_npy(self):
+        """A .npy trace is read a chunk at a time: times between arrivals with a first time of 0"""
+        path = os.path.join(self.directory, 'dates.npy')
+        np.save(path, self.dates)
+        trace = distributions.ArrivalTrace(path, chunk_size=64)
+        self.assertEqual(trace.count, 1000)
+        self.assertAlmostEqual(trace.rate, 999 / (self.dates[-1] - self.dates[0]))
+        times = np.concatenate(list(trace.blocks()))
+        self.assertEqual(times[0], 0)
+        self.assertTrue(np.allclose(np.cumsum(times), self.dates - self.dates[0]))
+
+    def test_text(self):
+        """A column of a delimited text file is read with its header skipped and scaled"""
+        path = os.path.join(self.directory, 'dates.csv')
+        with open(path, 'w') as f:
+            f.write('id,date\n')
+            for k, date in enumerate(self.dates.tolist()):
+                f.write('%s,%r\n' % (k, date))
+        trace = distributions.ArrivalTrace(path, chunk_size=64, column=1, delimiter=',', skiprows=1, scale=2)
+        self.assertEqual(trace.count, 1000)
+        self.assertAlmostEqual(trace.rate, 999 / (2 * (self.dates[-1] - self.dates[0])))
+        self.assertTrue(np.allclose(np.cumsum(np.concatenate(list(trace.blocks()))), 2 * (self.dates - self.dates[0])))
+
+    def test_replay(self):
+        """The arrivals of a trace driven run are those of the trace, in both engines"""
+        path = os.path.join(self.directory, 'dates.npy')
+        np.save(path, self.dates)
+        data = MM1Q.lindley(None, 3, 10 ** 6, chunk_size=100, seed=1, arrivals=distributions.parse('trace:' + path))
+        self.assertTrue(np.allclose(data['Arrival_Date'], self.dates - self.dates[0]))
+        trace = distributions.ArrivalTrace(path)
+        q = headlessMM1.Sim(10 ** 6, trace.rate, 3, streams=headlessMM1.BufferedStreams(1, arrivals=trace))
+        q.run()
+        self.assertEqual(len(q.completed), 1000)
+        self.assertTrue(np.allclose(sorted(player.arrivaldate for player in q.completed), self.dates - self.dates[0]))
+
+    def test_errors(self):
+        """Traces too short to give a rate and dates that decrease are refused"""
+        for dates in [[5.0], [5.0, 5.0]]:
+            path = os.path.join(self.directory, 'short.npy')
+            np.save(path, np.array(dates))
+            self.assertRaises(ValueError, distributions.ArrivalTrace, path)
+        path = os.path.join(self.directory, 'decreasing.npy')
+        np.save(path, np.array([1.0, 3.0, 2.0]))
+        self.assertRaises(ValueError, list, distributions.ArrivalTrace(path).blocks())
+
+
+if __name__ == '__main__':
+    unittest.main()
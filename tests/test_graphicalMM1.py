@@ -0,0 +1,96 @@
+"""
+Tests of the rendering of the graphical simulation (Turtle is replaced by mocks so that no display is needed).
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from bisect import bisect_right
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import graphicalMM1
+import headlessMM1
+
+
+class TurtleTestCase(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.multiple(graphicalMM1, Turtle=mock.MagicMock, tracer=mock.DEFAULT, update=mock.DEFAULT,
+                                      setworldcoordinates=mock.DEFAULT, onkey=mock.DEFAULT, listen=mock.DEFAULT)
+        self.mocks = patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class TestRenderer(TurtleTestCase):
+    def test_fixed_turtles(self):
+        """A frame uses the same turtles whatever the length of the queue and draws once"""
+        renderer = graphicalMM1.Renderer([0, 0], slots=5, servers=1, trail=3)
+        renderer.draw(1.0, ['red'] * 5, 1000, [('blue', (50, 0))], [('green', (k, k)) for k in range(20)])
+        self.assertEqual(len(renderer.looks), 5 + 1 + 3)
+        self.assertEqual(self.mocks['update'].call_count, 1)
+        self.assertIn('995 not shown', renderer.written)
+
+    def test_unchanged_turtles(self):
+        """Turtles whose colour and position have not changed are left alone"""
+        renderer = graphicalMM1.Renderer([0, 0], slots=3, servers=1, trail=2)
+        renderer.draw(1.0, ['red', 'blue'], 2, [('blue', (50, 0))], [])
+        for turtle in renderer.slots + renderer.servers + renderer.trail:
+            turtle.reset_mock()
+        renderer.draw(2.0, ['red', 'green'], 2, [('blue', (50, 0))], [])
+        self.assertFalse(renderer.slots[0].method_calls)
+        self.assertTrue(renderer.slots[1].color.called)
+        self.assertFalse(renderer.slots[2].method_calls)
+        self.assertFalse(renderer.servers[0].method_calls)
+
+
+
+class TestSim(TurtleTestCase):
+    def test_slow_frame(self):
+        """Frames are drawn again as soon as a slow frame is over (the lost time is not caught up by skipping frames)"""
+        clock = [0.0]  # A clock that only moves when the run sleeps or a frame is slow
+
+        def draw(t):
+            if q.draw.call_count == 5:
+                clock[0] += 100  # The fifth frame takes 500 frames
+        with mock.patch.multiple(graphicalMM1, time=lambda: clock[0], sleep=lambda delay: clock.__setitem__(0, clock[0] + delay)):
+            q = graphicalMM1.Sim(20, 0.5, 1, speed=1, fps=5, seed=1)
+            q.draw = mock.MagicMock(side_effect=draw)
+            q.printprogress = mock.MagicMock()
+            q.run()
+        self.assertGreater(q.draw.call_count, 90)  # Of 100 frames
+
+class TestReplay(TurtleTestCase):
+    def test_state(self):
+        """The state replayed from the event log of a headless run is the state that run recorded, at any date and in any order"""
+        q = headlessMM1.Sim(300, 0.9, 1, costofbalking=[0.5, 3], seed=2, log=True)
+        q.run()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        q.log.save(os.path.join(directory, 'log'))
+        replay = graphicalMM1.Replay(headlessMM1.EventLog.load(os.path.join(directory, 'log')))
+        recorder = q.recorder
+        for t in [250.5, 3.2, 0, 120.7, 299.9, 17.25, 64.0]:
+            k = bisect_right(recorder.timepoints, t) - 1
+            queue, queuelength, inservice, left = replay.state(t)
+            self.assertEqual(queuelength, recorder.selfishqueuelengths[k] + recorder.optimalqueuelengths[k], t)
+            self.assertEqual(len(queue), min(queuelength, len(replay.renderer.slots)))
+            self.assertEqual(len(inservice), recorder.selfishsystemstates[k] + recorder.optimalsystemstates[k] - queuelength, t)
+
+    def test_seek(self):
+        """Seeking stays within the log"""
+        q = headlessMM1.Sim(100, 0.5, 1, seed=1, log=True)
+        q.run()
+        replay = graphicalMM1.Replay(q.log)
+        replay.back()
+        self.assertEqual(replay.t, 0)
+        replay.seek(10 ** 6)
+        self.assertEqual(replay.t, replay.end)
+        replay.seek(50)
+        replay.forward()
+        self.assertAlmostEqual(replay.t, 50 + replay.end / 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,508 @@
+"""
+Tests of the headless simulation.
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from fractions import Fraction
+from math import factorial
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import numpy as np
+import headlessMM1
+
+
+class TestAverages(unittest.TestCase):
+    def test_moving_average(self):
+        """The running totals give the mean of the first k values"""
+        values = [3, 1, 4, 1, 5, 9, 2, 6]
+        self.assertEqual(headlessMM1.movingaverage(values), [sum(values[:k + 1]) / (k + 1) for k in range(len(values))])
+        weights = [1, 0, 2, 1, 3, 1, 1, 2]
+        expected = [sum(v * w for v, w in zip(values[:k + 1], weights[:k + 1])) / sum(weights[:k + 1]) for k in range(len(values))]
+        for average, value in zip(headlessMM1.movingaverage(values, weights), expected):
+            self.assertAlmostEqual(average, value)
+
+    def test_windowed_average(self):
+        """Each average is over the last window values"""
+        values = [3, 1, 4, 1, 5, 9, 2, 6]
+        for average, k in zip(headlessMM1.windowedaverage(values, 3), range(len(values))):
+            window = values[max(0, k - 2):k + 1]
+            self.assertAlmostEqual(average, sum(window) / len(window))
+
+    def test_downsample(self):
+        """At most maxpoints evenly spaced values are kept, with the last value"""
+        values = list(range(1001))
+        thinned = headlessMM1.downsample(values, 100)
+        self.assertLessEqual(len(thinned), 100)
+        self.assertEqual(thinned[0], 0)
+        self.assertEqual(thinned[-1], 1000)
+        self.assertEqual(headlessMM1.downsample(values[:50], 100), values[:50])
+        self.assertEqual(headlessMM1.downsample(values, False), values)
+
+
+def linearthreshold(lmbda, mu, costofbalking):
+    """The largest n with naorfunction(n) <= mu * costofbalking found one n at a time"""
+    n = 0
+    while headlessMM1.naorfunction(n + 1, lmbda / mu) <= mu * costofbalking:
+        n += 1
+    return n
+
+
+class TestNaorThreshold(unittest.TestCase):
+    grid = [(lmbda, mu, costofbalking) for lmbda in [0.2, 0.9, 1, 1.5, 3] for mu in [1, 2] for costofbalking in [0.5, 1, 3, 10, 37.5]]
+
+    def setUp(self):
+        headlessMM1.naorthresholdcache.clear()
+
+    def test_linear_search(self):
+        """Bisection gives the threshold of a linear search (including rho == 1 and rho > 1)"""
+        for lmbda, mu, costofbalking in self.grid:
+            self.assertEqual(headlessMM1.naorthreshold(lmbda, mu, costofbalking), linearthreshold(lmbda, mu, costofbalking), (lmbda, mu, costofbalking))
+
+    def test_arrays(self):
+        """The thresholds of whole arrays are those of naorthreshold"""
+        lmbda, mu, costofbalking = zip(*self.grid)
+        thresholds = headlessMM1.naorthresholds(lmbda, mu, costofbalking).tolist()
+        headlessMM1.naorthresholdcache.clear()
+        self.assertEqual(thresholds, [headlessMM1.naorthreshold(*point) for point in self.grid])
+
+    def test_near_one(self):
+        """Naor's function keeps its precision on either side of rho == 1 and the thresholds do not jump there"""
+        for gap in [1e-3, 1e-5, 1e-7, 1e-10, 1e-13, 0]:
+            for rho in [1 - gap, 1 + gap]:
+                exact = Fraction(rho)
+                for n in [1, 2, 10, 1000]:
+                    expected = Fraction(n * (n + 1), 2) if exact == 1 else (n * (1 - exact) - exact * (1 - exact ** n)) / (1 - exact) ** 2
+                    self.assertAlmostEqual(headlessMM1.naorfunction(n, rho) / float(expected), 1, places=12, msg=(n, rho))
+        for lmbda in [1 - 1e-7, 1 - 1e-10, 1, 1 + 1e-10, 1 + 1e-7]:
+            self.assertEqual(headlessMM1.naorthreshold(lmbda, 1, 37.5), 8)
+            self.assertEqual(headlessMM1.naorthresholds([lmbda], 1, 5e5).tolist(), [999])
+
+    def test_cache(self):
+        """Thresholds are cached"""
+        threshold = headlessMM1.naorthreshold(0.9, 1, 10)
+        self.assertEqual(headlessMM1.naorthresholdcache[(0.9, 1, 10)], threshold)
+        headlessMM1.naorthresholdcache[(0.9, 1, 10)] = -1
+        self.assertEqual(headlessMM1.naorthreshold(0.9, 1, 10), -1)
+        headlessMM1.naorthresholdcache.clear()
+
+
+class TestSim(unittest.TestCase):
+    def test_first_in_first_out(self):
+        """With one server every player starts service when they arrive or when the previous player leaves"""
+        q = headlessMM1.Sim(2000, 0.9, 1, seed=1)
+        q.run()
+        self.assertGreater(len(q.completed), 1000)
+        previous = 0.0
+        for player in sorted(q.completed, key=lambda player: player.arrivaldate):
+            self.assertAlmostEqual(player.endqueuedate, max(player.arrivaldate, previous))
+            previous = player.endservicedate
+
+    def test_seed(self):
+        """A seed gives the same run"""
+        summaries = []
+        for _ in range(2):
+            q = headlessMM1.Sim(1000, 0.7, 1, costofbalking=[0.5, 5], seed=4)
+            q.run()
+            summaries.append(q.summarise())
+        self.assertEqual(summaries[0], summaries[1])
+
+    def test_mean_wait(self):
+        """The mean wait is close to that of an M/M/1 queue and the mean queue length follows from Little's law"""
+        q = headlessMM1.Sim(50000, 0.5, 1, seed=2)
+        q.run()
+        summary = q.summarise(100)
+        self.assertAlmostEqual(summary['meanwaitingtime'], 1.0, delta=0.1)
+        self.assertAlmostEqual(summary['meanqueuelength'], 0.5 * summary['meanwaitingtime'], delta=0.05)
+
+
+class TestStateRecorder(unittest.TestCase):
+    def test_changes_only(self):
+        """A state is only stored when it changes and simultaneous events keep the last state"""
+        recorder = headlessMM1.StateRecorder()
+        recorder.record(0, 0, 0, 0, 0)
+        recorder.record(1, 0, 0, 1, 0)
+        recorder.record(1.5, 0, 0, 1, 0)
+        recorder.record(2, 1, 0, 2, 0)
+        recorder.record(2, 0, 0, 1, 0)
+        recorder.record(3, 0, 0, 0, 0)
+        self.assertEqual(list(recorder.timepoints), [0, 1, 2, 3])
+        self.assertEqual(list(recorder.selfishsystemstates), [0, 1, 1, 0])
+        self.assertEqual(list(recorder.selfishqueuelengths), [0, 0, 0, 0])
+
+    def test_time_average(self):
+        """Averages are weighted by the time for which each state holds within the window"""
+        recorder = headlessMM1.StateRecorder()
+        for t, state in [(0, 0), (1, 2), (3, 1), (6, 0)]:
+            recorder.record(t, state, 0, state, 0)
+        timepoints, durations, columns = recorder.window(2, 8)
+        self.assertEqual(timepoints, [2, 3, 6])
+        self.assertEqual(durations, [1, 3, 2])
+        self.assertEqual(columns['selfishqueuelengths'], [2, 1, 0])
+        self.assertAlmostEqual(recorder.timeaverage(0, 8)['selfishsystemstates'], (2 * 2 + 1 * 3) / 8)
+        self.assertIs(recorder.timeaverage(5, 5)['selfishsystemstates'], False)
+
+    def test_run(self):
+        """The records of a run match the players: the number in the system changes by one at each event"""
+        q = headlessMM1.Sim(500, 0.8, 1, seed=3)
+        q.run()
+        states = [s + o for s, o in zip(q.recorder.selfishsystemstates, q.recorder.optimalsystemstates)]
+        self.assertTrue(all(abs(b - a) == 1 for a, b in zip(states, states[1:])))
+        self.assertEqual(states[-1], len(q.queue) + len(q.server))
+
+
+def erlangcwait(lmbda, mu, servers):
+    """The mean wait of an M/M/c queue (Erlang's C formula)"""
+    a = lmbda / mu
+    top = a ** servers / factorial(servers) / (1 - a / servers)
+    return top / (sum(a ** k / factorial(k) for k in range(servers)) + top) / (servers * mu - lmbda)
+
+
+class TestServers(unittest.TestCase):
+    def test_mean_wait(self):
+        """The mean wait of several servers is close to Erlang's C formula"""
+        q = headlessMM1.Sim(40000, 2.4, 1, seed=5, servers=3, compact=True)
+        q.run()
+        self.assertAlmostEqual(q.summarise(100)['meanwaitingtime'], erlangcwait(2.4, 1, 3), delta=0.1)
+
+    def test_busy_servers(self):
+        """No more players are in service than there are servers and no player waits while a server is free"""
+        q = headlessMM1.Sim(2000, 2.4, 1, seed=6, servers=3)
+        q.run()
+        for queuelength, systemstate in zip(q.recorder.selfishqueuelengths, q.recorder.selfishsystemstates):
+            self.assertLessEqual(systemstate - queuelength, 3)
+            if queuelength > 0:
+                self.assertEqual(systemstate - queuelength, 3)
+
+    def test_knudsen(self):
+        """Knudsen's threshold with one server is Naor's and a server more never lowers it"""
+        for lmbda, mu, costofbalking in TestNaorThreshold.grid:
+            threshold = headlessMM1.knudsenthreshold(lmbda, mu, costofbalking, 1)
+            self.assertEqual(threshold, linearthreshold(lmbda, mu, costofbalking), (lmbda, mu, costofbalking))
+            self.assertGreaterEqual(headlessMM1.knudsenthreshold(lmbda, mu, costofbalking, 2), threshold)
+        self.assertEqual(headlessMM1.naorthreshold(1, 1, 5, servers=3), headlessMM1.knudsenthreshold(1, 1, 5, 3))
+
+
+class TestInstrumentation(unittest.TestCase):
+    def test_same_run(self):
+        """An instrumented run is the run without instrumentation and its counts match the players"""
+        plain = headlessMM1.Sim(2000, 0.9, 1, costofbalking=[0.5, 4], seed=8, capacity=3)
+        plain.run()
+        q = headlessMM1.Sim(2000, 0.9, 1, costofbalking=[0.5, 4], seed=8, capacity=3, instrument=True, log=True)
+        q.run()
+        self.assertEqual(q.summarise(), plain.summarise())
+        counts = q.instrumentation.counts
+        self.assertEqual(counts['arrivals'], len(q.completed) + len(q.balked) + len(q.blocked) + len(q.queue) + len(q.server))
+        self.assertEqual(counts['balks'], len(q.balked))
+        self.assertEqual(counts['blocks'], len(q.blocked))
+        self.assertGreater(counts['blocks'], 0)
+        self.assertEqual(counts['endservices'], len(q.completed))
+        self.assertEqual(counts['startservices'], len(q.completed) + len(q.server))
+        self.assertEqual(counts['events'], counts['arrivals'] + counts['endservices'])
+        self.assertEqual(counts['records'], len(q.recorder) - 1)  # The state at time 0 is recorded before the first event
+
+    def test_report(self):
+        """The timed sections do not overlap and the measurements are saved as json"""
+        q = headlessMM1.Sim(1000, 0.9, 1, seed=8, instrument=True)
+        q.run()
+        dump = q.instrumentation.dump()
+        self.assertLessEqual(sum(dump['timings'].values()), dump['wall'])
+        self.assertTrue(all(timing >= 0 for timing in dump['timings'].values()))
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        q.instrumentation.save(os.path.join(directory, 'metrics.json'))
+        with open(os.path.join(directory, 'metrics.json')) as f:
+            self.assertEqual(json.load(f)['counts'], dump['counts'])
+
+
+def arrivaldates(q):
+    """The arrival dates of the players of a run that have left (served or balked)"""
+    return sorted([player.arrivaldate for player in q.completed] + [player.arrivaldate for player in q.balked])
+
+
+class TestStreams(unittest.TestCase):
+    def test_common_random_numbers(self):
+        """Runs with the same seed see the same arrivals whatever their players decide"""
+        runs = []
+        for costofbalking in [[0, 10], [1, 10], False]:
+            q = headlessMM1.Sim(500, 0.9, 1, costofbalking=costofbalking, streams=headlessMM1.Streams(7))
+            q.run()
+            runs.append(q)
+        dates = [arrivaldates(q) for q in runs]
+        length = min(len(date) for date in dates) - 10
+        self.assertEqual(dates[0][:length], dates[1][:length])
+        self.assertEqual(dates[0][:length], dates[2][:length])
+        self.assertNotEqual(runs[0].summarise()['meancost'], runs[1].summarise()['meancost'])
+
+    def test_antithetic(self):
+        """Antithetic streams use 1 - U in place of every uniform U"""
+        for streams in [headlessMM1.Streams, headlessMM1.BufferedStreams]:
+            plain, antithetic = streams(3), streams(3, True)
+            for _ in range(100):
+                a, b = plain.interarrivaltime(2), antithetic.interarrivaltime(2)
+                self.assertAlmostEqual(np.exp(-2 * a) + np.exp(-2 * b), 1)
+                a, b = plain.servicetime(1), antithetic.servicetime(1)
+                self.assertAlmostEqual(np.exp(-a) + np.exp(-b), 1)
+                self.assertAlmostEqual(plain.random() + antithetic.random(), 1)
+
+
+class TestBufferedStreams(unittest.TestCase):
+    def test_blocksize(self):
+        """The variates only depend on the seed, not on the size of the blocks"""
+        small, large = headlessMM1.BufferedStreams(4, blocksize=7), headlessMM1.BufferedStreams(4)
+        for _ in range(100):
+            self.assertEqual(small.interarrivaltime(2), large.interarrivaltime(2))
+            self.assertEqual(small.servicetime(1), large.servicetime(1))
+            self.assertEqual(small.random(), large.random())
+        summaries = []
+        for blocksize in [13, 2 ** 14]:
+            q = headlessMM1.Sim(500, 0.9, 1, costofbalking=[0.5, 5], streams=headlessMM1.BufferedStreams(4, blocksize=blocksize))
+            q.run()
+            summaries.append(q.summarise())
+        self.assertEqual(summaries[0], summaries[1])
+
+    def test_distributions(self):
+        """The times are negative exponential with the rates asked for and the types are uniform"""
+        streams = headlessMM1.BufferedStreams(5, blocksize=1000)
+        self.assertAlmostEqual(np.mean([streams.interarrivaltime(4) for _ in range(20000)]), 0.25, delta=0.01)
+        self.assertAlmostEqual(np.mean([streams.servicetime(0.5) for _ in range(20000)]), 2, delta=0.05)
+        uniforms = [streams.random() for _ in range(20000)]
+        self.assertAlmostEqual(np.mean(uniforms), 0.5, delta=0.01)
+        self.assertTrue(0 <= min(uniforms) and max(uniforms) < 1)
+
+
+class TestQuantileSketch(unittest.TestCase):
+    def assertWithin(self, value, expected, accuracy):
+        self.assertLessEqual(abs(value - expected), accuracy * expected + 1e-12, (value, expected))
+
+    def test_accuracy(self):
+        """Every quantile is within the accuracy of the value of its rank (waits of 0 are counted apart)"""
+        values = np.random.default_rng(0).lognormal(0, 2, 10000)
+        values[:2000] = 0
+        sketch = headlessMM1.QuantileSketch(0.01)
+        sketch.update_array(values)
+        ordered = np.sort(values)
+        for q in [0.1, 0.25, 0.5, 0.9, 0.99, 0.999]:
+            self.assertWithin(sketch.quantile(q), ordered[int(q * len(values))], 0.01)
+        self.assertIs(headlessMM1.QuantileSketch().quantile(0.5), False)
+
+    def test_merge(self):
+        """Merged sketches are the sketch of the pooled data and give its quantiles"""
+        rng = np.random.default_rng(1)
+        parts = [rng.exponential(scale, 5000) for scale in [0.5, 1, 4]]
+        merged = headlessMM1.QuantileSketch(0.02)
+        for part in parts:
+            sketch = headlessMM1.QuantileSketch(0.02)
+            for value in part.tolist():
+                sketch.update(value)
+            merged.merge(sketch)
+        pooled = headlessMM1.QuantileSketch(0.02)
+        pooled.update_array(np.concatenate(parts))
+        self.assertEqual(merged.buckets, pooled.buckets)
+        self.assertEqual(merged.count, pooled.count)
+        ordered = np.sort(np.concatenate(parts))
+        for p, value in merged.percentiles((50, 90, 99)).items():
+            self.assertWithin(value, ordered[int(p / 100 * len(ordered))], 0.02)
+        self.assertRaises(ValueError, merged.merge, headlessMM1.QuantileSketch(0.01))
+
+    def test_weights(self):
+        """Weighted observations count as their weight (time weighted queue lengths)"""
+        sketch = headlessMM1.QuantileSketch(0.01)
+        sketch.update_array(np.array([1.0, 2.0, 3.0]), np.array([1.0, 8.0, 1.0]))
+        self.assertWithin(sketch.quantile(0.5), 2, 0.01)
+        self.assertWithin(sketch.quantile(0.95), 3, 0.01)
+
+    def test_waits(self):
+        """The percentiles of the waits of an M/M/1 queue are those of its distribution: P(W > t) = rho * exp(-(mu - lmbda) * t)"""
+        q = headlessMM1.Sim(50000, 0.5, 1, seed=3, compact=True)
+        q.run()
+        sketches = q.quantilesketches(100)
+        self.assertAlmostEqual(sketches['all']['waitingtime'].quantile(0.9), 2 * np.log(5), delta=0.25)
+        self.assertAlmostEqual(sketches['all']['waitingtime'].quantile(0.4), 0, delta=0.01)
+        self.assertAlmostEqual(sketches['all']['systemtime'].quantile(0.5), 2 * np.log(2), delta=0.1)
+
+
+class TestCapacity(unittest.TestCase):
+    def test_blocking(self):
+        """The probability of blocking is that of an M/M/1/K queue"""
+        q = headlessMM1.Sim(40000, 0.9, 1, seed=1, capacity=3, compact=True)
+        q.run()
+        rho = 0.9
+        self.assertAlmostEqual(q.summarise()['probblock'], (1 - rho) * rho ** 3 / (1 - rho ** 4), delta=0.01)
+        self.assertLessEqual(max(q.recorder.selfishsystemstates), 3)
+
+    def test_blocked_cost(self):
+        """Blocked players are costed as players who balk"""
+        q = headlessMM1.Sim(2000, 0.9, 1, costofbalking=[0.5, 4], seed=2, capacity=3)
+        q.run()
+        self.assertGreater(len(q.blocked), 0)
+        served = sum(player.waitingtime + player.servicetime for player in q.completed)
+        left = len(q.balked) + len(q.blocked)
+        self.assertAlmostEqual(q.summarise()['meancost'], (served + 4 * left) / (len(q.completed) + left))
+
+    def test_blocked_counts(self):
+        """Blocked players are counted from the record in effect at a date, leaving out those of that record blocked before the date"""
+        blocked = headlessMM1.BlockedCounts()
+        for record, date, kind in [(2, 1.0, 1), (2, 1.5, 2), (2, 2.5, 1), (5, 4.0, 2), (9, 8.0, 1)]:
+            blocked.add(record, date, kind)
+        self.assertEqual(len(blocked), 5)
+        self.assertEqual(blocked.since(0), (3, 2))
+        self.assertEqual(blocked.since(2, 1.2), (2, 2))
+        self.assertEqual(blocked.since(3), (1, 1))
+        self.assertEqual(blocked.since(10), (0, 0))
+
+    def test_blocked_warmup(self):
+        """The arrivals blocked after a warm up time within a record are counted"""
+        q = headlessMM1.Sim(2000, 0.9, 1, costofbalking=[0.5, 4], seed=2, capacity=3)
+        q.run()
+        for warmup in [0, q.blocked.dates[10], (q.blocked.dates[10] + q.blocked.dates[11]) / 2, 1000.5]:
+            blocked = sum(1 for date in q.blocked.dates if date >= warmup)
+            players = sum(1 for p in list(q.completed) + list(q.balked) if p.arrivaldate >= warmup)
+            self.assertAlmostEqual(q.summarise(warmup)['probblock'], blocked / (blocked + players))
+
+    def test_compact(self):
+        """Compact records of the players give the summary of the players themselves"""
+        summaries = []
+        for compact in [False, True]:
+            q = headlessMM1.Sim(1000, 0.9, 1, costofbalking=[0.5, 4], seed=3, capacity=4, compact=compact)
+            q.run()
+            summaries.append(q.summarise(100))
+        self.assertEqual(summaries[0], summaries[1])
+        self.assertIsInstance(q.completed, headlessMM1.PlayerRecords)
+        self.assertEqual(q.completed[0].arrivaldate, 0)
+
+
+class TestOverload(unittest.TestCase):
+    def test_stop(self):
+        """Sustained growth stops the run with a warning"""
+        with mock.patch('sys.stderr') as stderr:
+            q = headlessMM1.Sim(10 ** 6, 1.5, 1, seed=1, overload='stop', compact=True)
+            q.run()
+        self.assertTrue(q.overloaded)
+        self.assertEqual(q.T, q.overloaded)
+        self.assertLess(q.T, 10 ** 5)
+        self.assertTrue(any('unstable' in call[0][0] for call in stderr.write.call_args_list))
+
+    def test_stable(self):
+        """No growth is detected in a stable queue or with a capacity"""
+        for capacity, lmbda in [(None, 0.8), (10, 1.5)]:
+            with mock.patch('sys.stderr') as stderr:
+                q = headlessMM1.Sim(50000, lmbda, 1, seed=2, overload='stop', capacity=capacity, compact=True)
+                q.run()
+            self.assertIs(q.overloaded, False)
+            self.assertEqual(q.T, 50000)
+            self.assertFalse(stderr.write.called)
+
+
+class TestMSER(unittest.TestCase):
+    def test_transient(self):
+        """The truncation point is the end of an initial transient"""
+        values = np.random.default_rng(0).normal(0, 1, 2000)
+        values[:300] += 10
+        mser = headlessMM1.MSER(5)
+        for date, value in enumerate(values.tolist()):
+            mser.update(value, date)
+        batches, date = mser.truncation()
+        self.assertEqual(batches, 60)
+        self.assertEqual(date, 300)
+        self.assertEqual(headlessMM1.MSER(5).truncation(), (0, False))
+
+    def test_extend(self):
+        """Adding a series at once is the same as adding each observation (weighted observations are split between batches)"""
+        rng = np.random.default_rng(1)
+        values, weights = rng.exponential(1, 5000).tolist(), rng.exponential(0.4, 5000).tolist()
+        dates = np.cumsum([0] + weights[:-1]).tolist()
+        single, series = headlessMM1.MSER(1, maxbatches=64), headlessMM1.MSER(1, maxbatches=64)
+        for value, date, weight in zip(values, dates, weights):
+            single.update(value, date, weight)
+        series.extend(values[:1234], dates[:1234], weights[:1234])
+        series.extend(values[1234:], dates[1234:], weights[1234:])
+        self.assertEqual(series.batchsize, single.batchsize)
+        self.assertEqual(series.dates, single.dates)
+        self.assertTrue(np.allclose(series.means, single.means))
+
+    def test_streamed(self):
+        """The warm up detected as the run goes is that of the recorded data read after the run"""
+        q = headlessMM1.Sim(30000, 0.98, 1, seed=3, compact=True, warmupdetection=True)
+        q.run()
+        queuelengths, waits = headlessMM1.MSER(5 / 0.98), headlessMM1.MSER(5)
+        timepoints, durations, columns = q.recorder.window(0, q.T)
+        for t, d, selfish, optimal in list(zip(timepoints, durations, columns['selfishqueuelengths'], columns['optimalqueuelengths']))[:-1]:
+            queuelengths.update(selfish + optimal, t, d)
+        for date, wait in q.waitseries():
+            waits.update(wait, date)
+        self.assertGreater(q.detectwarmup(), 0)
+        self.assertEqual(q.warmuptimes, {'queuelength': queuelengths.truncation()[1], 'waitingtime': waits.truncation()[1]})
+        self.assertEqual(q.summarise('auto'), q.summarise(q.warmup))
+
+    def test_off(self):
+        """A run without warm up detection (the default) refuses 'auto'"""
+        q = headlessMM1.Sim(100, 0.5, 1, seed=1)
+        q.run()
+        self.assertIsNone(q.warmupdetectors)
+        self.assertRaises(ValueError, q.summarise, 'auto')
+
+
+class TestBatchMeans(unittest.TestCase):
+    def test_update_array(self):
+        """Adding arrays is the same as adding each observation and memory stays bounded"""
+        values = np.random.default_rng(2).exponential(1, 10000)
+        single, arrays = headlessMM1.BatchMeans(8), headlessMM1.BatchMeans(8)
+        for value in values.tolist():
+            single.update(value)
+        for start in range(0, 10000, 333):
+            arrays.update_array(values[start:start + 333])
+        self.assertEqual(arrays.batchsize, single.batchsize)
+        self.assertTrue(np.allclose(arrays.means, single.means))
+        self.assertLess(len(single.means), 16)
+        self.assertAlmostEqual(single.mean(), values[:len(single.means) * single.batchsize].mean())
+
+    def test_halfwidth(self):
+        """The interval is infinite until there are enough batches and then covers the mean of independent observations"""
+        batches = headlessMM1.BatchMeans(32)
+        self.assertEqual(batches.halfwidth(), float('inf'))
+        rng = np.random.default_rng(3)
+        batches.update_array(rng.normal(5, 1, 64))
+        self.assertLess(batches.halfwidth(), float('inf'))
+        batches.update_array(rng.normal(5, 1, 100000))
+        self.assertLess(abs(batches.mean() - 5), batches.halfwidth())
+        self.assertAlmostEqual(batches.relativehalfwidth(), batches.halfwidth() / batches.mean())
+
+
+class TestRunToPrecision(unittest.TestCase):
+    def test_targets(self):
+        """The run stops once the intervals are precise enough and T is the stopping date"""
+        q = headlessMM1.Sim(10 ** 6, 0.5, 1, costofbalking=[0.5, 4], seed=1)
+        intervals = q.runtoprecision(wait=0.05, cost=0.05)
+        self.assertTrue(q.converged)
+        self.assertLess(q.T, 10 ** 6)
+        self.assertEqual(q.T, q.stoppingtime)
+        for name in ['wait', 'cost']:
+            average, halfwidth = intervals[name]
+            self.assertLessEqual(halfwidth / average, 0.05)
+        self.assertAlmostEqual(q.summarise()['meanwaitingtime'], intervals['wait'][0], delta=intervals['wait'][1])
+
+    def test_blocked(self):
+        """Blocked players are costed as players who balk, as in summarise"""
+        q = headlessMM1.Sim(10 ** 5, 0.9, 1, costofbalking=[0.5, 4], seed=2, capacity=3)
+        intervals = q.runtoprecision(cost=0.02)
+        self.assertTrue(q.converged)
+        self.assertGreater(len(q.blocked), 0)
+        self.assertAlmostEqual(q.summarise()['meancost'], intervals['cost'][0], delta=intervals['cost'][1])
+
+    def test_limit(self):
+        """T is an upper limit"""
+        q = headlessMM1.Sim(200, 0.9, 1, seed=1)
+        q.runtoprecision(wait=0.001)
+        self.assertFalse(q.converged)
+        self.assertEqual(q.T, 200)
+        self.assertRaises(ValueError, headlessMM1.Sim(200, 0.9, 1).runtoprecision)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+"""
+Tests of the simulation of a network of queues.
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import numpy as np
+import network
+
+
+class TestArrivalRates(unittest.TestCase):
+    def test_traffic_equations(self):
+        """The rates solve the traffic equations"""
+        externalrates = [1, 0.5, 0]
+        routing = [[0, 0.5, 0.3], [0.2, 0, 0.6], [0.1, 0, 0]]
+        rates = network.arrivalrates(externalrates, routing)
+        expected = np.linalg.solve(np.eye(3) - np.array(routing).T, externalrates)
+        self.assertTrue(np.allclose(rates, expected))
+
+    def test_tandem(self):
+        """Every station of a tandem sees the external rate"""
+        self.assertEqual(network.tandem(3), [[0, 1, 0], [0, 0, 1], [0, 0, 0]])
+        self.assertEqual(network.arrivalrates([0.7, 0, 0], network.tandem(3)), [0.7, 0.7, 0.7])
+
+    def test_no_exit(self):
+        """A network that customers never leave has no solution"""
+        self.assertRaises(ValueError, network.arrivalrates, [1, 0], [[0, 1], [1, 0]], iterations=1000)
+
+
+class TestNetwork(unittest.TestCase):
+    externalrates = [1, 0.5, 0]
+    mu = [3, 2, 1.5]
+    routing = [[0, 0.5, 0.3], [0.2, 0, 0.6], [0.1, 0, 0]]
+
+    @classmethod
+    def setUpClass(cls):
+        cls.network = network.Network(20000, cls.externalrates, cls.mu, cls.routing, warmup=100, seed=1)
+        cls.network.run()
+        cls.summary = cls.network.summarise()
+        cls.rates = network.arrivalrates(cls.externalrates, cls.routing)
+
+    def test_throughput(self):
+        """The throughput of each station is the solution of the traffic equations and customers leave at the external rate"""
+        for station, rate, mu in zip(self.summary['stations'], self.rates, self.mu):
+            self.assertAlmostEqual(station['throughput'], rate, delta=0.05 * rate)
+            self.assertAlmostEqual(station['utilisation'], rate / mu, delta=0.05)
+        self.assertAlmostEqual(self.summary['throughput'], sum(self.externalrates), delta=0.05)
+        self.assertAlmostEqual(self.summary['meanvisits'], sum(self.rates) / sum(self.externalrates), delta=0.05)
+
+    def test_product_form(self):
+        """Each station of a Jackson network behaves as an M/M/1 queue: rho / (1 - rho) in the station"""
+        for station, rate, mu in zip(self.summary['stations'], self.rates, self.mu):
+            rho = rate / mu
+            self.assertAlmostEqual(station['meansystemstate'], rho / (1 - rho), delta=0.1 * rho / (1 - rho))
+
+    def test_lengths(self):
+        self.assertRaises(ValueError, network.Network, 10, [1, 1], [2], [[0]])
+
+
+if __name__ == '__main__':
+    unittest.main()
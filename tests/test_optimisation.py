@@ -0,0 +1,64 @@
+"""
+Tests of the search for the threshold that minimises the mean cost.
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import numpy as np
+import headlessMM1
+import optimisation
+
+
+class TestThresholdCost(unittest.TestCase):
+    def test_candidates(self):
+        """Costs of balking give the sorted distinct thresholds of naorthreshold"""
+        costs = [1, 2, 5, 10, 10.5, 20]
+        self.assertEqual(optimisation.candidates(0.9, 1, costs), sorted(set(headlessMM1.naorthreshold(0.9, 1, cost) for cost in costs)))
+        self.assertEqual(optimisation.candidates(2, 1, costs, servers=3), sorted(set(headlessMM1.knudsenthreshold(2, 1, cost, 3) for cost in costs)))
+
+    def test_common_random_numbers(self):
+        """A replication is reproduced from its stream and a lower threshold makes more players balk"""
+        stream = np.random.SeedSequence(1)
+        costs = [optimisation.thresholdcost(stream, threshold, 500, 0.9, 1, 10) for threshold in [1, 4, 4, 20]]
+        self.assertEqual(costs[1], costs[2])
+        self.assertEqual(len(set(costs)), 3)
+
+    def test_no_data(self):
+        """A run with no player after the warm up has no cost to compare"""
+        self.assertRaises(ValueError, optimisation.thresholdcost, np.random.SeedSequence(1), 4, 50, 0.9, 1, 10, warmup=100)
+
+    def test_threshold(self):
+        """Optimal players given a threshold do not join a system that holds that many players"""
+        q = headlessMM1.Sim(1000, 0.9, 1, costofbalking=[0, 10], threshold=2, compact=True, seed=1)
+        q.run()
+        self.assertEqual(q.naorthreshold, 2)
+        self.assertEqual(max(q.recorder.optimalsystemstates), 2)
+        self.assertGreater(len(q.balked), 0)
+
+
+class TestThresholdSearch(unittest.TestCase):
+    def test_naor(self):
+        """The search finds Naor's threshold of an M/M/1 queue in fewer runs than a full grid"""
+        search = optimisation.ThresholdSearch(2000, 0.9, 1, 10, initial=5, step=5, maxreplications=30, seed=3, processes=1)
+        self.assertEqual(search.run(), headlessMM1.naorthreshold(0.9, 1, 10))
+        self.assertLess(search.runs, search.gridruns)
+        summary = search.summarise()
+        for threshold, (replications, by) in search.eliminated.items():
+            self.assertGreater(summary[threshold]['mean'], summary[by]['mean'])
+            self.assertEqual(summary[threshold]['n'], replications)
+        self.assertIn('Threshold %s' % search.best, search.statement())
+
+    def test_processes(self):
+        """The search does not depend on the number of processes"""
+        searches = [optimisation.ThresholdSearch(300, 0.9, 1, 10, thresholds=[1, 3, 5], initial=4, step=4, maxreplications=8, seed=2, processes=processes) for processes in [1, 2]]
+        for search in searches:
+            search.run()
+        self.assertEqual(searches[0].costs, searches[1].costs)
+        self.assertEqual(searches[0].surviving, searches[1].surviving)
+
+
+if __name__ == '__main__':
+    unittest.main()
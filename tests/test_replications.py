@@ -0,0 +1,81 @@
+"""
+Tests of the independent replications.
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import numpy as np
+import headlessMM1
+import replications
+
+
+class TestReplications(unittest.TestCase):
+    def test_streams(self):
+        """Every replication has its own stream and the streams are reproduced from the seed"""
+        first = [replications.seedint(stream) for stream in replications.streams(3, 5)]
+        second = [replications.seedint(stream) for stream in replications.streams(3, 5)]
+        self.assertEqual(first, second)
+        self.assertEqual(len(set(first)), 5)
+
+    def test_processes(self):
+        """The results do not depend on the number of processes"""
+        results = []
+        for processes in [1, 2]:
+            r = replications.Replications(replications.sim, 4, seed=1, processes=processes, T=200, lmbda=0.8, mu=1)
+            r.run()
+            results.append(r.results)
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(len(set(result['meanwaitingtime'] for result in results[0])), 4)
+
+    def test_summarise(self):
+        """The summary holds the mean, standard deviation and t interval of each metric (values that are False are left out)"""
+        r = replications.Replications(replications.sim, 0)
+        r.results = [{'a': 1.0, 'b': False}, {'a': 2.0, 'b': 4.0}, {'a': 6.0, 'b': False}]
+        summary = r.summarise(0.95)
+        self.assertAlmostEqual(summary['a']['mean'], 3.0)
+        self.assertAlmostEqual(summary['a']['std'], 7 ** .5)
+        self.assertAlmostEqual(summary['a']['halfwidth'], replications.tquantile(0.975, 2) * 7 ** .5 / 3 ** .5)
+        self.assertEqual(summary['b']['n'], 1)
+        self.assertEqual(summary['b']['halfwidth'], float('inf'))
+
+    def test_merge_sketches(self):
+        """The sketches of the replications merge in to the sketch of all of their customers"""
+        r = replications.Replications(replications.qsim, 3, seed=5, processes=1, lambd=0.8, mu=1, simulation_time=2000, quantiles=True)
+        r.run()
+        merged = r.mergesketches()['waitingtimesketch']
+        self.assertEqual(merged.count, sum(result['waitingtimesketch'].count for result in r.results))
+        self.assertEqual(merged.count, sum(result['customers'] for result in r.results))
+        self.assertNotIn('waitingtimesketch', r.summarise())
+
+
+class TestPaired(unittest.TestCase):
+    def test_shared_warmup(self):
+        """With warmup='auto' every run of a pair is summarised from the same detected warm up"""
+        stream = np.random.SeedSequence(0)
+        configurations = [[0, 3], [1, 3]]
+        detected = []
+        for costofbalking in configurations:
+            for flip in [False, True]:
+                q = headlessMM1.Sim(3000, 0.98, 1, costofbalking=costofbalking, streams=headlessMM1.Streams(replications.seedint(stream), flip), warmupdetection=True)
+                q.run()
+                detected.append(q.detectwarmup())
+        self.assertGreater(len(set(detected)), 1)
+        automatic = replications.paired(stream, 3000, 0.98, 1, configurations, warmup='auto', antithetic=True)
+        self.assertEqual(automatic, replications.paired(stream, 3000, 0.98, 1, configurations, warmup=max(detected), antithetic=True))
+
+    def test_variance_reduction(self):
+        """Paired differences on common random numbers vary less than differences of independent runs"""
+        r = replications.Replications(replications.paired, 10, seed=2, processes=1, T=500, lmbda=0.9, mu=1, configurations=[[0, 10], [1, 10]])
+        r.run()
+        summary = r.summarise()
+        first, second, difference = summary['meancost[0]'], summary['meancost[1]'], summary['meancost[1]-[0]']
+        self.assertLess(difference['std'], (first['std'] ** 2 + second['std'] ** 2) ** .5 / 2)
+        for result in r.results:
+            self.assertAlmostEqual(result['meancost[1]-[0]'], result['meancost[1]'] - result['meancost[0]'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+"""
+Tests of the resumable parameter sweep.
+"""
+import csv
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import sweep
+
+
+class TestSweep(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.outfile = os.path.join(self.directory, 'sweep.csv')
+        self.configurations = sweep.grid([0.5, 0.8], [1], [False, 4], [0.5])
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def rows(self):
+        with open(self.outfile, newline='') as f:
+            return list(csv.DictReader(f))
+
+    def test_resume(self):
+        """Configurations already in the file are not run again, other settings are"""
+        self.assertEqual(sweep.Sweep(self.configurations[:2], self.outfile, 100, processes=1).run(), 2)
+        self.assertEqual(sweep.Sweep(self.configurations, self.outfile, 100, processes=1).run(), 2)
+        self.assertEqual(sweep.Sweep(self.configurations, self.outfile, 100, processes=1).run(), 0)
+        self.assertEqual(sweep.Sweep(self.configurations, self.outfile, 100, seed=1, processes=1).run(), 4)
+        self.assertEqual(len(self.rows()), 8)
+
+    def test_order(self):
+        """The results of a configuration do not depend on the order of the runs"""
+        sweep.Sweep(self.configurations, self.outfile, 100, processes=1).run()
+        forwards = dict((sweep.configurationkey(row), row['meanwaitingtime']) for row in self.rows())
+        os.remove(self.outfile)
+        sweep.Sweep(self.configurations[::-1], self.outfile, 100, processes=1).run()
+        backwards = dict((sweep.configurationkey(row), row['meanwaitingtime']) for row in self.rows())
+        self.assertEqual(forwards, backwards)
+
+    def test_partial_row(self):
+        """A last row cut short by an interruption is removed and run again"""
+        sweep.Sweep(self.configurations, self.outfile, 100, processes=1).run()
+        with open(self.outfile, 'rb+') as f:
+            f.truncate(os.path.getsize(self.outfile) - 10)
+        self.assertEqual(len(sweep.Sweep(self.configurations, self.outfile, 100, processes=1).completed()), 3)
+        self.assertEqual(sweep.Sweep(self.configurations, self.outfile, 100, processes=1).run(), 1)
+        rows = self.rows()
+        self.assertEqual(len(rows), 4)
+        self.assertTrue(all(sweep.complete(row, sweep.Sweep.columns) for row in rows))
+
+    def test_other_columns(self):
+        """A file with other columns is not mixed with the results of a sweep"""
+        with open(self.outfile, 'w') as f:
+            f.write('a,b\n1,2\n')
+        self.assertRaises(ValueError, sweep.Sweep(self.configurations, self.outfile, 100, processes=1).completed)
+
+    def test_no_seed(self):
+        """A sweep without a seed is rejected before any run"""
+        self.assertRaises(ValueError, sweep.Sweep, self.configurations, self.outfile, 100, seed=None, processes=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Tests of the out-of-core analysis of saved traces and simulations.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import numpy as np
+import MM1Q
+import headlessMM1
+import traces
+
+
+class TestTraceSummary(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        writer = MM1Q.Trace_Writer(self.directory)
+        for chunk in MM1Q.lindley_chunks(0.9, 1, 5000, chunk_size=1000, seed=1):
+            writer.write(chunk)
+        writer.close()
+        self.data = MM1Q.lindley(0.9, 1, 5000, chunk_size=1000, seed=1)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_exact(self):
+        """The summary read a chunk at a time is that of the whole data set (percentiles are exact)"""
+        summary = traces.tracesummary(self.directory, warmup=100, percentiles=(0, 50, 90, 99, 100), chunk_size=333)
+        keep = self.data['Arrival_Date'] >= 100
+        for name, values in [('Wait', self.data['Wait'][keep]), ('Time_In_System', (self.data['Service_End_Date'] - self.data['Arrival_Date'])[keep])]:
+            self.assertEqual(summary[name]['count'], len(values))
+            self.assertAlmostEqual(summary[name]['mean'], values.mean())
+            self.assertAlmostEqual(summary[name]['variance'], values.var(ddof=1))
+            for q in (0, 50, 90, 99, 100):
+                self.assertAlmostEqual(summary[name]['percentiles'][q], np.percentile(values, q), msg=(name, q))
+            self.assertEqual(summary[name]['histogram'][0].sum(), len(values))
+
+    def test_memory_map(self):
+        """The columns are memory-mapped"""
+        trace = traces.readtrace(self.directory)
+        self.assertIsInstance(trace['Wait'], np.memmap)
+        self.assertTrue(np.array_equal(trace['Wait'], self.data['Wait']))
+
+
+class TestSimTrace(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def assertSummaries(self, summary, expected):
+        for metric in headlessMM1.Sim.metrics:
+            if expected[metric] is False:
+                self.assertIs(summary[metric], False)
+            else:
+                self.assertAlmostEqual(summary[metric], expected[metric], msg=metric)
+
+    def test_round_trip(self):
+        """A saved simulation gives the summary of the simulation (players and states are read a chunk at a time)"""
+        q = headlessMM1.Sim(2000, 0.8, 1, costofbalking=[0.5, 4], seed=6)
+        q.run()
+        traces.savesim(q, self.directory, chunk_size=100)
+        saved = traces.SimTrace(self.directory, chunk_size=100)
+        self.assertSummaries(saved.summarise(50), q.summarise(50))
+        self.assertRaises(TypeError, saved.run)
+
+    def test_compact(self):
+        """A simulation with compact records of the players is saved as one with the players themselves"""
+        q = headlessMM1.Sim(2000, 0.8, 1, costofbalking=[0.5, 4], seed=6, compact=True)
+        q.run()
+        traces.savesim(q, self.directory, chunk_size=100)
+        saved = traces.SimTrace(self.directory, chunk_size=100)
+        self.assertSummaries(saved.summarise(50), q.summarise(50))
+
+    def test_blocked(self):
+        """The counts of blocked players are saved with the simulation"""
+        q = headlessMM1.Sim(2000, 0.9, 1, costofbalking=[0.5, 4], seed=2, capacity=3, compact=True)
+        q.run()
+        traces.savesim(q, self.directory)
+        saved = traces.SimTrace(self.directory)
+        self.assertEqual(len(saved.blocked), len(q.blocked))
+        self.assertSummaries(saved.summarise(100), q.summarise(100))
+
+
+if __name__ == '__main__':
+    unittest.main()
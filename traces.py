@@ -0,0 +1,303 @@
+#!/usr/bin/env python
+"""
+Library to analyse exported runs without loading them in to memory.
+
+Columns are stored as .npy files (one per column) and are read memory-mapped, a chunk at a time, so that traces larger than RAM can be analysed.
+
+- readtrace (memory-maps a trace written by MM1Q.Trace_Writer);
+- tracesummary (warm up truncated means, percentiles and histograms of an MM1Q trace);
+- savesim (writes the players and the recorded states of a headlessMM1.Sim to disk);
+- ArrayRecorder (a StateRecorder over memory-mapped arrays);
+- SimTrace (a saved simulation: summarise, printsummary and plot work on it as on a Sim held in memory).
+"""
+from __future__ import division  # Simplify division
+import json
+import os
+import sys  # Use to write to out
+import numpy as np
+import MM1Q
+import headlessMM1
+
+def readtrace(path, columns=MM1Q.COLUMNS):
+    """
+    Function to memory-map the columns of a trace.
+
+    Arguments:
+        path - the directory holding one .npy file per column
+        columns - the names of the columns to read (list of strings)
+
+    Output: a dictionary mapping each column to a read only memory-mapped array
+    """
+    return dict((column, np.load(os.path.join(path, column + '.npy'), mmap_mode='r')) for column in columns)
+
+def chunks(length, chunk_size):
+    """
+    Function to return the slices that split a trace in to chunks.
+
+    Arguments:
+        length - the number of rows (integer)
+        chunk_size - the number of rows in a chunk (integer)
+
+    Output: a list of slices
+    """
+    return [slice(start, min(start + chunk_size, length)) for start in range(0, length, chunk_size)]
+
+def tracesummary(path, warmup=0, percentiles=(50, 90, 95, 99), bins=50, chunk_size=2**20):
+    """
+    Function to summarise the waits and times in system of the customers of an MM1Q trace that arrive after warmup.
+
+    The trace is read in chunks: a first pass gives running means and variances and the range of each series, a second pass fills a fine histogram that locates every percentile within one bin and a third pass collects the values of those bins only so that the percentiles are exact. Memory depends on chunk_size, not on the length of the trace.
+
+    Arguments:
+        path - the directory written by MM1Q.Trace_Writer
+        warmup - customers arriving before this date are left out (float)
+        percentiles - the percentiles to compute (list of numbers between 0 and 100)
+        bins - the number of bins of the returned histograms (integer)
+        chunk_size - the number of customers read at a time (integer)
+
+    Output: a dictionary mapping 'Wait' and 'Time_In_System' to dictionaries with the count, mean, variance, percentiles (a dictionary) and histogram (counts and bin edges)
+    """
+    trace = readtrace(path)
+    slices = chunks(len(trace['Customer']), chunk_size)
+    names = ['Wait', 'Time_In_System']
+
+    def series(k):
+        keep = trace['Arrival_Date'][k] >= warmup
+        return {'Wait': np.asarray(trace['Wait'][k])[keep],
+                'Time_In_System': np.asarray(trace['Service_End_Date'][k] - trace['Arrival_Date'][k])[keep]}
+
+    stats = dict((name, MM1Q.RunningStat()) for name in names)
+    low = dict((name, np.inf) for name in names)
+    high = dict((name, -np.inf) for name in names)
+    for k in slices:
+        values = series(k)
+        for name in names:
+            if len(values[name]):
+                stats[name].update_array(values[name])
+                low[name] = min(low[name], values[name].min())
+                high[name] = max(high[name], values[name].max())
+
+    summary = {}
+    for name in names:
+        summary[name] = {'count': stats[name].count, 'mean': stats[name].mean, 'variance': stats[name].variance(), 'percentiles': {}, 'histogram': None}
+    if all(stats[name].count == 0 for name in names):
+        return summary
+
+    fine = 2**16  # Bins used to locate the percentiles
+    edges = dict((name, np.linspace(low[name], high[name] if high[name] > low[name] else low[name] + 1, fine + 1)) for name in names)
+    counts = dict((name, np.zeros(fine, dtype=np.int64)) for name in names)
+    histograms = dict((name, [np.zeros(bins, dtype=np.int64), np.linspace(edges[name][0], edges[name][-1], bins + 1)]) for name in names)
+    for k in slices:
+        values = series(k)
+        for name in names:
+            counts[name] += np.histogram(values[name], edges[name])[0]
+            histograms[name][0] += np.histogram(values[name], histograms[name][1])[0]
+
+    ranks = {}
+    for name in names:
+        cumulative = np.cumsum(counts[name])
+        ranks[name] = []
+        for q in percentiles:
+            rank = min(int(np.floor(q / 100 * (stats[name].count - 1))), stats[name].count - 1)  # The lower of the two order statistics that are interpolated
+            ranks[name].append((q, rank, int(np.searchsorted(cumulative, rank + 1)), int(np.searchsorted(cumulative, rank + 2))))
+        summary[name]['histogram'] = tuple(histograms[name])
+
+    wanted = dict((name, sorted(set(b for _, _, lower, upper in ranks[name] for b in (lower, upper) if b < fine))) for name in names)
+    collected = dict((name, dict((b, []) for b in wanted[name])) for name in names)
+    for k in slices:
+        values = series(k)
+        for name in names:
+            if not wanted[name]:
+                continue
+            index = np.clip(np.searchsorted(edges[name], values[name], side='right') - 1, 0, fine - 1)
+            for b in wanted[name]:
+                collected[name][b].append(values[name][index == b])
+    for name in names:
+        below = np.concatenate([[0], np.cumsum(counts[name])])  # Number of values before each bin
+        for b in wanted[name]:
+            collected[name][b] = np.sort(np.concatenate(collected[name][b]))
+        for q, rank, lower, upper in ranks[name]:
+            exact = q / 100 * (stats[name].count - 1)
+            first = collected[name][lower][rank - below[lower]]
+            second = collected[name][upper][rank + 1 - below[upper]] if rank + 1 < stats[name].count else first
+            summary[name]['percentiles'][q] = first + (exact - rank) * (second - first)  # Linear interpolation as numpy.percentile
+    return summary
+
+def printtracesummary(path, warmup=0, percentiles=(50, 90, 95, 99)):
+    """
+    Function to print the summary of an MM1Q trace.
+    """
+    summary = tracesummary(path, warmup, percentiles)
+    sys.stdout.write("\n%sTrace summary%s\n" % (10*"-",10*"-"))
+    sys.stdout.write("Number of customers: %s\n" % summary['Wait']['count'])
+    for name, label in [('Wait', 'waiting time'), ('Time_In_System', 'system time')]:
+        sys.stdout.write("Mean %s: %.02f\n" % (label, summary[name]['mean']))
+        for q in percentiles:
+            sys.stdout.write("%s percentile of %s: %.02f\n" % (q, label, summary[name]['percentiles'].get(q, float('nan'))))
+    sys.stdout.write(39 * "-" + "\n")
+
+PLAYERCOLUMNS = ['arrivaldate', 'waitingtime', 'servicetime', 'selfish', 'balked']  # Columns of the players of a saved simulation
+BLOCKEDCOLUMNS = ['records', 'dates', 'kinds']  # Columns of the blocked arrivals (headlessMM1.BlockedCounts)
+
+def savesim(sim, path, chunk_size=2**16):
+    """
+    Function to write a simulation to disk: one row per completed or balked player, the blocked arrivals, the recorded states and the parameters.
+
+    Arguments:
+        sim - a headlessMM1.Sim (or graphicalMM1.Sim) that has been run
+        path - a directory
+        chunk_size - the number of players converted at a time (integer: compact records are copied a column at a time)
+
+    Output: NA
+    """
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    with open(os.path.join(path, 'parameters.json'), 'w') as f:
+        json.dump({'T': sim.T, 'lmbda': sim.lmbda, 'mu': sim.mu, 'costofbalking': sim.costofbalking, 'capacity': sim.capacity}, f)
+    dtypes = {'arrivaldate': np.float64, 'waitingtime': np.float64, 'servicetime': np.float64, 'selfish': np.bool_, 'balked': np.bool_}
+    groups = [sim.completed, sim.balked]  # Lists of players or PlayerRecords
+    columns = dict((column, np.lib.format.open_memmap(os.path.join(path, column + '.npy'), mode='w+', dtype=dtypes[column], shape=(sum(len(players) for players in groups),))) for column in PLAYERCOLUMNS)
+    offset = 0
+    for players, balked in zip(groups, [False, True]):
+        if isinstance(players, headlessMM1.PlayerRecords):  # The typed arrays are copied straight in to the columns
+            k = slice(offset, offset + len(players))
+            columns['arrivaldate'][k] = np.frombuffer(players.arrivaldates, dtype=np.float64)
+            columns['waitingtime'][k] = np.nan if balked else np.frombuffer(players.waitingtimes, dtype=np.float64)
+            columns['servicetime'][k] = np.frombuffer(players.servicetimes, dtype=np.float64)
+            columns['selfish'][k] = np.frombuffer(players.kinds, dtype=np.int8) == headlessMM1.SelfishPlayer.kind
+            columns['balked'][k] = balked
+        else:
+            for k in chunks(len(players), chunk_size):
+                rows = players[k]
+                k = slice(offset + k.start, offset + k.stop)
+                columns['arrivaldate'][k] = [p.arrivaldate for p in rows]
+                columns['waitingtime'][k] = [p.waitingtime if p.served else np.nan for p in rows]
+                columns['servicetime'][k] = [p.servicetime for p in rows]
+                columns['selfish'][k] = [p.selfish for p in rows]
+                columns['balked'][k] = [p.balked for p in rows]
+        offset += len(players)
+    for column in columns.values():
+        column.flush()
+    for column in BLOCKEDCOLUMNS:
+        values = getattr(sim.blocked, column)
+        np.save(os.path.join(path, 'blocked' + column + '.npy'), np.frombuffer(values, dtype=np.dtype(values.typecode)))
+    for column in ['timepoints'] + headlessMM1.StateRecorder.columns:
+        np.save(os.path.join(path, column + '.npy'), np.frombuffer(getattr(sim.recorder, column), dtype=np.float64 if column == 'timepoints' else np.dtype('l')))
+
+class ArrayRecorder(headlessMM1.StateRecorder):
+    """
+    A StateRecorder over (memory-mapped) numpy arrays: the time averages are computed a chunk at a time.
+    """
+    def __init__(self, columns, chunk_size=2**20):
+        self.timepoints = columns['timepoints']
+        for column in self.columns:
+            setattr(self, column, columns[column])
+        self.chunk_size = chunk_size
+    def record(self, *args):
+        raise TypeError("a saved recorder can not record new states")
+    def window(self, start, end):
+        """
+        As for StateRecorder.window but returns arrays (slices of the memory-mapped columns).
+        """
+        first = max(0, int(np.searchsorted(self.timepoints, start, side='right')) - 1)
+        last = int(np.searchsorted(self.timepoints, end, side='right'))
+        timepoints = np.maximum(self.timepoints[first:last], start)
+        durations = np.diff(np.append(timepoints, end))
+        columns = dict((column, getattr(self, column)[first:last]) for column in self.columns)
+        return timepoints, durations, columns
+    def timeaverage(self, start, end):
+        """
+        As for StateRecorder.timeaverage (the window is read a chunk at a time).
+        """
+        first = max(0, int(np.searchsorted(self.timepoints, start, side='right')) - 1)
+        last = int(np.searchsorted(self.timepoints, end, side='right'))
+        areas = dict((column, 0.0) for column in self.columns)
+        total = 0.0
+        for k in chunks(last - first, self.chunk_size):
+            k = slice(first + k.start, first + k.stop)
+            timepoints = np.maximum(self.timepoints[k], start)
+            following = self.timepoints[k.stop] if k.stop < last else end
+            durations = np.diff(np.append(timepoints, min(following, end)))
+            total += durations.sum()
+            for column in self.columns:
+                areas[column] += (getattr(self, column)[k] * durations).sum()
+        if total <= 0:
+            return dict((column, False) for column in self.columns)
+        return dict((column, areas[column] / total) for column in self.columns)
+
+class SimTrace(headlessMM1.Sim):
+    """
+    A simulation saved with savesim. The players and states are memory-mapped and read a chunk at a time so that summarise, printsummary and plot work on runs larger than memory.
+
+    Methods:
+        - waitseries: as for headlessMM1.Sim.waitseries (reads the players a chunk at a time)
+        - feedwarmup: hands the saved states and waits to the warm up detectors once (a chunk at a time)
+        - playertotals: as for headlessMM1.Sim.playertotals (reads the players a chunk at a time)
+        - quantilesketches: as for headlessMM1.Sim.quantilesketches (reads the players and the states a chunk at a time)
+    """
+    def __init__(self, path, chunk_size=2**20):
+        with open(os.path.join(path, 'parameters.json')) as f:
+            parameters = json.load(f)
+        headlessMM1.Sim.__init__(self, parameters['T'], parameters['lmbda'], parameters['mu'], parameters['costofbalking'], capacity=parameters.get('capacity'),
+                                 warmupdetection=True)  # The detectors are only fed from the saved data if the warm up is 'auto'
+        if os.path.exists(os.path.join(path, 'blockeddates.npy')):  # Not written by earlier versions
+            for column in BLOCKEDCOLUMNS:
+                setattr(self.blocked, column, np.load(os.path.join(path, 'blocked' + column + '.npy')))
+        self.path = path
+        self.chunk_size = chunk_size
+        self.fed = False  # Whether the warm up detectors have read the saved data
+        self.players = readtrace(path, PLAYERCOLUMNS)
+        self.recorder = ArrayRecorder(readtrace(path, ['timepoints'] + headlessMM1.StateRecorder.columns), chunk_size)
+
+    def run(self):
+        raise TypeError("a saved simulation can not be run again")
+
+    def waitseries(self):
+        for k in chunks(len(self.players['arrivaldate']), self.chunk_size):
+            served = ~self.players['balked'][k]
+            for date, wait in zip(self.players['arrivaldate'][k][served].tolist(), self.players['waitingtime'][k][served].tolist()):
+                yield date, wait
+
+    def feedwarmup(self):
+        if self.fed:
+            return
+        timepoints, durations, columns = self.recorder.window(0, self.T)
+        for k in chunks(len(durations), self.chunk_size):
+            lengths = columns['selfishqueuelengths'][k] + columns['optimalqueuelengths'][k]
+            self.warmupdetectors['queuelength'].extend(lengths.tolist(), timepoints[k].tolist(), durations[k].tolist())
+        for k in chunks(len(self.players['arrivaldate']), self.chunk_size):
+            served = ~self.players['balked'][k]
+            self.warmupdetectors['waitingtime'].extend(self.players['waitingtime'][k][served].tolist(), self.players['arrivaldate'][k][served].tolist())
+        self.fed = True
+
+    def playertotals(self, warmup=0):
+        totals = {'selfish': [0, 0.0, 0.0, 0], 'optimal': [0, 0.0, 0.0, 0]}
+        for k in chunks(len(self.players['arrivaldate']), self.chunk_size):
+            keep = self.players['arrivaldate'][k] >= warmup
+            selfish = self.players['selfish'][k]
+            balked = self.players['balked'][k]
+            for name, ofthistype in [('selfish', selfish), ('optimal', ~selfish)]:
+                served = keep & ofthistype & ~balked
+                totals[name][0] += int(served.sum())
+                totals[name][1] += float(self.players['waitingtime'][k][served].sum())
+                totals[name][2] += float(self.players['servicetime'][k][served].sum())
+                totals[name][3] += int((keep & ofthistype & balked).sum())
+        return totals
+
+    def quantilesketches(self, warmup=0, accuracy=0.01):
+        warmup = self.resolvewarmup(warmup)
+        sketches = dict((kind, dict((name, headlessMM1.QuantileSketch(accuracy)) for name in ['waitingtime', 'systemtime', 'queuelength'])) for kind in ['selfish', 'optimal', 'all'])
+        for k in chunks(len(self.players['arrivaldate']), self.chunk_size):
+            keep = (self.players['arrivaldate'][k] >= warmup) & ~self.players['balked'][k]
+            selfish = self.players['selfish'][k]
+            for kind, ofthiskind in [('selfish', keep & selfish), ('optimal', keep & ~selfish), ('all', keep)]:
+                waits = self.players['waitingtime'][k][ofthiskind]
+                sketches[kind]['waitingtime'].update_array(waits)
+                sketches[kind]['systemtime'].update_array(waits + self.players['servicetime'][k][ofthiskind])
+        timepoints, durations, columns = self.recorder.window(warmup, self.T)
+        for k in chunks(len(durations), self.chunk_size):
+            selfish = columns['selfishqueuelengths'][k]
+            optimal = columns['optimalqueuelengths'][k]
+            for kind, lengths in [('selfish', selfish), ('optimal', optimal), ('all', selfish + optimal)]:
+                sketches[kind]['queuelength'].update_array(lengths, durations[k])
+        return sketches